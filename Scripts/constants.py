@@ -16,6 +16,9 @@ GENERATED_TEXTS_FILE_PATH = 'C:\\****INPUT FILE PATH YOU WANT****\\GeneratedText
 # export lily texture image path
 LILY_IMAGE_FILE_PATH = 'C:\\****INPUT FILE PATH YOU WANT****\\LilyTextures\\'
 
+# intermediate .blend files written by parallel import workers
+SHARD_FILE_PATH = 'C:\\****INPUT FILE PATH YOU WANT****\\Shards\\'
+
 # fbx filepath
 EXPORT_FBX_FILE_PATH = 'C:\\****INPUT FILE PATH YOU WANT****\\FBX\\'
 
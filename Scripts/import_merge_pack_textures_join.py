@@ -6,6 +6,10 @@ import bmesh
 import os
 import sys
 import glob
+import json
+import threading
+import traceback
+import numpy as np
 
 # import importlib
 import pathlib
@@ -28,10 +32,451 @@ should_delete_rdc_files = True
 face_shade_smooth = False # set this to true if you want to shade smooth the faces and resolve issues with Nanite
 vert_smooth_factor = 0.5 # this is the factor for the smooth vertices operation
 
+# threads used for rdc deletes, error moves and import folder removal so the import loop doesn't wait on the disk
+io_worker_count = 2
+
+# memory governor checked after each import, set memory_budget_gb to 0 to turn it off
+# when the process memory goes over each fraction of the budget it frees image buffers, then purges orphan data, then merges pending imports
+memory_budget_gb = 0
+memory_free_images_fraction = 0.7
+memory_purge_fraction = 0.8
+memory_merge_fraction = 0.9
+
+# 'kd' splits the sections into packs along the longer axis at the area weighted median so each pack fills just under one image
+# 'grid' uses the older guide box grid and fills packs in grid order, which can leave a leftover pack
+pack_strategy = 'kd'
+
+# overlapping captures import the same tile textures many times, collapse identical images onto one before packing
+dedup_capture_images = True
+# each tile section imports with its own material, share one material between sections with the same node tree and image
+consolidate_capture_materials = True
+
+# format lily texture packs and baked textures are written in, 'PNG', 'WEBP' (lossless), 'JPEG', 'OPEN_EXR' or 'BMP'
+# 8 bit PNGs are compressed on a background thread with texture_png_compression_level (0 - 9)
+texture_output_format = 'PNG'
+texture_png_compression_level = 6
+texture_jpeg_quality = 90
+
+# when to save the .blend file, stage boundaries are always saved
+# 'stage' only saves at stage boundaries, 'interval' also saves every checkpoint_interval_minutes
+# 'imports' also saves every checkpoint_every_n_imports imported captures, 'always' saves after every log line (slow on large files)
+checkpoint_policy = 'stage'
+checkpoint_interval_minutes = 10
+checkpoint_every_n_imports = 25
+
+# set to true, or pass --resume after -- on the command line, to continue from the last checkpoint recorded in the run manifest
+resume_run = False
+
+# set above 1 to import the rdc files in parallel headless blender workers, each worker imports and merges a shard of the files
+# the count is capped by the number of cpus and by worker_memory_gb for each worker against the memory available
+import_worker_count = 1
+worker_memory_gb = 16
+
+# 'sequential' merges every import into the first collection, which gets slower as the model grows
+# 'tree' merges neighbouring imports in batches of merge_batch_size and then merges those results the same way, keeping each merge small
+# 'overlap' imports every capture first and then merges along the overlap of their bounding boxes so the rdc files don't need to be in order,
+# captures that overlap nothing are reported before merging, it holds every unmerged capture in memory until the merge
+# 'memory' only merges when the memory governor below needs to free memory and once all imports are done
+merge_strategy = 'tree'
+merge_batch_size = 2
+merge_overlap_margin = 0.0  # distance in meters bounding boxes can be apart and still be treated as overlapping
+
+# set to true, or pass --watch after -- on the command line, to import captures while they are still being made
+# each new rdc file is imported once its size hasn't changed for watch_stable_seconds, watching stops when watch_sentinel_file_name
+# is created in the rdc folder or after watch_idle_timeout_minutes without a new file, then packing carries on as normal
+watch_mode = False
+watch_poll_seconds = 10
+watch_stable_seconds = 30
+watch_idle_timeout_minutes = 60
+watch_sentinel_file_name = 'capture_complete.txt'
+
+# job queue, run with -- --queue <shared folder> [--memory-gb N] to take area configs from <shared folder>/jobs one at a time
+# a job is only taken when its memory_gb, or the size of its rdc files times queue_memory_factor plus queue_base_memory_gb, fits
+# the worker's budget, queue_worker_memory_gb or --memory-gb, 0 uses the memory available when the job is claimed
+queue_worker_memory_gb = 0
+queue_memory_factor = 4.0
+queue_base_memory_gb = 2.0
+queue_lease_minutes = 30  # a job whose worker stops renewing its lease for this long is picked up by another worker
+queue_max_attempts = 2
+queue_poll_seconds = 60
+queue_idle_exit_minutes = 0  # how long a worker waits for new jobs once the queue is empty
+
+# -- --plan estimates an area before running it, plan_sample_count rdc files spread through the area are imported, measured and removed
+# and the results are scaled by rdc file size along with the timelines of earlier runs, written to plan.json in the generated text folder
+plan_sample_count = 3
+
+# the settings above as they are written here, each area in a --config batch starts from these before its own settings are applied
+default_settings = {name: value for name, value in dict(globals()).items()
+                    if not name.startswith('_') and isinstance(value, (bool, int, float, str))}
+
+# config file of the area being run, passed on to shard workers so they use the same paths and settings
+area_state = {'config_filepath': None}
+
+
+def get_script_args():
+
+    # blender passes arguments after -- through to the script
+    if '--' not in sys.argv:
+        return []
+
+    return sys.argv[sys.argv.index('--') + 1:]
+
+
+def apply_area_config(config_filepath: str, config: dict):
+    """Set this script's settings and path constants from an area config, anything the config leaves out goes back to its default
+
+    Args:
+        config_filepath (str): Path of the config file
+        config (dict): Config from load_config_file
+    """
+    default_paths = {name: value for name, value in vars(constants).items() if name.isupper()}
+
+    globals().update(get_area_settings(config=config, config_filepath=config_filepath,
+                                       default_settings=default_settings))
+    globals().update(get_area_paths(config=config, config_filepath=config_filepath,
+                                    default_paths=default_paths))
+
+    area_state['config_filepath'] = config_filepath
+
+
+def reset_run_state():
+
+    # anything left from an area that ended early
+    drain_io_tasks()
+
+    save_file_callbacks.clear()
+    save_file_checks.clear()
+    pending_rdc_deletes.clear()
+    pending_image_outputs.clear()
+    clear_material_image_index()
+    image_dedup_state.update(new_image_dedup_state())
+    checkpoint_state['last_save_time'] = time.time()
+    checkpoint_state['imports_since_save'] = 0
+    profile_state['filepath'] = None
+
+
+def open_area_blend(config_filepath: str, config: dict):
+
+    if 'blend_file' not in config:
+        return
+
+    blend_filepath = os.path.join(os.path.dirname(config_filepath), config['blend_file'])
+    if os.path.exists(blend_filepath):
+        bpy.ops.wm.open_mainfile(filepath=blend_filepath)
+    else:
+        # a new area starts from an empty file saved where the config asks
+        bpy.ops.wm.read_homefile(use_empty=True)
+        bpy.ops.wm.save_as_mainfile(filepath=blend_filepath)
+
+
+def run_area_batch(config_filepaths: list[str]):
+    """Run main once for each area config in this blender session so startup and add-on registration only happen once
+
+    Args:
+        config_filepaths (list[str]): Area config files, run in the order given
+    """
+    # read and check every config first so a mistake in the last area doesn't show up hours into the batch
+    configs = [load_config_file(filepath) for filepath in config_filepaths]
+    for config_filepath, config in zip(config_filepaths, configs):
+        apply_area_config(config_filepath=config_filepath, config=config)
+        if len(configs) > 1 and 'blend_file' not in config:
+            raise ValueError(
+                f"{config_filepath} needs a blend_file when more than one area is run so areas don't save over each other")
+
+    batch_results = []
+
+    for area_number, (config_filepath, config) in enumerate(zip(config_filepaths, configs), start=1):
+        area_start = time.time()
+        print(f"\nStarting area {area_number} of {len(configs)}: {config_filepath}")
+
+        apply_area_config(config_filepath=config_filepath, config=config)
+
+        try:
+            open_area_blend(config_filepath=config_filepath, config=config)
+            main()
+            result = "completed"
+
+        except Exception as err:
+            result = f"failed: {err}"
+            check_and_create_file_path([GENERATED_TEXTS_FILE_PATH])
+            print_log(filepath=f"{GENERATED_TEXTS_FILE_PATH}RuntimeError.txt",
+                      line=f"Area {config_filepath} failed: {traceback.format_exc()}")
+
+        finally:
+            reset_run_state()
+
+        batch_results.append(
+            f"{config_filepath} {result} in {round(time.time() - area_start)} seconds")
+
+    print("\nArea batch finished")
+    for line in batch_results:
+        print(f"\t{line}")
+
+
+def run_queue_worker(queue_folder: str, memory_budget_gb: float = 0):
+    """Take area jobs from a queue folder shared between machines and run them until the queue is empty
+
+    Args:
+        queue_folder (str): Folder holding jobs/, leases/ and status/
+        memory_budget_gb (float, optional): Memory this worker may use, 0 uses the memory available when each job is claimed. Defaults to 0.
+    """
+    worker_id = get_worker_id()
+    idle_start = time.time()
+    jobs_run = 0
+
+    print(f"Queue worker {worker_id} watching {queue_folder}")
+
+    while True:
+        claimed_job = claim_next_queue_job(queue_folder=queue_folder, worker_id=worker_id,
+                                           memory_budget_gb=memory_budget_gb)
+
+        if claimed_job is None:
+            if (time.time() - idle_start) / 60 >= queue_idle_exit_minutes:
+                break
+            time.sleep(queue_poll_seconds)
+            continue
+
+        job_filepath, config, predicted_gb, budget_gb = claimed_job
+        run_queue_job(job_filepath=job_filepath, config=config, predicted_gb=predicted_gb, budget_gb=budget_gb,
+                      queue_folder=queue_folder, worker_id=worker_id)
+        jobs_run += 1
+        idle_start = time.time()
+
+    print(f"Queue worker {worker_id} finished after running {jobs_run} jobs")
+
+
+def get_queue_budget_gb(memory_budget_gb: float):
+
+    if memory_budget_gb > 0:
+        return memory_budget_gb
+
+    available_bytes = get_available_memory_bytes()
+    return math.inf if available_bytes is None else available_bytes / 1024 ** 3
+
+
+def claim_next_queue_job(queue_folder: str, worker_id: str, memory_budget_gb: float):
+    """Find the first job in the queue that isn't done, fits this worker's memory budget and can be leased
+
+    Returns:
+        tuple: (job filepath, config, predicted memory in gigabytes, worker budget in gigabytes), None if no job can be taken
+    """
+    budget_gb = get_queue_budget_gb(memory_budget_gb)
+
+    for job_filepath in list_queue_jobs(queue_folder):
+        job_name = get_job_name(job_filepath)
+        status = get_job_status(queue_folder, job_name)
+
+        if status.get('state') == 'completed':
+            continue
+
+        if status.get('attempts', 0) >= queue_max_attempts:
+            # the last attempt's worker stopped without recording a result, take its lease so only one worker marks it failed
+            if status.get('state') != 'failed' and try_acquire_lease(queue_folder=queue_folder, job_name=job_name,
+                                                                      worker_id=worker_id, lease_seconds=queue_lease_minutes * 60):
+                update_job_status(queue_folder, job_name, state='failed', finished_at=time.strftime("%Y-%m-%d %H:%M:%S"),
+                                  error=f"Stopped after {status.get('attempts', 0)} attempts without finishing")
+                release_lease(queue_folder, job_name, worker_id)
+                print(f"Queue job {job_name} failed, its last attempt stopped without finishing")
+            continue
+
+        try:
+            config = load_config_file(job_filepath)
+            job_paths = get_area_paths(config=config, config_filepath=job_filepath,
+                                       default_paths={name: value for name, value in vars(constants).items() if name.isupper()})
+        except Exception as err:
+            print(f"Skipping queue job {job_name}, its config can't be used: {err}")
+            continue
+
+        # a plan made with --plan is a better guess than the rdc size alone
+        job_plan = read_json_file(f"{job_paths['GENERATED_TEXTS_FILE_PATH']}plan.json") or {}
+        predicted_gb = config.get('memory_gb') or job_plan.get('peak_rss_gb') or predict_job_memory_gb(
+            rdc_folder=job_paths['RDC_FILE_PATH'], memory_factor=queue_memory_factor, base_memory_gb=queue_base_memory_gb)
+
+        if predicted_gb > budget_gb:
+            print(f"Skipping queue job {job_name}, it needs {round(predicted_gb, 1)} GB and this worker has {round(budget_gb, 1)} GB")
+            continue
+
+        if try_acquire_lease(queue_folder=queue_folder, job_name=job_name, worker_id=worker_id,
+                             lease_seconds=queue_lease_minutes * 60):
+            return job_filepath, config, predicted_gb, budget_gb
+
+    return None
+
+
+def run_queue_job(job_filepath: str, config: dict, predicted_gb: float, budget_gb: float, queue_folder: str, worker_id: str):
+
+    job_name = get_job_name(job_filepath)
+    lease_seconds = queue_lease_minutes * 60
+    attempts = get_job_status(queue_folder, job_name).get('attempts', 0) + 1
+
+    update_job_status(queue_folder, job_name, state='running', worker=worker_id, attempts=attempts,
+                      predicted_memory_gb=round(predicted_gb, 2), started_at=time.strftime("%Y-%m-%d %H:%M:%S"),
+                      finished_at=None, error=None, progress={})
+
+    stop_heartbeat, lease_lost = start_lease_heartbeat(queue_folder=queue_folder, job_name=job_name,
+                                                       worker_id=worker_id, lease_seconds=lease_seconds)
+
+    def check_queue_lease():
+        # long operators can hold the gil and starve the heartbeat, so the lease is renewed here before every save and the
+        # job stops if it ran out, before this worker writes over the .blend file of a worker that took the job over
+        if lease_lost.is_set() or renew_lease(queue_folder, job_name, worker_id, lease_seconds) is False:
+            lease_lost.set()
+            raise RuntimeError(f"Lost the lease on queue job {job_name} to another worker")
+
+    def record_queue_progress():
+        update_job_status(queue_folder, job_name, progress={
+            'stages_completed': list(run_manifest.get('stages_completed', [])),
+            'imported': len(run_manifest.get('imported', [])),
+            'failed': len(run_manifest.get('failed', []))})
+
+    print(f"\nStarting queue job {job_name}, attempt {attempts}")
+
+    try:
+        apply_area_config(config_filepath=job_filepath, config=config)
+
+        # a later attempt carries on from the checkpoint the last worker left
+        if attempts > 1:
+            globals()['resume_run'] = True
+        # keep the job inside the memory it was claimed with
+        if memory_budget_gb == 0 and budget_gb != math.inf:
+            globals()['memory_budget_gb'] = budget_gb
+
+        save_file_checks.append(check_queue_lease)
+        save_file_callbacks.append(record_queue_progress)
+        open_area_blend(config_filepath=job_filepath, config=config)
+        main()
+        job_changes = {'state': 'completed'}
+
+    except Exception:
+        job_changes = {'state': 'failed', 'error': traceback.format_exc()}
+
+    finally:
+        stop_heartbeat.set()
+        reset_run_state()
+
+    if lease_lost.is_set() or not holds_lease(queue_folder, job_name, worker_id):
+        print(f"Lease on queue job {job_name} was taken by another worker, not recording the result")
+        return
+
+    update_job_status(queue_folder, job_name, finished_at=time.strftime("%Y-%m-%d %H:%M:%S"), **job_changes)
+    release_lease(queue_folder, job_name, worker_id)
+
+    print(f"Queue job {job_name} {job_changes['state']}")
+
+
+def run_plan(memory_budget_gb: float = 0):
+    """Estimate the geometry, texture memory, image count, peak memory and run time of an area without running it
+
+    The rdc files, their import folders and the open .blend file are left as they were.
+
+    Args:
+        memory_budget_gb (float, optional): Memory the area has to fit in, 0 to skip the check. Defaults to 0.
+
+    Returns:
+        dict: The plan, also written to plan.json
+    """
+    check_and_create_file_path([GENERATED_TEXTS_FILE_PATH, LOG_FOLDER_PATH])
+
+    files = sorted(glob.glob(f"{RDC_FILE_PATH}*.rdc"), key=get_capture_sort_key)
+    rdc_bytes = sum(os.path.getsize(f) for f in files)
+
+    # samples are imported into an empty file that is never saved
+    bpy.ops.wm.read_homefile(use_empty=True)
+    base_rss_bytes = get_process_rss_bytes() or 0
+
+    should_stop, _, _ = check_for_plugins()
+    samples = [] if should_stop else sample_rdc_imports(
+        sample_files=pick_sample_files(files=files, sample_count=plan_sample_count))
+
+    if samples:
+        globals()['capture_resolution'] = max(sample['capture_resolution'] for sample in samples)
+    total_target_px, pixels_per_area = get_texel_pixel_budget()
+
+    import_records, runs = read_timeline_history(log_folder=LOG_FOLDER_PATH)
+
+    plan = estimate_area_plan(rdc_bytes=rdc_bytes, rdc_file_count=len(files), samples=samples, import_records=import_records, runs=runs,
+                              pixels_per_area=pixels_per_area, total_target_px=total_target_px, base_rss_bytes=base_rss_bytes)
+    plan['capture_resolution'] = capture_resolution
+    plan['max_target_image_size'] = max_target_image_size
+
+    if memory_budget_gb > 0 and 'peak_rss_gb' in plan:
+        plan['memory_budget_gb'] = memory_budget_gb
+        plan['fits_memory_budget'] = plan['peak_rss_gb'] <= memory_budget_gb
+
+    write_json_file(f"{GENERATED_TEXTS_FILE_PATH}plan.json", plan)
+    print_log(filepath=f"{GENERATED_TEXTS_FILE_PATH}plan.txt",
+              lines=[f"Plan for {RDC_FILE_PATH}"] + [f"\t{key}: {value}" for key, value in plan.items()])
+
+    return plan
+
+
+def sample_rdc_imports(sample_files: list[str]):
+    """Import each sample rdc file and measure it, the samples stay loaded until the last one is measured
+
+    Returns:
+        list[dict]: Size, import time, memory growth, geometry, surface area and texture size of each sample that imported
+    """
+    samples = []
+    existing_folders = {entry.path for entry in os.scandir(RDC_FILE_PATH) if entry.is_dir()}
+    master_col = bpy.context.scene.collection
+    sample_cols = []
+
+    for sample_number, f in enumerate(sample_files, start=1):
+        sample_col = create_col(master_col, col_name=f"plan_sample_{sample_number}")
+        sample_cols.append(sample_col.collection)
+        # measured on top of the samples before it, a run keeps every capture loaded so freeing them would hide how memory builds up
+        rss_before = get_process_rss_bytes() or 0
+        import_start = time.time()
+
+        try:
+            bpy.ops.import_rdc.google_maps(filepath=f, filter_glob=".rdc", max_blocks=-1)
+        except Exception as err:
+            print(f"Sample import of {f} failed: {err}")
+            continue
+
+        seconds = time.time() - import_start
+        objs = [obj for obj in sample_col.collection.objects if obj.type == 'MESH']
+        images = {img.name: img for img in (get_image_for_obj(obj) for obj in objs) if img is not None}
+
+        samples.append({
+            'rdc_bytes': os.path.getsize(f),
+            'seconds': seconds,
+            'rss_bytes': max((get_process_rss_bytes() or 0) - rss_before, 0),
+            'vertices': sum(len(obj.data.vertices) for obj in objs),
+            'polygons': sum(len(obj.data.polygons) for obj in objs),
+            'area_m2': float(get_objects_areas(objs).sum()),
+            'texture_bytes': sum(get_image_bytes(img) for img in images.values()),
+            'capture_resolution': max((max(img.size) for img in images.values()), default=0),
+        })
+
+    bpy.data.batch_remove([obj for col in sample_cols for obj in col.objects] + sample_cols)
+    purge_orphan_data()
+    clear_material_image_index()
+
+    # only remove import folders the samples made
+    for entry in os.scandir(RDC_FILE_PATH):
+        if entry.is_dir() and entry.path not in existing_folders:
+            remove_rdc_folder(folder_path=entry.path)
+
+    return samples
+
+
 def main():
 
+    try:
+        run_area()
+    finally:
+        # every return path, and a stage that raised, still waits for the file operations already queued
+        finish_io_tasks()
+
+
+def run_area():
+
+    set_checkpoint_policy(policy=checkpoint_policy, interval_minutes=checkpoint_interval_minutes,
+                          every_n_imports=checkpoint_every_n_imports)
+
     file_paths = [GENERATED_TEXTS_FILE_PATH, LOG_FOLDER_PATH,
-                  LILY_IMAGE_FILE_PATH, EXPORT_FBX_FILE_PATH, RDC_ERROR_PATH]
+                  LILY_IMAGE_FILE_PATH, EXPORT_FBX_FILE_PATH, RDC_ERROR_PATH, SHARD_FILE_PATH]
     check_and_create_file_path(file_paths)
 
     print_save_log(filepath=f"{LOG_FILE_PATH}",
@@ -45,31 +490,109 @@ def main():
                        line="Required Plugin Google Maps Model Importer not found, TERMINATING SCRIPT")
         return
 
+    resume = resume_run or '--resume' in get_script_args()
+
+    # manifest is always kept up to date, it is only read back when resuming
+    load_manifest(
+        filepath=f"{GENERATED_TEXTS_FILE_PATH}run_manifest.json", resume=resume)
+
+    # rdc files are only deleted once a saved checkpoint contains their import
+    if delete_pending_rdc_files not in save_file_callbacks:
+        save_file_callbacks.append(delete_pending_rdc_files)
+
+    set_image_output_format(file_format=texture_output_format, png_compression_level=texture_png_compression_level,
+                            jpeg_quality=texture_jpeg_quality)
+
+    # file deletes, moves and folder removals run in the background so imports never wait on the disk
+    start_io_worker(log_filepath=f"{GENERATED_TEXTS_FILE_PATH}io_tasks.txt",
+                    max_workers=io_worker_count, run_log_filepath=f"{LOG_FILE_PATH}")
+
+    if resume and reload_checkpoint_blend():
+        print_save_log(filepath=f"{LOG_FILE_PATH}",
+                       line=f"Resumed from checkpoint {bpy.data.filepath}")
+
+    if resume:
+        # packed images are saved in the checkpoint as generated images without their pixels so load them from their files
+        for img_name in relink_image_outputs(run_manifest['image_outputs']):
+            print_log(filepath=f"{LOG_FILE_PATH}",
+                      line=f"Texture pack image {img_name} wasn't written before the run stopped")
+
+    # json lines record of time, cpu, memory and datablock counts for each stage
+    run_id = time.strftime("%Y%m%d_%H%M%S")
+    start_profile_timeline(
+        filepath=f"{LOG_FOLDER_PATH}timeline_{run_id}.jsonl", run_id=run_id)
+
     print_save_log(filepath=f"{LOG_FILE_PATH}", line="Starting Script")
 
     # set render engine to workbench for speed
     bpy.context.scene.render.engine = "BLENDER_WORKBENCH"
 
     # clean up data by purging and removing orphans and empty collections
-    clean_up_data()
+    with profile_stage('clean_up_data'):
+        removed_counts = clean_up_data()
 
-    files = glob.glob(f"{RDC_FILE_PATH}*.rdc")
+    print_log(filepath=f"{LOG_FILE_PATH}",
+              line=f"clean_up_data removed {', '.join(f'{count} {data_type}' for data_type, count in removed_counts.items() if count) or 'nothing'}")
 
-    if not files:
-        print_save_log(
-            filepath=f"{GENERATED_TEXTS_FILE_PATH}RuntimeError.txt", line="No RDC files found")
-        return
+    if manifest_has_stage('import'):
+        main_col = run_manifest['main_col']
+        print_save_log(filepath=f"{LOG_FILE_PATH}",
+                       line=f"Skipping imports already completed, main collection is {main_col}")
+
+    elif watch_mode or '--watch' in get_script_args():
+        # skip files a previous run already imported or failed on
+        watched_files = watch_rdc_folder(folder=RDC_FILE_PATH, seen=set(run_manifest['imported']) | set(run_manifest['failed']),
+                                         sentinel_filepath=f"{RDC_FILE_PATH}{watch_sentinel_file_name}", poll_seconds=watch_poll_seconds,
+                                         stable_seconds=watch_stable_seconds, idle_timeout_minutes=watch_idle_timeout_minutes)
+
+        with profile_stage('import_and_lily_capture_merge_watch'):
+            if has_lily_capture_merger:
+                main_col = import_and_lily_capture_merge(
+                    files=watched_files, start_index=run_manifest['next_col_index'], main_col=run_manifest['main_col'])
+            else:
+                main_col = import_all_rdc_files_no_merge(
+                    files=watched_files, start_index=run_manifest['next_col_index'])
 
-    if len(files) == 1 | has_lily_capture_merger == False:
-        main_col = import_all_rdc_files_no_merge(files=files)
+        manifest_complete_stage('import')
         print_save_log(filepath=f"{LOG_FILE_PATH}",
-                       line="import_all_rdc_files_no_merge completed")
+                       line="watch mode imports completed", is_stage_boundary=True)
 
     else:
-        main_col = import_and_lily_capture_merge(files=files)
+        # skip files a previous run already imported or failed on
+        done_files = set(run_manifest['imported']) | set(
+            run_manifest['failed'])
+        # capture order keeps each shard and each merge pass a run of neighbouring captures
+        files = [f for f in sorted(glob.glob(
+            f"{RDC_FILE_PATH}*.rdc"), key=get_capture_sort_key) if f not in done_files]
+
+        if not files and run_manifest['main_col'] == "":
+            print_save_log(
+                filepath=f"{GENERATED_TEXTS_FILE_PATH}RuntimeError.txt", line="No RDC files found")
+            return
 
-        print_save_log(filepath=f"{LOG_FILE_PATH}",
-                       line="import_and_lily_capture_merge completed")
+        if len(files) == 1 | has_lily_capture_merger == False:
+            with profile_stage('import_all_rdc_files_no_merge', files=len(files)):
+                main_col = import_all_rdc_files_no_merge(
+                    files=files, start_index=run_manifest['next_col_index'])
+            manifest_complete_stage('import')
+            print_save_log(filepath=f"{LOG_FILE_PATH}",
+                           line="import_all_rdc_files_no_merge completed", is_stage_boundary=True)
+
+        elif import_worker_count > 1:
+            with profile_stage('import_rdc_files_sharded', files=len(files)):
+                main_col = import_rdc_files_sharded(
+                    files=files, main_col=run_manifest['main_col'])
+            manifest_complete_stage('import')
+            print_save_log(filepath=f"{LOG_FILE_PATH}",
+                           line="import_rdc_files_sharded completed", is_stage_boundary=True)
+
+        else:
+            with profile_stage('import_and_lily_capture_merge', files=len(files)):
+                main_col = import_and_lily_capture_merge(
+                    files=files, start_index=run_manifest['next_col_index'], main_col=run_manifest['main_col'])
+            manifest_complete_stage('import')
+            print_save_log(filepath=f"{LOG_FILE_PATH}",
+                           line="import_and_lily_capture_merge completed", is_stage_boundary=True)
 
     if (
         main_col == ""
@@ -79,74 +602,119 @@ def main():
         print_save_log(filepath=f"{GENERATED_TEXTS_FILE_PATH}RuntimeError.txt", line="No RDC files successfully imported, ending script")
         return
 
-    if has_texture_packer:
-        col_name = has_texture_packer_perform_pack_ops(main_col)
+    if dedup_capture_images and not manifest_has_stage('dedup_images'):
+        with profile_stage('dedup_images'):
+            dedup_object_images()
+
+    if consolidate_capture_materials and not manifest_has_stage('consolidate_materials'):
+        with profile_stage('consolidate_materials'):
+            consolidate_object_materials()
 
-    turn_auto_smooth_on_off(obj_name=complete_obj_name,
-                            turn_on_off=auto_smooth_on_off, auto_smooth_angle=auto_smooth_angle)
+    if has_texture_packer and manifest_has_stage('pack'):
+        col_name = run_manifest['pack_result']
 
-    set_origin_to_center(obj_name=complete_obj_name)
+    elif has_texture_packer:
+        with profile_stage('has_texture_packer_perform_pack_ops'):
+            col_name = has_texture_packer_perform_pack_ops(main_col)
+
+    with profile_stage('turn_auto_smooth_on_off'):
+        turn_auto_smooth_on_off(obj_name=complete_obj_name,
+                                turn_on_off=auto_smooth_on_off, auto_smooth_angle=auto_smooth_angle)
+
+    with profile_stage('set_origin_to_center'):
+        set_origin_to_center(obj_name=complete_obj_name)
 
     if remove_doubles_verts:
 
-        remove_doubles_from_obj(
-            obj_name=complete_obj_name, merge_distance=merge_distance)
+        with profile_stage('remove_doubles_from_obj'):
+            remove_doubles_from_obj(
+                obj_name=complete_obj_name, merge_distance=merge_distance)
 
         print_save_log(filepath=f"{LOG_FILE_PATH}",
-                       line="remove_doubles_from_obj completed")
+                       line="remove_doubles_from_obj completed", is_stage_boundary=True)
 
     # set shading to flat if required
     if shade_flat:
 
-        shade_face_flat(obj_name=complete_obj_name)
+        with profile_stage('shade_face_flat'):
+            shade_face_flat(obj_name=complete_obj_name)
 
         print_save_log(filepath=f"{LOG_FILE_PATH}",
-                       line="shade_face_flat completed")
+                       line="shade_face_flat completed", is_stage_boundary=True)
 
     # smooth face normals and vertices
     if face_shade_smooth:
 
-        # smoothes vector normals
-        bpy.ops.mesh.smooth_normals(factor=vert_smooth_factor)
+        with profile_stage('face_shade_smooth'):
+            # smoothes vector normals
+            bpy.ops.mesh.smooth_normals(factor=vert_smooth_factor)
 
-        # shade smooth faces this will contridict the shade flat above but it is required for nanite to work correctly
-        bpy.ops.mesh.faces_shade_smooth()
+            # shade smooth faces this will contridict the shade flat above but it is required for nanite to work correctly
+            bpy.ops.mesh.faces_shade_smooth()
 
 
     if export_model:
-        export_model_to_fbx(
-            col_name=col_name, export_file_path=f"{EXPORT_FBX_FILE_PATH}{complete_obj_name}.fbx")
+        with profile_stage('export_model_to_fbx'):
+            export_model_to_fbx(
+                col_name=col_name, export_file_path=f"{EXPORT_FBX_FILE_PATH}{complete_obj_name}.fbx")
 
         print_save_log(filepath=f"{LOG_FILE_PATH}",
-                       line="export_model_to_fbx completed")
+                       line="export_model_to_fbx completed", is_stage_boundary=True)
 
     # update view layer so orphan data can be removed
     # bpy.context.view_layer.update()
 
     print('Removing empty collections')
-    remove_empty_collections()
+    with profile_stage('remove_empty_collections'):
+        remove_empty_collections()
 
     # uncomment this to perform a clean up of orphan data and purge as well
     # it is quicker to do in editor at this point due to the number of objects and purging at this point will remove all
     # clean_up_data()
 
     print_save_log(filepath=f"{LOG_FILE_PATH}",
-                   line="remove_empty_collections completed")
+                   line="remove_empty_collections completed", is_stage_boundary=True)
 
     # set render engine to workbench for speed
     bpy.context.scene.render.engine = "BLENDER_EEVEE"
 
+    # nothing reads the packed images from here on so the final file can point them at their written files
+    relink_image_outputs(run_manifest['image_outputs'])
+
     print_save_log(filepath=f"{LOG_FILE_PATH}",
-                   line="Script Completed")
+                   line="Script Completed", is_stage_boundary=True)
+
+
+def finish_io_tasks():
+
+    if io_state['executor'] is None:
+        return
+
+    with profile_stage('drain_io_tasks'):
+        completed, failed = drain_io_tasks()
+
+    print_log(filepath=f"{LOG_FILE_PATH}",
+              line=f"Background file operations finished, {completed} completed, {failed} failed, see io_tasks.txt")
+
+
+# rdc files waiting for a saved checkpoint before they are deleted
+pending_rdc_deletes = []
+
+
+def delete_pending_rdc_files():
+
+    while pending_rdc_deletes:
+        file_path = pending_rdc_deletes.pop(0)
+        submit_io_task(f"delete {file_path}", delete_rdc_files, file_path)
 
 
 def delete_rdc_files(file_path: str):
 
-    print_save_log(
+    print_log(
         filepath=f"{GENERATED_TEXTS_FILE_PATH}deleted_files.txt", line=f"Deleting {file_path}")
     # delete rdc file
     os.remove(file_path)
-    print_save_log(
+    print_log(
         filepath=f"{GENERATED_TEXTS_FILE_PATH}deleted_files.txt", line=f"Deleted {file_path}")
 
 
@@ -154,71 +722,119 @@ def has_texture_packer_perform_pack_ops(main_col):
 
     print_save_log(filepath=f"{LOG_FILE_PATH}",
                    line="Starting has_texture_packer_perform_pack_ops")
-    # SELECT ALL OBJS
-    bpy.ops.object.select_all(action='SELECT')
 
-    # Apply Transform scale, location, rotation
-    bpy.ops.object.transform_apply(
-        location=True, rotation=True, scale=True, properties=True, isolate_users=False)
+    global capture_resolution
 
-    # DESELECT ALL OBJS
-    bpy.ops.object.select_all(action='DESELECT')
+    # resuming after the packs were grouped, go straight to texture packing
+    if manifest_has_stage('pack_grouping'):
+        capture_resolution = run_manifest['capture_resolution']
+        collection_names = list(run_manifest['pack_groups'].keys())
+
+        print_save_log(filepath=f"{LOG_FILE_PATH}",
+                       line=f"Skipping pack grouping already completed, packs: {collection_names}")
+
+        return texture_pack_group_and_clean_up(collection_names)
+
+    with profile_stage('transform_apply'):
+        # SELECT ALL OBJS
+        bpy.ops.object.select_all(action='SELECT')
+
+        # Apply Transform scale, location, rotation
+        bpy.ops.object.transform_apply(
+            location=True, rotation=True, scale=True, properties=True, isolate_users=False)
+
+        # DESELECT ALL OBJS
+        bpy.ops.object.select_all(action='DESELECT')
 
     # main_col = 'col_1' # debug
 
-    # comment these two lines out if you want to override capture size
-    global capture_resolution
-    capture_resolution = get_max_image_size()
+    # comment this line out if you want to override capture size
+    with profile_stage('get_max_image_size'):
+        capture_resolution = get_max_image_size()
+    run_manifest['capture_resolution'] = capture_resolution
 
     print_save_log(filepath=f"{LOG_FILE_PATH}",
-                   line="get_max_image_size completed")
+                   line="get_max_image_size completed", is_stage_boundary=True)
 
-    min_max_coords, obj_dict = rename_objs_and_store_location(main_col)
+    with profile_stage('rename_objs_and_store_location'):
+        min_max_coords, obj_dict = rename_objs_and_store_location(main_col)
 
     print_save_log(filepath=f"{LOG_FILE_PATH}",
-                   line="rename_objs_and_store_location completed")
+                   line="rename_objs_and_store_location completed", is_stage_boundary=True)
 
-    area_size = get_area_size_for_col_and_save_to_file(main_col)
+    with profile_stage('get_area_size_for_col_and_save_to_file'):
+        area_size = get_area_size_for_col_and_save_to_file(main_col)
 
     print_save_log(filepath=f"{LOG_FILE_PATH}",
-                   line="get_area_size_for_col_and_save_to_file completed")
+                   line="get_area_size_for_col_and_save_to_file completed", is_stage_boundary=True)
 
     required_images, _, _ = get_texel_denisty_requirements(area_size=area_size)
 
     print_save_log(filepath=f"{LOG_FILE_PATH}",
-                   line="get_texel_denisty_requirements completed")
+                   line="get_texel_denisty_requirements completed", is_stage_boundary=True)
 
-    box_sections = define_guide_box(min_max_coords, required_images)
+    if pack_strategy == 'kd':
+        with profile_stage('sort_objects_into_area_weighted_packs'):
+            collection_names = sort_objects_into_area_weighted_packs(
+                obj_dict=obj_dict, area_size_dict=area_size)
+
+        return record_pack_grouping_and_texture_pack(collection_names, "sort_objects_into_area_weighted_packs completed")
+
+    with profile_stage('define_guide_box'):
+        box_sections = define_guide_box(min_max_coords, required_images)
 
     print_save_log(filepath=f"{LOG_FILE_PATH}",
-                   line="define_guide_box completed")
+                   line="define_guide_box completed", is_stage_boundary=True)
 
-    grouping_dict = sort_object_into_location_groups(
-        map_chunk=box_sections, obj_dict=obj_dict)
+    with profile_stage('sort_object_into_location_groups'):
+        grouping_dict = sort_object_into_location_groups(
+            map_chunk=box_sections, obj_dict=obj_dict)
 
     print_save_log(filepath=f"{LOG_FILE_PATH}",
-                   line="sort_object_into_location_groups completed")
+                   line="sort_object_into_location_groups completed", is_stage_boundary=True)
+
+    with profile_stage('sort_groupings_into_new_col'):
+        collection_names = sort_groupings_into_new_col(
+            area_groupings=grouping_dict, area_size_dict=area_size)
+
+    return record_pack_grouping_and_texture_pack(collection_names, "sort_groupings_into_new_col completed")
+
+
+def record_pack_grouping_and_texture_pack(collection_names: list[str], completed_line: str):
 
-    collection_names = sort_groupings_into_new_col(
-        area_groupings=grouping_dict)
+    # record the pack grouping so a resumed run doesn't need to regroup
+    run_manifest['pack_groups'] = {col: [
+        obj.name for obj in bpy.data.collections.get(col).objects] for col in collection_names}
+    manifest_complete_stage('pack_grouping')
 
     print_save_log(filepath=f"{LOG_FILE_PATH}",
-                   line="sort_groupings_into_new_col completed")
+                   line=completed_line, is_stage_boundary=True)
 
     # collection_names=['Pack_1'] # debug
 
-    result = texture_pack_group(col_names=collection_names)
+    return texture_pack_group_and_clean_up(collection_names)
+
+
+def texture_pack_group_and_clean_up(collection_names: list[str]):
+
+    with profile_stage('texture_pack_group', packs=len(collection_names)):
+        result = texture_pack_group(col_names=collection_names)
 
     print_save_log(filepath=f"{LOG_FILE_PATH}",
-                   line="texture_pack_group completed")
+                   line="texture_pack_group completed", is_stage_boundary=True)
 
-    # all textures complete remove redundant import folders
-    remove_all_rdc_import_folders(files=glob.glob(f"{RDC_FILE_PATH}*.rdc"))
-    
-    print_save_log(filepath=f"{LOG_FILE_PATH}",line="Completed remove_all_rdc_import_folders")
+    # all textures complete remove redundant import folders, include imported files that have already been deleted
+    with profile_stage('remove_all_rdc_import_folders'):
+        remove_all_rdc_import_folders(files=sorted(
+            set(glob.glob(f"{RDC_FILE_PATH}*.rdc")) | set(run_manifest['imported'])))
     
+    print_save_log(filepath=f"{LOG_FILE_PATH}",line="Completed remove_all_rdc_import_folders", is_stage_boundary=True)
+
+    run_manifest['pack_result'] = result
+    manifest_complete_stage('pack')
+
     print_save_log(filepath=f"{LOG_FILE_PATH}",
-                   line="Completed has_texture_packer_perform_pack_ops")
+                   line="Completed has_texture_packer_perform_pack_ops", is_stage_boundary=True)
     
 
     return result
@@ -232,13 +848,11 @@ def get_texel_denisty_requirements(area_size: dict):
         return None
 
     target_image_quality = 1024 * max_target_image_size
-    total_target_px = target_image_quality * target_image_quality
     capture_texel_density = capture_resolution / 100  # TODO
+    total_target_px, pixels_per_area = get_texel_pixel_budget()
     current_area_total = area_size["Total"]
-    # as the model is in meter square convert to cm square as tex denisty is calculated per cm
-    current_area_total_cm = current_area_total * 10000
     # calculate number of pixels for mesh area using target density
-    total_number_of_pixels_req = current_area_total_cm * capture_texel_density
+    total_number_of_pixels_req = current_area_total * pixels_per_area
 
     required_number_of_images = total_number_of_pixels_req / total_target_px
 
@@ -251,6 +865,20 @@ def get_texel_denisty_requirements(area_size: dict):
     return int(math.ceil(required_number_of_images)), total_target_px, total_number_of_pixels_req
 
 
+def get_texel_pixel_budget():
+    """Get the pixels available in one target image and the pixels required per meter square of mesh area
+
+    Returns:
+        tuple: (total_target_px, pixels_per_area)
+    """
+    target_image_quality = 1024 * max_target_image_size
+    total_target_px = target_image_quality * target_image_quality
+    capture_texel_density = capture_resolution / 100  # TODO
+
+    # as the model is in meter square convert to cm square as tex denisty is calculated per cm
+    return total_target_px, 10000 * capture_texel_density
+
+
 def check_for_plugins():
 
     print_save_log(filepath=f"{LOG_FILE_PATH}",
@@ -302,15 +930,25 @@ def check_for_plugins():
 
 def import_error_handle(error: str, error_type:str, filepath: str, errors_raised: int):
     
-    print_save_log(
+    print_log(
         filepath=f"{GENERATED_TEXTS_FILE_PATH}import_rdc_error_log.txt", line=f"Error importing {filepath} : {error_type}")
+    manifest_add('failed', filepath)
     print("See import_rdc_error_log.txt for more details")
     write_to_file(
         filepath=f"{GENERATED_TEXTS_FILE_PATH}import_rdc_error_log.txt", line=f"Logged Error: {error}")
     
     print("Moving RDC file to RDC_ERROR folder")
+    submit_io_task(f"move {filepath} to error folder",
+                   move_rdc_file_to_error_folder, filepath)
+
+    errors_raised += 1
+    
+    return False, errors_raised
+
+
+def move_rdc_file_to_error_folder(filepath: str):
+
     _, tail = os.path.split(filepath)
-    filename = os.path.splitext(tail)[0]
     # check if RDC file exists already in error folder
     if os.path.exists(RDC_ERROR_PATH + tail):
         # if it does delete it
@@ -320,33 +958,108 @@ def import_error_handle(error: str, error_type:str, filepath: str, errors_raised
     shutil.move(filepath, RDC_ERROR_PATH)
     
     # find rdc folder and delete it
-    find_rdc_folder_and_remove(filename=filename)
-    
-    errors_raised += 1
-    
-    return False, errors_raised
+    remove_rdc_import_folders(files=[filepath])
 
 
-def find_rdc_folder_and_remove(filename:str):
-    
-    # get all folders from RDC folder
-    rdc_import_folders = os.listdir(RDC_FILE_PATH)
-    
-    for folder in rdc_import_folders:
-        if filename in folder:
-            remove_rdc_folder(folder_path=RDC_FILE_PATH + folder)
-            print(f"Found and Removed folder {folder}")
-            return
-    
-    return # TODO add error handle for not finding folder
+def get_rdc_stem(filepath: str):
+
+    _, tail = os.path.split(filepath)
+    return os.path.splitext(tail)[0]
+
+
+def match_rdc_stem(folder_name: str, stems: set[str]):
+    """Find the rdc file an import folder was extracted from
+
+    Args:
+        folder_name (str): Name of the folder in the rdc folder
+        stems (set[str]): File names of the rdc files without the extension
+
+    Returns:
+        str: The longest stem the folder name starts with followed by the end of the name or a separator, None if no stem matches
+    """
+    # longest first and only at a separator so capture_1 never claims capture_12 or capture_1_2
+    for end in range(len(folder_name), 0, -1):
+        if end < len(folder_name) and folder_name[end].isalnum():
+            continue
+        if folder_name[:end] in stems:
+            return folder_name[:end]
+
+    return None
+
+
+# every known rdc stem and the import folders extracted from each, built by one scan and shared by the error
+# handling and the final clean up, both of which run on io worker threads
+rdc_folder_index = {'stems': set(), 'folders': {}}
+rdc_folder_index_lock = threading.Lock()
+
+
+def get_known_rdc_files():
+
+    # files already imported or failed may have been deleted or moved but their folders can still be there
+    return set(glob.glob(f"{RDC_FILE_PATH}*.rdc")) | set(run_manifest['imported']) | set(run_manifest['failed'])
+
+
+def index_rdc_import_folders(files: list[str]):
+    """Scan the rdc folder once and map each rdc file to the folders extracted from it
+
+    Args:
+        files (list[str]): Filepaths of every known rdc file, a folder is matched to the longest stem so all of them are needed
+
+    Returns:
+        dict[str, list[str]]: rdc file stem to the folder paths extracted from it
+    """
+    stems = {get_rdc_stem(filepath) for filepath in files}
+    folder_index = {stem: [] for stem in stems}
+    error_folder = os.path.normcase(os.path.normpath(RDC_ERROR_PATH))
+
+    with os.scandir(RDC_FILE_PATH) as entries:
+        for entry in entries:
+            if not entry.is_dir() or os.path.normcase(os.path.normpath(entry.path)) == error_folder:
+                continue
+
+            stem = match_rdc_stem(folder_name=entry.name, stems=stems)
+            if stem is not None:
+                folder_index[stem].append(entry.path)
+
+    rdc_folder_index['stems'] = stems
+    rdc_folder_index['folders'] = folder_index
+
+    return folder_index
+
+
+def remove_rdc_import_folders(files: list[str]):
+
+    remove_stems = {get_rdc_stem(filepath) for filepath in files}
+
+    with rdc_folder_index_lock:
+        # the shared index is reused unless a file is new to it or its folder was extracted after the last scan
+        if any(stem not in rdc_folder_index['stems'] or not rdc_folder_index['folders'][stem] for stem in remove_stems):
+            index_rdc_import_folders(files=get_known_rdc_files() | set(files))
+
+        folder_paths_to_remove = {stem: rdc_folder_index['folders'].pop(stem, []) for stem in remove_stems}
+        for stem in remove_stems:
+            rdc_folder_index['folders'][stem] = []
+
+    removed = 0
+    for folder_paths in folder_paths_to_remove.values():
+        for folder_path in folder_paths:
+            remove_rdc_folder(folder_path=folder_path)
+            removed += 1
+
+    not_found = sorted(stem for stem, folder_paths in folder_paths_to_remove.items() if not folder_paths)
+
+    lines = [f"Removed {removed} import folders for {len(folder_paths_to_remove)} rdc files"]
+    if not_found:
+        lines.append(f"No import folder found for: {', '.join(not_found)}")
+
+    print_log(filepath=f"{GENERATED_TEXTS_FILE_PATH}removed_rdc_folders.txt", lines=lines)
 
 
 def remove_all_rdc_import_folders(files: list[str]):
-    
-    for filepath in files:
-        _, tail = os.path.split(filepath)
-        filename = os.path.splitext(tail)[0]
-        find_rdc_folder_and_remove(filename=filename)
+
+    # one scan of the rdc folder for every file, removals run together as one background batch
+    submit_io_task(f"remove import folders for {len(files)} rdc files",
+                   remove_rdc_import_folders, files)
         
 
 def remove_rdc_folder(folder_path: str):
@@ -357,16 +1070,19 @@ def remove_rdc_folder(folder_path: str):
         shutil.rmtree(folder_path)
 
 
-def import_and_lily_capture_merge(files: list[str]):
+def import_and_lily_capture_merge(files, start_index: int = 1, main_col: str = ""):
 
     start_time = time.time()
     errors_raised = 0
+    files_processed = 0
+
+    # files is a generator in watch mode so the total isn't known
+    file_count = len(files) if isinstance(files, list) else None
 
     master_col = bpy.context.scene.collection
-    main_col = ""
 
     print_save_log(
-        filepath=f"{GENERATED_TEXTS_FILE_PATH}importing_rdc_full_log.txt", line=f"Starting RDC Imports, Number of files to import: {len(files)}")
+        filepath=f"{GENERATED_TEXTS_FILE_PATH}importing_rdc_full_log.txt", line=f"Starting RDC Imports, Number of files to import: {file_count if file_count is not None else 'watching for files'}")
 
     print("Please wait for imports to complete, this may take a while")
     # import progress
@@ -374,8 +1090,15 @@ def import_and_lily_capture_merge(files: list[str]):
     wm.progress_begin(0, 100)
     wm.progress_update(0)
 
-    for i, f in enumerate(files, start=1):
+    if merge_strategy == 'tree':
+        # the stack is kept in the manifest so a resumed run carries on with the same tree
+        run_manifest['merge_stack'] = start_tree_merge(
+            batch_size=merge_batch_size, stack=run_manifest.get('merge_stack'))
+
+    for file_number, f in enumerate(files, start=1):
         _, tail = os.path.split(f)
+        # collection index continues on from a resumed run so names don't clash
+        i = start_index + file_number - 1
         col_name = f"col_{i}"
 
         my_col = create_col(master_col, col_name=col_name)
@@ -383,31 +1106,66 @@ def import_and_lily_capture_merge(files: list[str]):
         successful_import = False
 
         print(f"Attempting import file named {tail}")
-        successful_import, errors_raised = attempt_import_of_rdc_file(
-            file=f, name=tail, errors_raised=errors_raised)
+        with profile_stage('attempt_import_of_rdc_file', capture=tail, rdc_bytes=os.path.getsize(f)):
+            successful_import, errors_raised = attempt_import_of_rdc_file(
+                file=f, name=tail, errors_raised=errors_raised)
+
+        if successful_import:
+            index_object_materials(bpy.data.collections[col_name].objects)
+
+            if dedup_capture_images:
+                dedup_collection_images(col_name)
+
+        run_manifest['next_col_index'] = i + 1
+        files_processed = file_number
 
         # update progress
-        current_progress = i / len(files) * 100
-        current_progress = round(current_progress, 2)
-        wm.progress_update(current_progress)
-        print(f"Current progress for import is: {current_progress}%")
+        if file_count is not None:
+            current_progress = file_number / file_count * 100
+            current_progress = round(current_progress, 2)
+            wm.progress_update(current_progress)
+            print(f"Current progress for import is: {current_progress}%")
+        else:
+            current_progress = file_number
+            print(f"Imported {file_number} files so far, watching for more")
 
-        
-        if successful_import and main_col == "" and i - errors_raised == 1:
+        main_col = govern_memory_after_import(main_col=main_col)
+        run_manifest['main_col'] = main_col
+
+        if successful_import and merge_strategy == 'overlap':
+            # merged once every capture is imported
+            bpy.data.collections[col_name].hide_viewport = True
+            my_col.hide_viewport = True
+            run_manifest.setdefault('overlap_cols', []).append(col_name)
+            run_manifest.setdefault('overlap_files', {})[col_name] = f
+
+        elif successful_import and merge_strategy == 'tree':
+            main_col = tree_merge_push(col_name=col_name)
+            run_manifest['main_col'] = main_col
+
+        elif successful_import and merge_strategy == 'memory' and main_col != "":
+            # merged when the memory governor needs to or after the last import
+            bpy.data.collections[col_name].hide_viewport = True
+            my_col.hide_viewport = True
+
+        elif successful_import and main_col == "":
             # first successful import and is only one needed to be hidden needs to be hidden for performance as sequential imports will be merged
             bpy.data.collections[col_name].hide_viewport = True
             my_col.hide_viewport = True
             # set main col to this col as it will be the first one merged and is the first successful import
             main_col = col_name
-            continue
+            run_manifest['main_col'] = main_col
+            manifest_add('merged', f)
 
-        if successful_import:
+        elif successful_import:
             print_save_log(filepath=f"{GENERATED_TEXTS_FILE_PATH}import_and_lily_capture_merge.txt",
                         line=f"Merging current imports, to prevent memory issues, this may take a while, current progress for all imports is {current_progress}%")
             layer_col = bpy.context.view_layer.layer_collection
             # DESELECT ALL OBJS
             bpy.ops.object.select_all(action='DESELECT')
             main_col = lily_capture_merger_call(layer_col=layer_col)
+            run_manifest['main_col'] = main_col
+            manifest_add('merged', f)
 
         else:
             failed_import_objs = bpy.data.collections[col_name].objects
@@ -421,26 +1179,227 @@ def import_and_lily_capture_merge(files: list[str]):
             # remove empty collections
             remove_empty_collections()
 
+        if successful_import:
+            # the collection index, main collection and merge state are recorded above so a resume carries on after this capture
+            checkpoint_save('Saved after import', imported_capture=True)
 
     # end progress
     wm.progress_end()
 
+    if merge_strategy == 'tree':
+        main_col = tree_merge_finish(
+            log_filepath=f"{GENERATED_TEXTS_FILE_PATH}import_and_lily_capture_merge.txt")
+
+    elif merge_strategy == 'memory' and main_col != "":
+        bpy.ops.object.select_all(action='DESELECT')
+        main_col = lily_capture_merger_call(
+            layer_col=bpy.context.view_layer.layer_collection)
+
+    elif merge_strategy == 'overlap':
+        main_col, unmerged_components = overlap_graph_merge(col_names=run_manifest.get('overlap_cols', []),
+                                                            log_filepath=f"{GENERATED_TEXTS_FILE_PATH}import_and_lily_capture_merge.txt", margin=merge_overlap_margin)
+
+        # captures outside the main group stay in their own collections so they aren't recorded as merged
+        for component in unmerged_components:
+            for col_name in component:
+                manifest_add('unmerged', run_manifest.get('overlap_files', {}).get(col_name, col_name))
+
+    if merge_strategy in ('tree', 'overlap', 'memory'):
+        run_manifest['main_col'] = main_col
+        for f in run_manifest['imported']:
+            if f not in run_manifest['unmerged']:
+                manifest_add('merged', f)
+
     print_save_log(
-        filepath=f"{GENERATED_TEXTS_FILE_PATH}importing_rdc_full_log.txt", lines=["Imports have been completed.", f"It took {time.time() - start_time} seconds to complete.",f"Total number of RDC files: {len(files)}",f"Total Successful Imports: {len(files)-errors_raised}", f"Number of Unsuccessful Imports: {errors_raised}"])
+        filepath=f"{GENERATED_TEXTS_FILE_PATH}importing_rdc_full_log.txt", lines=["Imports have been completed.", f"It took {time.time() - start_time} seconds to complete.",f"Total number of RDC files: {files_processed}",f"Total Successful Imports: {files_processed-errors_raised}", f"Number of Unsuccessful Imports: {errors_raised}"])
 
     # return main col or col_1 if no merges
     return main_col
 
 
-def import_all_rdc_files_no_merge(files: list[str]):
+def govern_memory_after_import(main_col: str):
+    """Check the process memory against memory_budget_gb and free image buffers, purge orphan data or merge pending imports
+    when it goes over each fraction of the budget, checking again after each step
+
+    Args:
+        main_col (str): Current main collection, empty if nothing has been imported yet
+
+    Returns:
+        str: The main collection after any merge
+    """
+    if memory_budget_gb <= 0:
+        return main_col
+
+    budget = memory_budget_gb * 1024 ** 3
+    rss_start = rss = get_process_rss_bytes()
+
+    if rss is None:
+        return main_col
+
+    actions = []
+
+    if rss > budget * memory_free_images_fraction:
+        actions.append(f"freed {free_image_buffers()} image buffers")
+        rss = get_process_rss_bytes()
+
+    if rss > budget * memory_purge_fraction:
+        removed_counts = purge_orphan_data()
+        actions.append(f"purged {sum(removed_counts.values())} orphan data blocks")
+        rss = get_process_rss_bytes()
+
+    # sequential merges every import already and the overlap strategy needs every capture before it can merge
+    if rss > budget * memory_merge_fraction and main_col != "" and merge_strategy in ('memory', 'tree'):
+        bpy.ops.object.select_all(action='DESELECT')
+
+        if merge_strategy == 'tree':
+            collapse_tree_merge_stack()
+        else:
+            main_col = lily_capture_merger_call(
+                layer_col=bpy.context.view_layer.layer_collection)
+            set_collection_hidden(main_col, True)
+
+        actions.append("merged pending imports")
+        rss = get_process_rss_bytes()
+
+    if actions:
+        print_log(filepath=f"{GENERATED_TEXTS_FILE_PATH}memory_governor.txt",
+                  line=f"Memory {round(rss_start / 1024 ** 3, 2)} GB of {memory_budget_gb} GB budget, {', '.join(actions)}, now {round(rss / 1024 ** 3, 2)} GB")
+
+    return main_col
+
+
+def import_rdc_files_sharded(files: list[str], main_col: str = ""):
+
+    start_time = time.time()
+
+    worker_count = get_worker_count(
+        requested_workers=import_worker_count, worker_memory_gb=worker_memory_gb)
+
+    shards = split_files_into_shards(files=files, shard_count=worker_count)
+
+    print_save_log(filepath=f"{GENERATED_TEXTS_FILE_PATH}importing_rdc_full_log.txt",
+                   line=f"Starting sharded RDC Imports, Number of files to import: {len(files)}, Number of workers: {len(shards)}")
+
+    shard_jobs = write_shard_jobs(shards=shards, shard_folder=SHARD_FILE_PATH)
+
+    config_args = ['--config', area_state['config_filepath']] if area_state['config_filepath'] else []
+    shard_results, failed_shard_jobs = run_shard_workers(shard_jobs=shard_jobs, script_path=os.path.realpath(
+        __file__), log_folder=LOG_FOLDER_PATH, extra_args=config_args)
+
+    # workers never delete rdc files, a failed shard still has every file except the ones moved to the error folder
+    retry_files = [f for shard_job in failed_shard_jobs for f in shard_job['files'] if os.path.exists(f)]
+    retry_col = ""
+
+    if retry_files:
+        print_save_log(filepath=f"{GENERATED_TEXTS_FILE_PATH}importing_rdc_full_log.txt",
+                       line=f"{len(failed_shard_jobs)} shard workers failed, importing their {len(retry_files)} files here so the merge has no gaps")
+
+        # imported before the shard collections are appended so the merger only sees the retried captures
+        retry_col = import_and_lily_capture_merge(
+            files=retry_files, start_index=run_manifest['next_col_index'])
+
+    for shard_result in shard_results:
+        for f in shard_result['imported']:
+            manifest_add('imported', f)
+        for f in shard_result['failed']:
+            manifest_add('failed', f)
+
+    shard_col_names = append_shard_collections(shard_results=shard_results)
+
+    if retry_col:
+        shard_col_names.insert(0, retry_col)
+
+    if not shard_col_names:
+        return main_col
+
+    # hide all but the first collection as the merger will unhide each collection as it is merged
+    layer_col = bpy.context.view_layer.layer_collection
+    for k, v in layer_col.children.items()[1:]:
+        bpy.data.collections[k].hide_viewport = True
+        v.hide_viewport = True
+
+    # merge the shards together, shards are in capture order so each one overlaps the previous
+    bpy.ops.object.select_all(action='DESELECT')
+    main_col = lily_capture_merger_call(layer_col=layer_col)
+    run_manifest['main_col'] = main_col
+
+    for shard_result in shard_results:
+        for f in shard_result['imported']:
+            manifest_add('merged', f)
+
+        # deleted after the next save, which holds the merged shard, so a resumed run never loses an rdc file it still needs
+        pending_rdc_deletes.extend(shard_result['delete_files'])
+
+    print_save_log(filepath=f"{GENERATED_TEXTS_FILE_PATH}importing_rdc_full_log.txt", lines=["Sharded imports have been completed.", f"It took {time.time() - start_time} seconds to complete.",
+                   f"Total number of RDC files: {len(files)}", f"Number of shards merged: {len(shard_results)} of {len(shards)}",
+                   f"Number of failed shards imported here: {len(failed_shard_jobs)}"])
+
+    return main_col
+
+
+def run_shard_worker(shard_job_filepath: str):
+    """Entry point for a headless worker launched by import_rdc_files_sharded, imports and merges one shard of rdc files
+    into a new .blend file and writes the result for the coordinator to pick up
+
+    Args:
+        shard_job_filepath (str): Path to the shard job json written by write_shard_jobs
+    """
+    with open(shard_job_filepath, "r") as job_file:
+        shard_job = json.load(job_file)
+
+    # start from an empty file and save it as the shard file so checkpoints never overwrite another file
+    bpy.ops.wm.read_homefile(use_empty=True)
+    bpy.ops.wm.save_as_mainfile(filepath=shard_job['blend_filepath'])
+
+    set_checkpoint_policy(policy=checkpoint_policy, interval_minutes=checkpoint_interval_minutes,
+                          every_n_imports=checkpoint_every_n_imports)
+    load_manifest(filepath=shard_job['manifest_filepath'])
+    start_io_worker(log_filepath=f"{GENERATED_TEXTS_FILE_PATH}io_tasks_shard_{shard_job['shard_index']}.txt",
+                    max_workers=io_worker_count, run_log_filepath=f"{LOG_FILE_PATH}")
+    start_profile_timeline(
+        filepath=f"{LOG_FOLDER_PATH}timeline_shard_{shard_job['shard_index']}.jsonl")
+
+    bpy.context.scene.render.engine = "BLENDER_WORKBENCH"
+
+    main_col = import_and_lily_capture_merge(files=shard_job['files'])
+
+    collection_name = ""
+    if main_col and bpy.data.collections.get(main_col) is not None:
+        bpy.data.collections[main_col].name = shard_job['collection_name']
+        collection_name = bpy.data.collections[shard_job['collection_name']].name
+
+    save_file('Saved shard')
+
+    # failed rdc files must be moved before the coordinator reads the result
+    finish_io_tasks()
+
+    shard_result = {
+        'shard_index': shard_job['shard_index'],
+        'blend_filepath': shard_job['blend_filepath'],
+        'collection_name': collection_name,
+        'imported': run_manifest['imported'],
+        'failed': run_manifest['failed'],
+        # the coordinator deletes these once its own checkpoint holds the merged shard
+        'delete_files': list(pending_rdc_deletes),
+    }
+
+    with open(shard_job['result_filepath'], "w") as result_file:
+        json.dump(shard_result, result_file, indent=2)
+
+
+def import_all_rdc_files_no_merge(files, start_index: int = 1):
 
     start_time = time.time()
     errors_raised = 0
+    files_processed = 0
+
+    # files is a generator in watch mode so the total isn't known
+    file_count = len(files) if isinstance(files, list) else None
 
     master_col = bpy.context.scene.collection
 
     print_save_log(
-        filepath=f"{GENERATED_TEXTS_FILE_PATH}importing_rdc_full_log.txt", line=f"Starting RDC Imports, Number of files to import: {len(files)}")
+        filepath=f"{GENERATED_TEXTS_FILE_PATH}importing_rdc_full_log.txt", line=f"Starting RDC Imports, Number of files to import: {file_count if file_count is not None else 'watching for files'}")
 
     print("Please wait for imports to complete, this may take a while")
     # import progress
@@ -448,30 +1407,52 @@ def import_all_rdc_files_no_merge(files: list[str]):
     wm.progress_begin(0, 100)
     wm.progress_update(0)
 
-    for i, f in enumerate(files, start=1):
+    for file_number, f in enumerate(files, start=1):
         _, tail = os.path.split(f)
+        # collection index continues on from a resumed run so names don't clash
+        i = start_index + file_number - 1
         col_name = f"col_{i}"
 
         my_col = create_col(master_col, col_name=col_name)
 
         print(f"Attempting import file named {tail}")
-        _, errors_raised = attempt_import_of_rdc_file(
-            file=f, name=tail, errors_raised=errors_raised)
+        with profile_stage('attempt_import_of_rdc_file', capture=tail, rdc_bytes=os.path.getsize(f)):
+            successful_import, errors_raised = attempt_import_of_rdc_file(
+                file=f, name=tail, errors_raised=errors_raised)
+
+        if successful_import:
+            index_object_materials(bpy.data.collections[col_name].objects)
+
+            if dedup_capture_images:
+                dedup_collection_images(col_name)
+
+        run_manifest['next_col_index'] = i + 1
+
+        files_processed = file_number
 
         bpy.data.collections[col_name].hide_viewport = True
         my_col.hide_viewport = True
 
+        if successful_import:
+            # saved after next_col_index is recorded so a resume never creates this collection again
+            checkpoint_save('Saved after import', imported_capture=True)
+
         # update progress
-        current_progress = i / len(files) * 100
-        current_progress = round(current_progress, 2)
-        wm.progress_update(current_progress)
-        print(f"Current progress for import is: {current_progress}%")
+        if file_count is not None:
+            current_progress = file_number / file_count * 100
+            current_progress = round(current_progress, 2)
+            wm.progress_update(current_progress)
+            print(f"Current progress for import is: {current_progress}%")
+        else:
+            print(f"Imported {file_number} files so far, watching for more")
 
     # end progress
     wm.progress_end()
 
     print_save_log(
-        filepath=f"{GENERATED_TEXTS_FILE_PATH}importing_rdc_full_log.txt", lines=["Imports have been completed.", f"It took {time.time() - start_time} seconds to complete and import {len(files)} number of files ", f"There were {errors_raised} errors raised during the import process."])
+        filepath=f"{GENERATED_TEXTS_FILE_PATH}importing_rdc_full_log.txt", lines=["Imports have been completed.", f"It took {time.time() - start_time} seconds to complete and import {files_processed} number of files ", f"There were {errors_raised} errors raised during the import process."])
+
+    run_manifest['main_col'] = 'col_1'
 
     # col_1 is main collection if user has texture packer installed then this will be needed
     return 'col_1'
@@ -502,14 +1483,17 @@ def import_rdc_file(file: str, name: str, errors_raised: int):
         filepath=(file), filter_glob=".rdc", max_blocks=-1)
     line = f"Successfully imported file named {name}, now hiding"
 
-    print_save_log(filepath=f"{GENERATED_TEXTS_FILE_PATH}successful_import.txt",
-                   line=line)
+    print_log(filepath=f"{GENERATED_TEXTS_FILE_PATH}successful_import.txt",
+              line=line)
 
     write_to_file(
         filepath=f"{GENERATED_TEXTS_FILE_PATH}importing_rdc_full_log.txt", line=line)
 
+    manifest_add('imported', file)
+
     if should_delete_rdc_files:
-        delete_rdc_files(file)
+        # deleted after the next save so a resumed run never loses an rdc file it still needs
+        pending_rdc_deletes.append(file)
 
     return True, errors_raised
 
@@ -531,35 +1515,11 @@ def lily_capture_merger_call(layer_col):
             bpy.data.collections[k].hide_viewport = False
             v.hide_viewport = False
             continue
-        print(f"Merging collection {k} with {first_col_name}")
         # print(k) # returns col_1
         # print(v) # returns <bpy_struct, LayerCollection("col_1") at 0x000001D630AF96C8>
 
-        # unhide
-        bpy.data.collections[k].hide_viewport = False
-        v.hide_viewport = False
-
-        if bpy.data.collections.get(k).objects:
-            # select first object
-            bpy.data.collections.get(k).objects[0].select_set(True)
-
-        if bpy.data.collections.get(first_col_name).objects:
-            # set first object as active
-            bpy.context.view_layer.objects.active = bpy.data.collections.get(
-                first_col_name).objects[0]
-
-        # merge objects
-        bpy.ops.object.lily_capture_merger()
-
-        if bpy.data.collections.get(k).objects:
-            # unselect first object
-            bpy.data.collections.get(k).objects[0].select_set(False)
-
-        move_objects_from_one_collection_to_target(bpy.data.collections.get(
-            first_col_name), bpy.data.collections.get(k).objects)
-        # bpy.context.scene.collection.children.get(layer_col_children[0][0]) -- case data.collections does not work with link
-
-        print(f"Completed collection merge {k} with col_1")
+        lily_capture_merge_collections(
+            target_col_name=first_col_name, source_col_name=k)
 
     # remove unused collections
     remove_empty_collections()
@@ -642,41 +1602,23 @@ def get_area_size_for_objs(objs: list[bpy.types.Object], area_file: list[str] =
 
     area_size_dict = dict({})
 
-    bm = bmesh.new(use_operators=True)
-
-    area_total = 0
-
-    # loop over objs and get area data
-    for obj in objs:
-        # select current obj
-        bpy.data.objects[obj.name].select_set(True)
-
-        # get mesh data into bm
-        bm.from_mesh(obj.data)
-        bm.transform(obj.matrix_world)
-        current_object_area = sum(f.calc_area() for f in bm.faces)
-
-        area_size_dict[obj.name] = current_object_area
+    # measure every object in one vectorized pass
+    objs = list(objs)
+    object_areas = get_objects_areas(objs)
 
-        area_total += current_object_area
+    for obj, current_object_area in zip(objs, object_areas):
+        area_size_dict[obj.name] = float(current_object_area)
 
         if (area_file is not None):
             area_file.append(
                 f"Object name: {obj.name} | Area Size: {current_object_area}\n")
 
-        area_size_dict["Total"] = area_total
-
-        # deselect # obj
-        bpy.data.objects[obj.name].select_set(False)
-
-        bm.clear()  # clear data but not free it
-
-    bm.free()  # remove bm from memory
+    area_total = float(object_areas.sum())
+    area_size_dict["Total"] = area_total
 
     if (area_file is not None):
         # write total size to file and add to dictionary
         area_file.append(f"Total Area Size: {area_total}\n")
-        print('here')
         return area_size_dict, area_file
 
     else:
@@ -684,14 +1626,23 @@ def get_area_size_for_objs(objs: list[bpy.types.Object], area_file: list[str] =
         return area_size_dict
 
 
-def get_area_size_for_col_and_save_to_file(col_name: str):
+def get_area_size_for_col_and_save_to_file(col_name: str, cached_area_size: dict = None):
 
     objs = bpy.data.collections.get(col_name).objects
 
     area_txt = []
 
-    area_size_dict, area_txt = get_area_size_for_objs(
-        objs=objs, area_file=area_txt)
+    if cached_area_size is None:
+        area_size_dict, area_txt = get_area_size_for_objs(
+            objs=objs, area_file=area_txt)
+
+    else:
+        # areas already measured, only the totals need adding up
+        area_size_dict = {obj.name: cached_area_size[obj.name] for obj in objs}
+        area_size_dict["Total"] = sum(area_size_dict.values())
+        area_txt = [
+            f"Object name: {k} | Area Size: {v}\n" for k, v in area_size_dict.items() if k != "Total"]
+        area_txt.append(f"Total Area Size: {area_size_dict['Total']}\n")
 
     # write obj name and size to file not needed but may be helpful for debugging and working out calculations
     write_to_file(
@@ -757,19 +1708,18 @@ def sort_object_into_location_groups(map_chunk: list, obj_dict: dict):
     if len(map_chunk) == 1:
         sort_chunk['Chunk_1'] = list(obj_dict.keys())
 
-    found = set()
-    for i, chunk in enumerate(map_chunk, start=1):
+    elif obj_dict:
+        obj_names = list(obj_dict.keys())
+        points = np.array([(v[0], v[1]) for v in obj_dict.values()])
 
-        for k, v in obj_dict.items():
+        # assign every object to its grid cell in one pass
+        chunk_numbers = get_grid_chunk_numbers(points=points, map_chunk=map_chunk)
 
-            if (k in found):
-                continue
+        # stable sort keeps objects in their original order inside each chunk
+        for index in np.argsort(chunk_numbers, kind='stable'):
+            sort_chunk.setdefault(
+                f"Chunk_{chunk_numbers[index]}", []).append(obj_names[index])
 
-            if (chunk[0] <= v[0] <= chunk[1] and chunk[2] <= v[1] <= chunk[3]):
-                if f"Chunk_{i}" not in sort_chunk:
-                    sort_chunk[f"Chunk_{i}"] = []
-                sort_chunk[f"Chunk_{i}"].append(k)
-                found.add(k)
     lines = [f"{k} : {v}" for k, v in sort_chunk.items()]
     write_to_file(
         filepath=f"{GENERATED_TEXTS_FILE_PATH}group_file.txt", lines=lines)
@@ -777,7 +1727,7 @@ def sort_object_into_location_groups(map_chunk: list, obj_dict: dict):
     return sort_chunk
 
 
-def sort_groupings_into_new_col(area_groupings: dict):
+def sort_groupings_into_new_col(area_groupings: dict, area_size_dict: dict = None):
 
     # return no area grouping
     if not area_groupings:
@@ -785,11 +1735,10 @@ def sort_groupings_into_new_col(area_groupings: dict):
 
     layer_col = bpy.context.scene.collection
     collection_names = []
-    current_objs_for_collection = []
 
     if len(area_groupings) == 1:
         # rename collection
-        col = bpy.data.collections.get('col_1')
+        col = bpy.data.collections.get(run_manifest['main_col'])
         col.name = "HighPoly_Pack_1"
 
         # save col stats
@@ -799,83 +1748,85 @@ def sort_groupings_into_new_col(area_groupings: dict):
         collection_names.append(col.name)
 
     else:
-        i = 1
-        for v in area_groupings.values():
-            # add objs to collection and get areasize
-
-            current_objs_for_collection.extend(
-                [bpy.data.objects.get(x) for x in v])
-            area_size_dict = get_area_size_for_objs(
-                objs=current_objs_for_collection)
-            # get current and target density
-            _, total_target_px, total_number_of_pixels_req = get_texel_denisty_requirements(
-                area_size=area_size_dict)
-
-            # still space for image add more objs
-            if (total_target_px > total_number_of_pixels_req):
-                continue
+        # objects in grouping order so each pack stays spatially together
+        pack_objs = [bpy.data.objects.get(x)
+                     for v in area_groupings.values() for x in v]
 
-            # unlikey to be exact match but if is then this collection is ready for packing
-            elif (total_target_px == total_number_of_pixels_req):
+        # measure each object once, pack totals then come from prefix sums of the cached areas
+        if area_size_dict is None:
+            area_size_dict = get_area_size_for_objs(objs=pack_objs)
 
-                # create collection and move objects to collection
-                new_col_layer = create_col(layer_col, f"HighPoly_Pack_{i}")
-                new_col = bpy.data.collections.get(new_col_layer.name)
-                move_objects_from_one_collection_to_target(
-                    target_col=new_col, move_objs=current_objs_for_collection)
+        total_target_px, pixels_per_area = get_texel_pixel_budget()
+        object_pixels = np.array(
+            [area_size_dict[obj.name] for obj in pack_objs]) * pixels_per_area
 
-                # save col stats
-                get_area_size_for_col_and_save_to_file(f"HighPoly_Pack_{i}")
+        pack_boundaries = get_pack_boundaries(
+            object_pixels=object_pixels, pixel_budget=total_target_px)
 
-                # clear list
-                current_objs_for_collection = []
+        for i, (start, end) in enumerate(pack_boundaries, start=1):
 
-                # add to collection name
-                collection_names.append(f"HighPoly_Pack_{i}")
+            col_name = f"HighPoly_Pack_{i}"
 
-                i += 1
+            # the last pack is leftover objects unless it fills the image exactly
+            if end == len(pack_objs) and object_pixels[start:end].sum() < total_target_px:
+                col_name = "HighPoly_Pack_Leftover"
 
-            # over threshold keep removing objs till back in threshold
-            else:
-                excess = []  # hold objects that keep it over the required pixels
-                # reduce objects till pixels fit inside image target is
-                while total_target_px < total_number_of_pixels_req:
-
-                    # keep popping and appending to excess till current pixel total for objs match target
-                    ob = current_objs_for_collection.pop()
-                    excess.append(ob)
-
-                    # get updated area size and pixels
-                    area_size_dict = get_area_size_for_objs(
-                        objs=current_objs_for_collection)
-                    _, total_target_px, total_number_of_pixels_req = get_texel_denisty_requirements(
-                        area_size=area_size_dict)
-
-                # create collection and move objects to collection
-                new_col_layer = create_col(layer_col, f"HighPoly_Pack_{i}")
-                new_col = bpy.data.collections.get(new_col_layer.name)
-                move_objects_from_one_collection_to_target(
-                    target_col=new_col, move_objs=current_objs_for_collection)
-
-                # save col stats
-                get_area_size_for_col_and_save_to_file(f"HighPoly_Pack_{i}")
-
-                # add to collection name
-                collection_names.append(f"HighPoly_Pack_{i}")
-
-                i += 1
-                # set list to excess
-                current_objs_for_collection = excess
-
-        # if there are still objs left over add to own collection
-        if (len(current_objs_for_collection) > 0):
-            new_col_layer = create_col(layer_col, "HighPoly_Pack_Leftover")
-            new_col = bpy.data.collections.get(new_col_layer.name)
-            move_objects_from_one_collection_to_target(
-                target_col=new_col, move_objs=current_objs_for_collection)
+            create_pack_col(layer_col=layer_col, col_name=col_name,
+                            pack_objs=pack_objs[start:end], area_size_dict=area_size_dict)
 
             # add to collection name
-            collection_names.append("HighPoly_Pack_Leftover")
+            collection_names.append(col_name)
+
+    remove_empty_collections()
+
+    return collection_names
+
+
+def create_pack_col(layer_col: bpy.types.Collection, col_name: str, pack_objs: list[bpy.types.Object], area_size_dict: dict):
+
+    # create collection and move objects to collection
+    new_col_layer = create_col(layer_col, col_name)
+    new_col = bpy.data.collections.get(new_col_layer.name)
+    move_objects_from_one_collection_to_target(
+        target_col=new_col, move_objs=pack_objs)
+
+    # save col stats
+    get_area_size_for_col_and_save_to_file(
+        col_name, cached_area_size=area_size_dict)
+
+
+def sort_objects_into_area_weighted_packs(obj_dict: dict, area_size_dict: dict):
+
+    layer_col = bpy.context.scene.collection
+    collection_names = []
+
+    if not obj_dict:
+        return collection_names
+
+    obj_names = list(obj_dict.keys())
+    points = np.array([(v[0], v[1]) for v in obj_dict.values()])
+
+    total_target_px, pixels_per_area = get_texel_pixel_budget()
+    object_pixels = np.array(
+        [area_size_dict[obj_name] for obj_name in obj_names]) * pixels_per_area
+
+    packs = partition_area_weighted(
+        points=points, object_pixels=object_pixels, pixel_budget=total_target_px)
+
+    lines = []
+    for i, pack in enumerate(packs, start=1):
+        col_name = f"HighPoly_Pack_{i}"
+
+        create_pack_col(layer_col=layer_col, col_name=col_name, pack_objs=[
+                        bpy.data.objects.get(obj_names[index]) for index in pack], area_size_dict=area_size_dict)
+
+        collection_names.append(col_name)
+        lines.append(
+            f"{col_name} : {len(pack)} objects, {round(object_pixels[pack].sum() / total_target_px * 100, 2)}% of image")
+
+    # write pack fill to file, helpful for checking the packing
+    write_to_file(
+        filepath=f"{GENERATED_TEXTS_FILE_PATH}group_file.txt", lines=lines)
 
     remove_empty_collections()
 
@@ -914,6 +1865,11 @@ def texture_pack_group(col_names: list[str]):
     # loop over children as list is in tuple with the name as key and the layer collection as struct we can seperate out k to get key name and v to the collection itself
     for col in col_names:
 
+        # already packed by a previous run that was resumed
+        if col in run_manifest['textured']:
+            print(f"\tSkipping Collection: {col}, already textured")
+            continue
+
         print(f"\tCurrent Collection: {col}")
         
         # enure col not hidden
@@ -925,48 +1881,40 @@ def texture_pack_group(col_names: list[str]):
             ob.select_set(True)
 
         print("\t\tStarting Lily Texture Packer")
-        bpy.ops.object.lily_texture_packer()
+        with profile_stage('lily_texture_packer', collection=col):
+            bpy.ops.object.lily_texture_packer()
         print("\t\tFinished Lily Texture Packer\n\t\tFinding Image")
 
         obj = objs[0]
         obj_mat = obj.data.materials[0]
-        obj_mat_nodes = obj_mat.node_tree.nodes
-        img_node = next(
-            (
-                mat_node
-                for mat_node in obj_mat_nodes
-                if mat_node.type == 'TEX_IMAGE'
-            ),
-            None,
-        )
-        '''
-        this is here as i have never used or seen next used like this before so for my own purpose
-        # img_node = None
-        
-        # for mat_node in obj_mat_nodes:
-        #     # print(mat_node,mat_node.type)
-        #     if mat_node.type == 'TEX_IMAGE':
-        #         img_node = mat_node
-        #         break
-        '''
-
-        if img_node is None:
+        # the packer has just rebuilt this material so index it again
+        index_material(obj_mat)
+        img = get_material_image(obj_mat)
+
+        if img is None:
             print(
                 f"No image found for collection: {col}, on the first object.")
 
         else:
 
             print("\t\tFound Image. Saving Image")
-            img = img_node.image
             img.name = f"{col}_LilyTexImage"
-            img_path = f"{LILY_IMAGE_FILE_PATH}{img.name}.bmp"
-            img.filepath_raw = img_path
-            img.save()
+            index_material(obj_mat)
+            img_path = f"{LILY_IMAGE_FILE_PATH}{img.name}{get_image_extension()}"
+            # the image is written while the group is joined and the next groups are packed
+            save_image_output(img=img, filepath=img_path)
+            run_manifest['image_outputs'][img.name] = img_path
 
             join_object_group(objs=objs, name=complete_obj_name)
 
-            assign_lily_texture_to_object(
-                obj_name=obj.name, img_filepath=img_path)
+            assign_lily_texture_to_object(obj_name=obj.name, img=img)
+
+        # each pack is a checkpoint as packing can take a long time
+        manifest_add('textured', col)
+        print_save_log(filepath=f"{LOG_FILE_PATH}",
+                       line=f"texture_pack_group packed {col}", is_stage_boundary=True)
+
+    finish_image_outputs()
 
     # if more than 1 column then join sections together
     if (len(col_names) > 1):
@@ -1018,7 +1966,7 @@ def join_object_group(objs: list, name: str = None):
     return
 
 
-def assign_lily_texture_to_object(obj_name: str, img_filepath: str, mat_number: str = 1):
+def assign_lily_texture_to_object(obj_name: str, img: bpy.types.Image, mat_number: str = 1):
 
     mat_time_start = time.time()
 
@@ -1057,9 +2005,7 @@ def assign_lily_texture_to_object(obj_name: str, img_filepath: str, mat_number:
     # set roughness to 1
     bsdf_node.inputs[9].default_value = 1
 
-    # load image
-    img = bpy.data.images.load(filepath=img_filepath)
-
+    # the packed image is already in memory so use it rather than loading the saved file again
     tex_image_node = nodes.new(type="ShaderNodeTexImage")
     tex_image_node.location = (-450, 0)
     tex_image_node.name = f'High_Poly_Lily_Tex_Node_{mat_number}'
@@ -1090,13 +2036,14 @@ def get_max_image_size():
 
     max_image_size = 0
     for obj in objs:
-        image = get_image_for_obj(obj)
+        # image sizes are read from the index built as captures were imported
+        mat = get_first_material(obj)
 
-        # if no image found skip obj
-        if image is None:
+        # if no material found skip obj
+        if mat is None:
             continue
 
-        current_max_res = max(image.size[0], image.size[1])
+        current_max_res = max(get_material_image_size(mat))
 
         if current_max_res > max_image_size:
             max_image_size = current_max_res
@@ -1105,37 +2052,69 @@ def get_max_image_size():
     return max_image_size
 
 
-def get_image_for_obj(obj):
+def dedup_collection_images(col_name: str):
+
+    # compared with the images of earlier imports as each capture comes in so duplicates never build up in memory
+    images = [get_material_image(slot.material) for obj in bpy.data.collections[col_name].objects
+              for slot in obj.material_slots if slot.material is not None]
+
+    dedup_images(images=images, dedup_state=image_dedup_state)
+
+
+def dedup_object_images():
+
+    images = [get_image_for_obj(obj) for obj in bpy.context.scene.objects
+              if obj.type == 'MESH' and obj.material_slots]
+    image_count = len({img.name for img in images if img is not None})
+
+    # images already compared during import are skipped, a resumed run or shards appended from workers are compared here
+    dedup_images(images=images, dedup_state=image_dedup_state)
+    removed, bytes_saved = image_dedup_state['removed'], image_dedup_state['bytes_saved']
+
+    manifest_complete_stage('dedup_images')
+    print_save_log(filepath=f"{GENERATED_TEXTS_FILE_PATH}image_dedup.txt",
+                   line=f"Image dedup removed {removed} capture images during this run, {image_count} remain, saving {round(bytes_saved / 1024 ** 2, 1)} MB of pixel data", is_stage_boundary=True)
+
+
+def consolidate_object_materials():
+
+    material_count, image_count = len(bpy.data.materials), len(bpy.data.images)
+
+    removed = consolidate_materials(materials=list(bpy.data.materials))
+
+    manifest_complete_stage('consolidate_materials')
+    print_save_log(filepath=f"{GENERATED_TEXTS_FILE_PATH}material_consolidation.txt", lines=[
+        f"Material consolidation removed {removed} materials",
+        f"Materials before: {material_count}, after: {len(bpy.data.materials)}",
+        f"Images before: {image_count}, after: {len(bpy.data.images)}"], is_stage_boundary=True)
+
+
+def get_first_material(obj):
 
     # as lily texture capture only assumes one material for obj use first slot
-    mat = obj.material_slots[0].material
-    # check material exists and use nodes
-    if mat and mat.use_nodes:
-        bdsf_node = mat.node_tree.nodes['Principled BSDF']
-        input_socket = bdsf_node.inputs[0]
+    if not obj.material_slots:
+        return None
 
-        try:
-            # get the link that inputs into the bsdf and into the socket this will be the image link
-            node_link = next(link for link in mat.node_tree.links if link.to_node ==
-                             bdsf_node and link.to_socket == input_socket)
+    return obj.material_slots[0].material
 
-            # image node
-            image_node = node_link.from_node
 
-            # check its the image texture node
-            if image_node.type == 'TEX_IMAGE':
-                # return image
-                return image_node.image
+def get_image_for_obj(obj):
 
-        except Exception as err:
-            print(
-                f"Unable to image texture from object: {obj.name}. Exception raised: {err}")
-            # return none as no image was retrievable
-            return None
+    mat = get_first_material(obj)
+    if mat is None:
+        return None
+
+    return get_material_image(mat)
 
 
 if __name__ == '__main__':
 
+    # add this scripts folder and its parent so workers started without a .blend file can find the modules
+    script_folder = os.path.dirname(os.path.realpath(__file__))
+    for module_path in (script_folder, os.path.dirname(script_folder)):
+        if module_path not in sys.path:
+            sys.path.append(module_path)
+
     # retrieved and tweaked from https://blender.stackexchange.com/questions/33603/importing-python-modules-and-text-files credit to Cardboy0
     original_path = pathlib.Path(bpy.data.filepath)
     parent_path = original_path.parent
@@ -1157,7 +2136,42 @@ if __name__ == '__main__':
     # print(with_dots)
     __package__ = with_dots
     from Scripts import *
+    import constants
     from constants import *
     from shared_common_methods import *  # this works here but not else where
-
-    main()
+    from shared_manifest_methods import *
+    from shared_shard_methods import *
+    from shared_merge_methods import *
+    from shared_area_methods import *
+    from shared_profile_methods import *
+    from shared_memory_methods import *
+    from shared_watch_methods import *
+    from shared_io_methods import *
+    from shared_image_methods import *
+    from shared_config_methods import *
+    from shared_queue_methods import *
+    from shared_plan_methods import *
+
+    script_args = get_script_args()
+    config_filepaths = get_config_filepaths(script_args)
+
+    if '--shard-worker' in script_args:
+        # workers are given the config of the area they import for
+        if config_filepaths:
+            apply_area_config(config_filepath=config_filepaths[0],
+                              config=load_config_file(config_filepaths[0]))
+        run_shard_worker(
+            shard_job_filepath=script_args[script_args.index('--shard-worker') + 1])
+    elif '--plan' in script_args:
+        plan_budget_gb = float(script_args[script_args.index('--memory-gb') + 1]) if '--memory-gb' in script_args else 0
+        for config_filepath in config_filepaths or [None]:
+            if config_filepath is not None:
+                apply_area_config(config_filepath=config_filepath, config=load_config_file(config_filepath))
+            run_plan(memory_budget_gb=plan_budget_gb)
+    elif '--queue' in script_args:
+        run_queue_worker(queue_folder=script_args[script_args.index('--queue') + 1],
+                         memory_budget_gb=float(script_args[script_args.index('--memory-gb') + 1]) if '--memory-gb' in script_args else queue_worker_memory_gb)
+    elif config_filepaths:
+        run_area_batch(config_filepaths=config_filepaths)
+    else:
+        main()
@@ -0,0 +1,214 @@
+import bpy
+import math
+import numpy as np
+
+
+def get_object_world_triangles(obj: bpy.types.Object):
+    """Get the world space vertex coordinates and loop triangle vertex indices of a mesh object with foreach_get
+
+    Returns:
+        tuple: (coords as an (n, 3) float64 array, triangles as an (m, 3) int array)
+    """
+    mesh = obj.data
+    mesh.calc_loop_triangles()
+
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', coords)
+    coords = coords.reshape(-1, 3).astype(np.float64)
+
+    triangles = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+    mesh.loop_triangles.foreach_get('vertices', triangles)
+
+    # apply matrix_world to every vertex at once
+    matrix_world = np.array(obj.matrix_world, dtype=np.float64)
+    coords = coords @ matrix_world[:3, :3].T + matrix_world[:3, 3]
+
+    return coords, triangles.reshape(-1, 3)
+
+
+def get_triangle_areas(coords: np.ndarray, triangles: np.ndarray):
+
+    vert_a = coords[triangles[:, 0]]
+    vert_b = coords[triangles[:, 1]]
+    vert_c = coords[triangles[:, 2]]
+
+    return 0.5 * np.linalg.norm(np.cross(vert_b - vert_a, vert_c - vert_a), axis=1)
+
+
+def get_objects_areas(objs: list[bpy.types.Object], batch_triangles: int = 2000000):
+    """Get the world space surface area of each object, the triangles of neighbouring objects are gathered and measured
+    in batches of about batch_triangles so memory stays bounded on large collections
+
+    Args:
+        objs (list[bpy.types.Object]): Mesh objects to measure
+        batch_triangles (int, optional): Triangles gathered before a batch is measured. Defaults to 2000000.
+
+    Returns:
+        np.ndarray: Area of each object in the same order as objs
+    """
+    object_areas = np.zeros(len(objs), dtype=np.float64)
+
+    batch_indices = []
+    batch_coords = []
+    batch_triangles_list = []
+    batch_triangle_count = 0
+
+    def measure_batch():
+
+        triangle_counts = np.array([len(triangles) for triangles in batch_triangles_list], dtype=np.int64)
+        has_triangles = triangle_counts > 0
+
+        if has_triangles.any():
+            # offset indices so they point into the combined coords array
+            vertex_offsets = np.concatenate(([0], np.cumsum([len(coords) for coords in batch_coords])[:-1]))
+            triangle_areas = get_triangle_areas(np.concatenate(batch_coords), np.concatenate(
+                [triangles + offset for triangles, offset in zip(batch_triangles_list, vertex_offsets)]))
+
+            # sum the triangle areas per object, objects without triangles keep 0
+            starts = np.concatenate(([0], np.cumsum(triangle_counts)[:-1]))
+            object_areas[np.array(batch_indices)[has_triangles]] = np.add.reduceat(
+                triangle_areas, starts[has_triangles])
+
+        batch_indices.clear()
+        batch_coords.clear()
+        batch_triangles_list.clear()
+
+    for index, obj in enumerate(objs):
+        coords, triangles = get_object_world_triangles(obj)
+
+        batch_indices.append(index)
+        batch_coords.append(coords)
+        batch_triangles_list.append(triangles)
+        batch_triangle_count += len(triangles)
+
+        if batch_triangle_count >= batch_triangles:
+            measure_batch()
+            batch_triangle_count = 0
+
+    if batch_indices:
+        measure_batch()
+
+    return object_areas
+
+
+def get_pack_boundaries(object_pixels: np.ndarray, pixel_budget: float):
+    """Split objects into consecutive packs that each fit inside the pixel budget using prefix sums of the object pixels,
+    each pack takes as many objects as fit and an object bigger than the budget gets a pack of its own
+
+    Args:
+        object_pixels (np.ndarray): Pixels required by each object in pack order
+        pixel_budget (float): Pixels available in one image
+
+    Returns:
+        list[tuple]: (start, end) slice of the objects for each pack
+    """
+    prefix_pixels = np.concatenate(([0.0], np.cumsum(object_pixels)))
+    object_count = len(object_pixels)
+
+    pack_boundaries = []
+    start = 0
+
+    while start < object_count:
+        # last end whose running total still fits in the budget
+        end = int(np.searchsorted(prefix_pixels,
+                  prefix_pixels[start] + pixel_budget, side='right')) - 1
+        end = min(max(end, start + 1), object_count)
+
+        pack_boundaries.append((start, end))
+        start = end
+
+    return pack_boundaries
+
+
+def get_grid_chunk_numbers(points: np.ndarray, map_chunk: list):
+    """Find the chunk number of every point in one pass using the grid edges of the boxes made by define_guide_box,
+    a point on the edge between two boxes goes into the first box like the box by box test did
+
+    Args:
+        points (np.ndarray): (n, 2) array of x, y locations
+        map_chunk (list): Boxes of [xmin, xmax, ymin, ymax] from define_guide_box, sorted by xmin with y boxes in order
+
+    Returns:
+        np.ndarray: Chunk number starting at 1 for each point
+    """
+    cells_per_axis = math.isqrt(len(map_chunk))
+
+    # upper edge of each column and row of the grid
+    x_max_edges = np.array([map_chunk[i * cells_per_axis][1]
+                           for i in range(cells_per_axis)])
+    y_max_edges = np.array([map_chunk[j][3] for j in range(cells_per_axis)])
+
+    # first column and row whose upper edge reaches the point
+    x_cells = np.searchsorted(x_max_edges, points[:, 0], side='left')
+    y_cells = np.searchsorted(y_max_edges, points[:, 1], side='left')
+
+    # keep points on the outer edges inside the grid
+    x_cells = np.clip(x_cells, 0, cells_per_axis - 1)
+    y_cells = np.clip(y_cells, 0, cells_per_axis - 1)
+
+    return x_cells * cells_per_axis + y_cells + 1
+
+
+def partition_area_weighted(points: np.ndarray, object_pixels: np.ndarray, pixel_budget: float, fill_target: float = 0.98):
+    """Split objects into packs with a k-d split, each split cuts along the longer axis at the area weighted point that
+    gives each side pixels for its share of the packs. A pack over the budget keeps the largest prefix along its longer
+    axis that fits and the rest is carried into the next pack. The packs never outnumber filling each image in turn
+    along the k-d order or the given order
+
+    Args:
+        points (np.ndarray): (n, 2) array of x, y object locations
+        object_pixels (np.ndarray): Pixels required by each object
+        pixel_budget (float): Pixels available in one image
+        fill_target (float, optional): Fraction of the budget each pack aims for, the headroom stops uneven cuts pushing packs over the budget. Defaults to 0.98.
+
+    Returns:
+        list[np.ndarray]: Object indices of each pack, packs are in spatial order
+    """
+    packs = []
+
+    if len(object_pixels) == 0:
+        return packs
+
+    def get_pack_count(indices: np.ndarray):
+        return max(1, math.ceil(object_pixels[indices].sum() / (pixel_budget * fill_target)))
+
+    def order_along_longer_axis(indices: np.ndarray):
+        extent = points[indices].max(axis=0) - points[indices].min(axis=0)
+        axis = int(np.argmax(extent[:2]))
+        return indices[np.argsort(points[indices, axis], kind='stable')]
+
+    def split(indices: np.ndarray, pack_count: int):
+        """Returns the objects that didn't fit so the caller carries them into the next pack"""
+
+        ordered = order_along_longer_axis(indices)
+
+        if pack_count <= 1 or len(ordered) == 1:
+            # rounding of the cut can leave a pack over budget, keep the largest prefix that fits
+            fit = int(np.searchsorted(np.cumsum(object_pixels[ordered]), pixel_budget, side='right'))
+            fit = max(fit, 1)
+            packs.append(ordered[:fit])
+            return ordered[fit:]
+
+        # area weighted cut so the left side gets pixels for left_count packs
+        left_count = pack_count // 2
+        cumulative_pixels = np.cumsum(object_pixels[ordered])
+        cut = int(np.searchsorted(cumulative_pixels,
+                  cumulative_pixels[-1] * left_count / pack_count, side='right'))
+        cut = min(max(cut, 1), len(ordered) - 1)
+
+        carry = split(ordered[:cut], left_count)
+        return split(np.concatenate((carry, ordered[cut:])), pack_count - left_count)
+
+    carry = split(np.arange(len(object_pixels)), get_pack_count(np.arange(len(object_pixels))))
+    while len(carry):
+        carry = split(carry, get_pack_count(carry))
+
+    # cuts that land under the budget can leave more packs than filling each image in turn, so fill along the k-d order
+    # or the given order instead when that needs fewer images
+    for order in (np.concatenate(packs), np.arange(len(object_pixels))):
+        greedy_boundaries = get_pack_boundaries(
+            object_pixels=object_pixels[order], pixel_budget=pixel_budget)
+        if len(greedy_boundaries) < len(packs):
+            packs = [order[start:end] for start, end in greedy_boundaries]
+
+    return packs
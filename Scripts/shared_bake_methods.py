@@ -0,0 +1,179 @@
+import bpy
+import json
+import os
+import subprocess
+import time
+from shared_common_methods import *
+from shared_shard_methods import *
+
+
+# used when no worker memory is given, a worker holds the high poly and its part as loaded from the source file plus the
+# cycles bvh built over them, roughly three times the size of the uncompressed source file, on top of blender itself
+BAKE_WORKER_MEMORY_FACTOR = 3.0
+BAKE_WORKER_BASE_MEMORY_GB = 1.0
+
+
+def get_bake_thread_count(worker_count: int, threads_per_worker: int = 0):
+    """Get the cycles threads each bake worker uses, 0 splits the cpus evenly between the workers
+
+    Returns:
+        int: Threads for each worker, at least 1
+    """
+    if threads_per_worker > 0:
+        return threads_per_worker
+
+    return max(1, (os.cpu_count() or 1) // max(1, worker_count))
+
+
+def estimate_bake_worker_memory_gb(source_filepath: str):
+    """Estimate the memory one bake worker needs from the size of the source file every worker loads
+
+    Returns:
+        float: Memory in GB
+    """
+    return os.path.getsize(source_filepath) * BAKE_WORKER_MEMORY_FACTOR / 1024 ** 3 + BAKE_WORKER_BASE_MEMORY_GB
+
+
+def pack_unsaved_images(obj: bpy.types.Object):
+    """Pack the images of an object's materials that only exist in memory so they are written with it to a bake source file"""
+
+    for mat_slot in obj.material_slots:
+        if mat_slot.material is None or mat_slot.material.node_tree is None:
+            continue
+
+        for node in mat_slot.material.node_tree.nodes:
+            img = getattr(node, 'image', None)
+            if img is None or img.packed_file is not None:
+                continue
+
+            if img.source == 'GENERATED' or img.is_dirty or not os.path.exists(bpy.path.abspath(img.filepath)):
+                img.pack()
+
+
+def write_bake_jobs(selected_obj_name: str, part_names: list[str], bake_folder: str, job_settings: dict):
+    """Write the high poly and every low poly part to one source .blend and a job file for each part
+
+    Args:
+        selected_obj_name (str): Name of the high poly object baked from
+        part_names (list[str]): Names of the low poly parts, one job each
+        bake_folder (str): Folder for the source file, jobs, worker files and logs
+        job_settings (dict): Arguments for create_material_uv_and_bake shared by every part
+
+    Returns:
+        list[dict]: The bake jobs
+    """
+    os.makedirs(bake_folder, exist_ok=True)
+
+    source_filepath = f"{bake_folder}bake_source.blend"
+    high_poly_obj = bpy.data.objects.get(selected_obj_name)
+    pack_unsaved_images(high_poly_obj)
+
+    # one source file is written and each worker appends only the objects it needs from it
+    bpy.data.libraries.write(source_filepath, {high_poly_obj} | {bpy.data.objects.get(name) for name in part_names},
+                             path_remap='ABSOLUTE', fake_user=True)
+
+    bake_jobs = []
+
+    for part_index, part_name in enumerate(part_names, start=1):
+        bake_job = {
+            'part_index': part_index,
+            'part_name': part_name,
+            'selected_obj_name': selected_obj_name,
+            'source_filepath': source_filepath,
+            'blend_filepath': f"{bake_folder}bake_part_{part_index}.blend",
+            'result_filepath': f"{bake_folder}bake_part_{part_index}_result.json",
+            'job_filepath': f"{bake_folder}bake_part_{part_index}_job.json",
+            **job_settings,
+        }
+
+        # a result left by an earlier run would make a failed worker look like it finished
+        if os.path.exists(bake_job['result_filepath']):
+            os.remove(bake_job['result_filepath'])
+
+        with open(bake_job['job_filepath'], "w") as job_file:
+            json.dump(bake_job, job_file, indent=2)
+
+        bake_jobs.append(bake_job)
+
+    return bake_jobs
+
+
+def run_bake_workers(bake_jobs: list[dict], worker_count: int, thread_count: int, log_folder: str, poll_seconds: float = 5):
+    """Bake the jobs in headless blender workers, at most worker_count run at once and each one is given thread_count threads
+
+    Args:
+        bake_jobs (list[dict]): Jobs from write_bake_jobs
+        worker_count (int): Number of workers running at the same time
+        thread_count (int): Threads for each worker from get_bake_thread_count
+        log_folder (str): Folder to write each workers console output to
+        poll_seconds (float, optional): Seconds between checks on the workers. Defaults to 5.
+
+    Returns:
+        list[dict]: Results written by the workers that completed
+    """
+    scripts_folder = os.path.dirname(os.path.realpath(__file__))
+    waiting_jobs = list(bake_jobs)
+    workers = []
+    results = []
+
+    while waiting_jobs or workers:
+        # start the next parts as workers become free
+        while waiting_jobs and len(workers) < worker_count:
+            bake_job = waiting_jobs.pop(0)
+            log_file = open(
+                f"{log_folder}bake_part_{bake_job['part_index']}_log.txt", "w")
+            python_expr = (f"import sys; sys.path.append({scripts_folder!r}); "
+                           f"from shared_simplify_methods import run_bake_worker; run_bake_worker({bake_job['job_filepath']!r})")
+            command = [bpy.app.binary_path, '-b', '--factory-startup', '-t', str(thread_count),
+                       '--python-exit-code', '1', '--python-expr', python_expr]
+            print(f"Launching bake worker for {bake_job['part_name']} with {thread_count} threads")
+            process = subprocess.Popen(
+                command, stdout=log_file, stderr=subprocess.STDOUT)
+            workers.append((bake_job, process, log_file))
+
+        time.sleep(poll_seconds)
+
+        for bake_job, process, log_file in [worker for worker in workers if worker[1].poll() is not None]:
+            workers.remove((bake_job, process, log_file))
+            log_file.close()
+
+            if process.returncode != 0 or not os.path.exists(bake_job['result_filepath']):
+                print(f"Bake worker for {bake_job['part_name']} failed with return code {process.returncode}, see bake_part_{bake_job['part_index']}_log.txt")
+                continue
+
+            with open(bake_job['result_filepath'], "r") as result_file:
+                results.append(json.load(result_file))
+
+            print(f"Bake worker for {bake_job['part_name']} finished")
+
+    return results
+
+
+def append_baked_part(bake_result: dict):
+    """Replace a low poly part with its baked copy from the worker's file, bringing its uv map, material and image with it
+
+    Args:
+        bake_result (dict): Result written by run_bake_worker
+    """
+    part_name = bake_result['part_name']
+    part_obj = bpy.data.objects.get(part_name)
+    mesh_name = part_obj.data.name
+    part_cols = list(part_obj.users_collection)
+
+    with bpy.data.libraries.load(bake_result['blend_filepath'], link=False) as (data_from, data_to):
+        data_to.objects = [name for name in data_from.objects if name == part_name]
+
+    # remove the unbaked part so the baked copy can take its names
+    old_mesh = part_obj.data
+    bpy.data.objects.remove(part_obj)
+    if old_mesh.users == 0:
+        bpy.data.meshes.remove(old_mesh)
+
+    baked_obj = data_to.objects[0]
+    baked_obj.name = part_name
+    baked_obj.data.name = mesh_name
+
+    for col in part_cols:
+        col.objects.link(baked_obj)
+
+    print(f"Appended baked {part_name} from {bake_result['blend_filepath']}")
@@ -1,6 +1,20 @@
 import bpy
 import bmesh
 import os
+import time
+
+
+# checkpoint state used by checkpoint_save, configure it with set_checkpoint_policy
+# policy 'stage' saves only at stage boundaries, 'interval' also saves when interval_minutes have passed since the last save
+# 'imports' also saves after every_n_imports imported captures and 'always' saves on every log line like older versions of this script
+checkpoint_state = {'policy': 'stage', 'interval_minutes': 10,
+                    'every_n_imports': 25, 'last_save_time': time.time(), 'imports_since_save': 0}
+
+# methods called after every save of the .blend file, used to keep data on disk in step with the saved file
+save_file_callbacks = []
+
+# methods called before every save, one raises to stop the run before the .blend file is written
+save_file_checks = []
 
 
 def check_and_create_file_path(file_path: list[str]):
@@ -19,10 +33,7 @@ def clean_up_data():
     remove_empty_collections()
 
     # remove orphan data
-    remove_orphan_data()
-
-    # purge data
-    purge_data()
+    return purge_orphan_data()
 
 
 def remove_empty_collections():
@@ -34,87 +45,129 @@ def remove_empty_collections():
 
 def save_file(arg0):
 
+    for check in save_file_checks:
+        check()
+
     print('\nSaving File')
     # save file
     bpy.ops.wm.save_mainfile()
     print(arg0 + "\n")
 
+    # any save is a checkpoint so reset the checkpoint counters
+    checkpoint_state['last_save_time'] = time.time()
+    checkpoint_state['imports_since_save'] = 0
+
+    for callback in save_file_callbacks:
+        callback()
+
 
-def purge_data():
-    """Remove data blocks with no users ie orphaned data
+def set_checkpoint_policy(policy: str = 'stage', interval_minutes: float = 10, every_n_imports: int = 25):
+    """Set the policy checkpoint_save uses to decide when the .blend file is saved
+
+    Args:
+        policy (str, optional): One of 'stage', 'interval', 'imports' or 'always'. Defaults to 'stage'.
+        interval_minutes (float, optional): Minutes between saves for the 'interval' policy. Defaults to 10.
+        every_n_imports (int, optional): Number of imported captures between saves for the 'imports' policy. Defaults to 25.
     """
-    # print starting orphan data removal
-    print("\n-- STARTING ORPHAN PURGE DATA REMOVAL --\n\n")
-
-    object_counter = sum(block.users == 0 for block in bpy.data.objects)
-    object_scene_counter = sum(
-        block.users_scene == 0 for block in bpy.data.objects)
-    mesh_counter = sum(block.users == 0 for block in bpy.data.meshes)
-    material_counter = sum(block.users == 0 for block in bpy.data.materials)
-    texture_counter = sum(block.users == 0 for block in bpy.data.textures)
-    image_counter = sum(block.users == 0 for block in bpy.data.images)
-    obs = [o for o in bpy.data.objects if not o.users_scene]
-    bpy.data.batch_remove(obs)
-
-    # get max num to delete
-    num_to_delete = max(object_counter, object_scene_counter,
-                        mesh_counter, material_counter, texture_counter, image_counter)
-
-    # purge data
-    bpy.ops.outliner.orphans_purge(
-        num_deleted=num_to_delete, do_local_ids=True, do_linked_ids=True, do_recursive=False)
-    bpy.ops.outliner.orphans_purge(
-        num_deleted=num_to_delete, do_local_ids=True, do_linked_ids=True, do_recursive=True)
+    if policy not in ('stage', 'interval', 'imports', 'always'):
+        raise ValueError(f"Unknown checkpoint policy: {policy}")
 
-    # print done and how much was removed
-    print("\n\n-- PURGE DATA REMOVAL FINISHED --\n")
+    checkpoint_state['policy'] = policy
+    checkpoint_state['interval_minutes'] = interval_minutes
+    checkpoint_state['every_n_imports'] = every_n_imports
+
+
+def checkpoint_save(reason: str, is_stage_boundary: bool = False, imported_capture: bool = False):
+    """Save the .blend file only when the current checkpoint policy asks for it, stage boundaries are always saved
 
+    Args:
+        reason (str): Message printed after the file is saved
+        is_stage_boundary (bool, optional): Set to true when a pipeline stage has completed. Defaults to False.
+        imported_capture (bool, optional): Set to true when a capture has been imported. Defaults to False.
 
-def remove_orphan_data():
-    """Remove data blocks with no users ie orphaned data
+    Returns:
+        bool: True if the file was saved
+    """
+    if imported_capture:
+        checkpoint_state['imports_since_save'] += 1
+
+    policy = checkpoint_state['policy']
+    minutes_since_save = (
+        time.time() - checkpoint_state['last_save_time']) / 60
+
+    should_save = (
+        is_stage_boundary
+        or policy == 'always'
+        or (policy == 'interval' and minutes_since_save >= checkpoint_state['interval_minutes'])
+        or (policy == 'imports' and checkpoint_state['imports_since_save'] >= checkpoint_state['every_n_imports'])
+    )
+
+    if should_save:
+        save_file(reason)
+
+    return should_save
+
+
+# bpy.data collections swept by purge_orphan_data
+PURGE_DATA_TYPES = ('objects', 'meshes', 'materials', 'textures', 'images',
+                    'node_groups', 'curves', 'lights', 'cameras', 'actions')
+
+
+def purge_orphan_data():
+    """Remove objects not in a scene and every data block with no users, or only used by data blocks being removed, in one batch
+
+    Returns:
+        dict: Number of data blocks removed for each bpy.data collection name
     """
     # print starting orphan data removal
     print("\n-- STARTING ORPHAN DATA REMOVAL --")
 
-    mesh_counter = 0
-    material_counter = 0
-    texture_counter = 0
-    image_counter = 0
-    object_counter = 0
-
-    object_scene_counter = sum(
-        block.users_scene == 0 for block in bpy.data.objects)
-    obs = [o for o in bpy.data.objects if not o.users_scene]
-    bpy.data.batch_remove(obs)
-
-    for block in bpy.data.objects:
-        if block.users == 0:
-            bpy.data.meshes.remove(block)
-            object_counter += 1
-
-    for block in bpy.data.meshes:
-        if block.users == 0:
-            bpy.data.meshes.remove(block)
-            mesh_counter += 1
-
-    for block in bpy.data.materials:
-        if block.users == 0:
-            bpy.data.materials.remove(block)
-            material_counter += 1
-
-    for block in bpy.data.textures:
-        if block.users == 0:
-            bpy.data.textures.remove(block)
-            texture_counter += 1
-
-    for block in bpy.data.images:
-        if block.users == 0:
-            bpy.data.images.remove(block)
-            image_counter += 1
+    id_types = {}
+    for data_type in PURGE_DATA_TYPES:
+        for block in getattr(bpy.data, data_type):
+            if not block.use_fake_user and block.library is None:
+                id_types[block] = data_type
+
+    to_remove = {block for block, data_type in id_types.items()
+                 if block.users == 0 or (data_type == 'objects' and not block.users_scene)}
+
+    # a block is also orphaned when everything using it is being removed, repeat until nothing else is added
+    user_map = bpy.data.user_map(subset=list(id_types))
+    added = True
+    while added:
+        added = False
+        for block, users in user_map.items():
+            if block not in to_remove and users and users <= to_remove:
+                to_remove.add(block)
+                added = True
+
+    removed_counts = {data_type: 0 for data_type in PURGE_DATA_TYPES}
+    for block in to_remove:
+        removed_counts[id_types[block]] += 1
+
+    bpy.data.batch_remove(list(to_remove))
 
     # print done and how much was removed
-    print(
-        f"\n\tNUMBER OF OBJECTS DATA REMOVED: {object_counter} \n\tNUMBER OF OBJECTS SCENE DATA REMOVED: {object_scene_counter}  \n\tNUMBER OF MESH DATA REMOVED: {mesh_counter} \n\tNUMBER OF MATERIAL DATA REMOVED: {material_counter} \n\tNUMBER OF TEXTURES REMOVED: {texture_counter} \n\tNUMBER OF IMAGES REMOVED: {image_counter}\n\n-- ORPHAN DATA REMOVAL FINISHED -- ")
+    counts = ''.join(f"\n\tNUMBER OF {data_type.upper()} REMOVED: {count}" for data_type, count in removed_counts.items() if count)
+    print(f"{counts}\n\tTOTAL REMOVED: {len(to_remove)}\n\n-- ORPHAN DATA REMOVAL FINISHED -- ")
+
+    return removed_counts
+
+
+def free_image_buffers():
+    """Free the pixel buffers of images loaded from files that have no unsaved changes, blender reloads them from disk when they are next used
+
+    Returns:
+        int: Number of images freed
+    """
+    freed_counter = 0
+
+    for image in bpy.data.images:
+        if image.source == 'FILE' and image.has_data and not image.is_dirty:
+            image.buffers_free()
+            freed_counter += 1
+
+    return freed_counter
 
 
 def export_model_to_fbx(col_name: str, export_file_path: str):
@@ -304,7 +357,7 @@ def write_to_file(filepath: str, lines: list[str] = None, line: str = None):
             log_file.write(f"{line}\n")
 
 
-def print_save_log(filepath: str, lines: list[str] = None, line: str = None, print_to_console: bool = True):
+def print_log(filepath: str, lines: list[str] = None, line: str = None, print_to_console: bool = True):
 
     write_to_file(filepath, lines, line)  # create log file
 
@@ -315,7 +368,13 @@ def print_save_log(filepath: str, lines: list[str] = None, line: str = None, pri
     elif line is not None and print_to_console:
         print(f"{line}")
 
-    save_file('Saved after log')
+
+def print_save_log(filepath: str, lines: list[str] = None, line: str = None, print_to_console: bool = True, is_stage_boundary: bool = False):
+
+    print_log(filepath, lines, line, print_to_console)
+
+    # only saves if the checkpoint policy requires it
+    checkpoint_save('Saved after log', is_stage_boundary=is_stage_boundary)
     return
 
 
@@ -0,0 +1,149 @@
+import json
+import os
+
+try:
+    import tomllib  # python 3.11+, blender 4.1 and later
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+
+# path constants that are files rather than folders so don't get a trailing separator
+FILE_PATH_CONSTANTS = ('LOG_FILE_PATH',)
+
+# top level keys an area config can hold alongside its [paths] and [settings] tables, memory_gb is only used by the job queue
+AREA_CONFIG_KEYS = ('blend_file', 'memory_gb', 'paths', 'settings')
+
+
+def get_config_filepaths(script_args: list[str]):
+    """Get every area config passed on the command line, '--config a.toml b.toml' and '--config a.toml --config b.toml' both work
+
+    Args:
+        script_args (list[str]): Arguments after -- from get_script_args
+
+    Returns:
+        list[str]: Config filepaths in the order given
+    """
+    config_filepaths = []
+    reading_configs = False
+
+    for arg in script_args:
+        if arg == '--config':
+            reading_configs = True
+        elif arg.startswith('--'):
+            reading_configs = False
+        elif reading_configs:
+            config_filepaths.append(os.path.abspath(arg))
+
+    return config_filepaths
+
+
+def load_config_file(filepath: str):
+    """Read an area config from a .toml or .json file, both use the same keys
+
+    Args:
+        filepath (str): Path to the config file
+
+    Returns:
+        dict: The config
+    """
+    extension = os.path.splitext(filepath)[1].lower()
+
+    if extension == '.toml':
+        if tomllib is None:
+            raise RuntimeError(
+                f"Can't read {filepath}, this blender's python has no tomllib (added in python 3.11), use a .json config with the same keys instead")
+        with open(filepath, "rb") as config_file:
+            config = tomllib.load(config_file)
+
+    elif extension == '.json':
+        with open(filepath, "r") as config_file:
+            config = json.load(config_file)
+
+    else:
+        raise ValueError(f"Config {filepath} must be a .toml or .json file")
+
+    unknown_keys = set(config) - set(AREA_CONFIG_KEYS)
+    if unknown_keys:
+        raise ValueError(
+            f"Unknown keys in {filepath}: {', '.join(sorted(unknown_keys))}, put paths under [paths] and settings under [settings]")
+
+    return config
+
+
+def get_area_settings(config: dict, config_filepath: str, default_settings: dict):
+    """Check an area config's settings against the script defaults
+
+    Args:
+        config (dict): Config from load_config_file
+        config_filepath (str): Path of the config, used in error messages
+        default_settings (dict): Setting names and default values from the script
+
+    Returns:
+        dict: Default settings updated with the config's settings
+    """
+    settings = dict(default_settings)
+
+    for name, value in config.get('settings', {}).items():
+        if name not in default_settings:
+            raise ValueError(f"Unknown setting {name} in {config_filepath}")
+
+        default = default_settings[name]
+        if isinstance(default, bool) or isinstance(value, bool):
+            # bool is a subclass of int so true and false are only taken for switches
+            matches_type = isinstance(default, bool) and isinstance(value, bool)
+        elif isinstance(default, (int, float)):
+            # numbers can be written either way, minute, second and gb defaults are written as ints but 7.5 is still valid
+            matches_type = isinstance(value, (int, float))
+        else:
+            matches_type = isinstance(value, type(default))
+        if not matches_type:
+            raise ValueError(
+                f"Setting {name} in {config_filepath} should be a {type(default).__name__}, got {value!r}")
+
+        settings[name] = value
+
+    return settings
+
+
+def get_area_paths(config: dict, config_filepath: str, default_paths: dict):
+    """Resolve an area config's paths, folders get a trailing separator and paths that aren't given are derived where possible
+
+    Args:
+        config (dict): Config from load_config_file
+        config_filepath (str): Path of the config, relative paths are resolved from its folder
+        default_paths (dict): Path constant names and values from constants.py
+
+    Returns:
+        dict: Path constant names to paths
+    """
+    config_folder = os.path.dirname(config_filepath)
+    given_paths = {}
+
+    for name, value in config.get('paths', {}).items():
+        constant_name = name.upper()
+        if constant_name not in default_paths:
+            raise ValueError(f"Unknown path {name} in {config_filepath}")
+
+        path = os.path.join(config_folder, os.path.expanduser(value))
+        if constant_name not in FILE_PATH_CONSTANTS and not path.endswith(('/', '\\')):
+            path += os.sep
+        given_paths[constant_name] = path
+
+    # the error folder and log file sit inside their folders unless set themselves
+    if 'RDC_FILE_PATH' in given_paths and 'RDC_ERROR_PATH' not in given_paths:
+        given_paths['RDC_ERROR_PATH'] = os.path.join(
+            given_paths['RDC_FILE_PATH'], 'ERROR', '')
+    if 'LOG_FOLDER_PATH' in given_paths and 'LOG_FILE_PATH' not in given_paths:
+        given_paths['LOG_FILE_PATH'] = f"{given_paths['LOG_FOLDER_PATH']}log.txt"
+
+    paths = {**default_paths, **given_paths}
+
+    placeholder_paths = [name.lower() for name, path in paths.items() if '****' in path]
+    if placeholder_paths:
+        raise ValueError(
+            f"Set {', '.join(placeholder_paths)} under [paths] in {config_filepath} or in constants.py")
+
+    return paths
@@ -0,0 +1,136 @@
+import bpy
+import bmesh
+import math
+import numpy as np
+
+
+def get_mesh_edge_flags(mesh: bpy.types.Mesh, attribute: str):
+    """Read a bool attribute of every edge, like 'use_seam', 'use_edge_sharp' or 'select', in one call
+
+    Returns:
+        np.ndarray: Bool array with one value per edge
+    """
+    flags = np.zeros(len(mesh.edges), dtype=bool)
+    mesh.edges.foreach_get(attribute, flags)
+
+    return flags
+
+
+def get_edge_face_angles(mesh: bpy.types.Mesh):
+    """Get the angle between the two face normals of every edge, the same value as BMEdge.calc_face_angle
+
+    Args:
+        mesh (bpy.types.Mesh): Mesh in object mode
+
+    Returns:
+        np.ndarray: Angle in radians for each edge, nan for edges without exactly two faces
+    """
+    edge_count = len(mesh.edges)
+    polygon_count = len(mesh.polygons)
+
+    # buffers match the types blender stores so foreach_get copies them directly instead of converting each value
+    normals = np.zeros(polygon_count * 3, dtype=np.float32)
+    mesh.polygons.foreach_get('normal', normals)
+    normals = normals.reshape(polygon_count, 3).astype(np.float64)
+
+    loop_totals = np.zeros(polygon_count, dtype=np.int32)
+    mesh.polygons.foreach_get('loop_total', loop_totals)
+
+    loop_edges = np.zeros(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get('edge_index', loop_edges)
+    loop_edges = loop_edges.astype(np.int64)
+
+    # polygon loops are stored one polygon after another so repeating each polygon index gives the polygon of each loop
+    loop_faces = np.repeat(np.arange(polygon_count), loop_totals)
+
+    # group the loops by edge, an edge with two faces has two loops next to each other
+    order = np.argsort(loop_edges, kind='stable')
+    sorted_faces = loop_faces[order]
+    face_counts = np.bincount(loop_edges, minlength=edge_count)
+    first_loop = np.concatenate(([0], np.cumsum(face_counts)[:-1]))
+
+    angles = np.full(edge_count, np.nan)
+    two_face_edges = np.flatnonzero(face_counts == 2)
+    first_normals = normals[sorted_faces[first_loop[two_face_edges]]]
+    second_normals = normals[sorted_faces[first_loop[two_face_edges] + 1]]
+
+    dots = np.einsum('ij,ij->i', first_normals, second_normals)
+    angles[two_face_edges] = np.arccos(np.clip(dots, -1.0, 1.0))
+
+    return angles
+
+
+def get_sharp_seam_mask(mesh: bpy.types.Mesh, edge_sharpness: float = 15):
+    """Find the edges create_clear_seam marks, edges marked sharp whose faces meet at edge_sharpness degrees or more
+
+    Returns:
+        np.ndarray: Bool array with one value per edge
+    """
+    angles = get_edge_face_angles(mesh)
+    sharp = get_mesh_edge_flags(mesh, 'use_edge_sharp')
+
+    # edges without two faces have no angle, np.nan compares as False so they are never seams
+    with np.errstate(invalid='ignore'):
+        return sharp & (angles >= math.radians(edge_sharpness))
+
+
+def create_clear_mesh_seam(mesh: bpy.types.Mesh, edge_sharpness: float = 15, clear: bool = False):
+    """Mesh version of create_clear_seam that reads and writes every edge at once, seam edges and their verts are also selected
+
+    Args:
+        mesh (bpy.types.Mesh): Mesh in object mode
+        edge_sharpness (float, optional): The angle of desired sharpness in degrees. Defaults to 15.
+        clear (bool, optional): Clear all seams instead of creating them. Defaults to False.
+
+    Returns:
+        np.ndarray: Bool seam mask with one value per edge
+    """
+    if clear:
+        seams = np.zeros(len(mesh.edges), dtype=bool)
+        mesh.edges.foreach_set('use_seam', seams)
+        return seams
+
+    seams = get_sharp_seam_mask(mesh, edge_sharpness=edge_sharpness)
+    mesh.edges.foreach_set('use_seam', get_mesh_edge_flags(mesh, 'use_seam') | seams)
+    mesh.edges.foreach_set('select', get_mesh_edge_flags(mesh, 'select') | seams)
+
+    vert_select = np.zeros(len(mesh.vertices), dtype=bool)
+    mesh.vertices.foreach_get('select', vert_select)
+    vert_select[get_edge_vertex_mask(mesh, seams)] = True
+    mesh.vertices.foreach_set('select', vert_select)
+
+    mesh.update()
+
+    return seams
+
+
+def get_edge_vertex_mask(mesh: bpy.types.Mesh, edge_mask: np.ndarray):
+    """Get the vertices used by the edges in edge_mask
+
+    Returns:
+        np.ndarray: Bool array with one value per vertex
+    """
+    edge_verts = np.zeros(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get('vertices', edge_verts)
+
+    vertex_mask = np.zeros(len(mesh.vertices), dtype=bool)
+    vertex_mask[edge_verts.reshape(-1, 2)[edge_mask].ravel()] = True
+
+    return vertex_mask
+
+
+def get_bmesh_seam_masks(bm: bmesh.types.BMesh, edge_sharpness: float = 15):
+    """Find the seam edges of a bmesh with get_sharp_seam_mask, bmesh can't be read with foreach_get so it is copied to a
+    temporary mesh first, which keeps the bmesh's vertex and edge order
+
+    Returns:
+        tuple: (bool seam mask with one value per bm edge, bool mask of the verts on those edges with one value per bm vert)
+    """
+    mesh = bpy.data.meshes.new('seam_mask_temp')
+
+    try:
+        bm.to_mesh(mesh)
+        seams = get_sharp_seam_mask(mesh, edge_sharpness=edge_sharpness)
+        return seams, get_edge_vertex_mask(mesh, seams)
+    finally:
+        bpy.data.meshes.remove(mesh)
@@ -0,0 +1,518 @@
+import bpy
+import hashlib
+import os
+import struct
+import zlib
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from shared_common_methods import *
+from shared_io_methods import *
+
+
+# output format for lily texture packs and baked textures, one of 'PNG', 'WEBP', 'JPEG', 'OPEN_EXR' or 'BMP'
+image_output_settings = {'file_format': 'PNG',
+                         'png_compression_level': 6, 'jpeg_quality': 90}
+
+IMAGE_EXTENSIONS = {'PNG': '.png', 'WEBP': '.webp',
+                    'JPEG': '.jpg', 'OPEN_EXR': '.exr', 'BMP': '.bmp'}
+
+# images being written by the io worker, (image name, filepath, future)
+pending_image_outputs = []
+
+# material name to (image name, image size) for the image feeding each material's bsdf, filled as captures are imported
+# keyed by material as merges and joins keep materials but rename and combine objects
+material_image_index = {}
+# image name to the names of the materials indexed with it, so remapping an image only visits the materials using it
+image_material_index = {}
+
+
+def set_image_output_format(file_format: str, png_compression_level: int = 6, jpeg_quality: int = 90):
+
+    if file_format not in IMAGE_EXTENSIONS:
+        raise ValueError(
+            f"Unknown image output format {file_format}, use one of {', '.join(IMAGE_EXTENSIONS)}")
+
+    image_output_settings['file_format'] = file_format
+    image_output_settings['png_compression_level'] = png_compression_level
+    image_output_settings['jpeg_quality'] = jpeg_quality
+
+
+def get_image_extension():
+    return IMAGE_EXTENSIONS[image_output_settings['file_format']]
+
+
+def filter_png_rows(rows: np.ndarray, previous_row: np.ndarray, bytes_per_pixel: int):
+    """Filter a block of PNG scanlines, each row gets whichever of None, Sub, Up or Paeth leaves the smallest sum of
+    absolute differences, the heuristic libpng uses
+
+    Args:
+        rows (np.ndarray): uint8 array of shape (rows, row bytes)
+        previous_row (np.ndarray): Row above the block, zeros for the first block
+        bytes_per_pixel (int): Channels of the image as each channel is one byte
+
+    Returns:
+        np.ndarray: uint8 array of shape (rows, row bytes + 1), each row starting with its filter type
+    """
+    current = rows.astype(np.int16)
+    up = np.vstack((previous_row[np.newaxis], rows[:-1])).astype(np.int16)
+    left = np.zeros_like(current)
+    left[:, bytes_per_pixel:] = current[:, :-bytes_per_pixel]
+    up_left = np.zeros_like(current)
+    up_left[:, bytes_per_pixel:] = up[:, :-bytes_per_pixel]
+
+    # paeth picks whichever of left, up and up left is closest to left + up - up left
+    left_distance = np.abs(up - up_left)
+    up_distance = np.abs(left - up_left)
+    up_left_distance = np.abs(left + up - 2 * up_left)
+    paeth = np.where((left_distance <= up_distance) & (left_distance <= up_left_distance), left,
+                     np.where(up_distance <= up_left_distance, up, up_left))
+
+    # filter types 0 none, 1 sub, 2 up and 4 paeth, average isn't used as it rarely wins on photo textures
+    filter_types = np.array([0, 1, 2, 4], dtype=np.uint8)
+    filtered = np.stack([current, current - left, current - up, current - paeth]).astype(np.uint8)
+
+    # bytes are compared as signed values so small negative differences count as small
+    costs = np.abs(filtered.view(np.int8).astype(np.int32)).sum(axis=2)
+    best = np.argmin(costs, axis=0)
+
+    block = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+    block[:, 0] = filter_types[best]
+    block[:, 1:] = filtered[best, np.arange(rows.shape[0])]
+
+    return block
+
+
+def encode_png(filepath: str, pixels: np.ndarray, compression_level: int, block_rows: int = 256):
+    """Write an 8 bit PNG from a pixel buffer, safe to run off the main thread as it never touches bpy
+
+    Rows are filtered and compressed block_rows at a time so only a block of filter candidates is held in memory.
+
+    Args:
+        filepath (str): Output filepath
+        pixels (np.ndarray): Float pixels from Image.pixels of shape (height, width, channels) in blender's bottom row first order,
+        or uint8 pixels ordered top row first
+        compression_level (int): zlib compression level 0 - 9
+        block_rows (int, optional): Rows filtered and compressed at once. Defaults to 256.
+    """
+    height, width, channels = pixels.shape
+    if channels not in (3, 4):
+        raise ValueError(f"encode_png only writes RGB or RGBA, {filepath} has {channels} channels")
+
+    if pixels.dtype != np.uint8:
+        # byte images give their pixels as byte / 255 so this round trips exactly, flip as blender stores the bottom row first
+        pixels = np.rint(pixels[::-1] * 255).astype(np.uint8)
+
+    colour_type = 6 if channels == 4 else 2
+    rows = pixels.reshape(height, width * channels)
+
+    def chunk(chunk_type: bytes, data: bytes):
+        return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, colour_type, 0, 0, 0)
+    compressor = zlib.compressobj(compression_level)
+    previous_row = np.zeros(width * channels, dtype=np.uint8)
+
+    # written to a temp file and replaced so a run stopped mid write never leaves a partial image at filepath
+    temp_filepath = f"{filepath}.tmp"
+    with open(temp_filepath, 'wb') as file:
+        file.write(b'\x89PNG\r\n\x1a\n')
+        file.write(chunk(b'IHDR', header))
+
+        for start in range(0, height, block_rows):
+            block = filter_png_rows(rows[start:start + block_rows], previous_row, channels)
+            previous_row = rows[min(start + block_rows, height) - 1]
+            # zlib releases the GIL while compressing so the main thread keeps running
+            image_data = compressor.compress(block.tobytes())
+            if image_data:
+                file.write(chunk(b'IDAT', image_data))
+
+        file.write(chunk(b'IDAT', compressor.flush()))
+        file.write(chunk(b'IEND', b''))
+
+    os.replace(temp_filepath, filepath)
+
+
+def save_image_output(img: bpy.types.Image, filepath: str):
+    """Save an image in the configured output format, 8 bit RGB and RGBA PNGs are converted and encoded by the io worker
+    from the image's pixel buffer. Blender writes every other format and channel count itself on the main thread, as
+    Image.save can't run off it
+
+    Call finish_image_outputs before the encoded file is needed, the image stays generated so its pixels stay loaded.
+
+    Args:
+        img (bpy.types.Image): Image to save, it stays loaded so it can be used straight away
+        filepath (str): Output filepath including the extension from get_image_extension
+    """
+    file_format = image_output_settings['file_format']
+    img.filepath_raw = filepath
+    img.file_format = file_format
+
+    # grey and grey alpha images are left to blender
+    if file_format == 'PNG' and not img.is_float and img.channels in (3, 4):
+        width, height = img.size
+        channels = img.channels
+        # only reading the pixels needs bpy, converting them to bytes happens on the io worker with the encode
+        pixels = np.empty(width * height * channels, dtype=np.float32)
+        img.pixels.foreach_get(pixels)
+
+        future = submit_io_task(f"encode {filepath}", encode_png, filepath, pixels.reshape(height, width, channels),
+                                image_output_settings['png_compression_level'])
+        pending_image_outputs.append((img.name, filepath, future))
+        return
+
+    if file_format == 'JPEG':
+        img.save(quality=image_output_settings['jpeg_quality'])
+    elif file_format == 'WEBP':
+        # quality 100 writes lossless webp
+        img.save(quality=100)
+    else:
+        img.save()
+
+
+def finish_image_outputs():
+    """Wait for images being encoded by the io worker, the images keep their pixels in memory as switching their source
+    to the file would make blender free and reload them, relink_image_outputs does that once they are no longer needed"""
+
+    while pending_image_outputs:
+        img_name, filepath, future = pending_image_outputs.pop(0)
+        img = bpy.data.images.get(img_name)
+
+        if future is not None and not future.result():
+            # encoding failed so let blender write it instead
+            print(f"Background encode failed for {filepath}, saving with blender")
+            img.save()
+
+
+def relink_image_outputs(image_outputs: dict):
+    """Point generated images at the files written for them so the .blend file loads them, blender frees each image's
+    pixels and reloads them from the file the next time they are used
+
+    Args:
+        image_outputs (dict): Image name to the filepath written by save_image_output
+
+    Returns:
+        list[str]: Names of the images whose file is missing
+    """
+    missing = []
+
+    for img_name, filepath in image_outputs.items():
+        img = bpy.data.images.get(img_name)
+        if img is None or img.source != 'GENERATED':
+            continue
+
+        if not os.path.exists(filepath):
+            missing.append(img_name)
+            continue
+
+        img.filepath_raw = filepath
+        img.source = 'FILE'
+
+    return missing
+
+
+def hash_file(filepath: str):
+
+    file_hash = hashlib.blake2b(digest_size=16)
+    with open(filepath, 'rb') as file:
+        while chunk := file.read(1024 * 1024):
+            file_hash.update(chunk)
+
+    return file_hash.hexdigest()
+
+
+def hash_image_pixels(img: bpy.types.Image):
+
+    width, height = img.size
+    pixels = np.empty(width * height * img.channels, dtype=np.float32)
+    img.pixels.foreach_get(pixels)
+
+    return hashlib.blake2b(pixels, digest_size=16).hexdigest()
+
+
+def get_image_bytes(img: bpy.types.Image):
+
+    width, height = img.size
+    return width * height * img.channels * (4 if img.is_float else 1)
+
+
+def new_image_dedup_state():
+    """State that lets dedup_images compare each batch of images with the batches before it, images are recorded by their
+    session_uid as blender gives a removed image's name to the next image made with it
+
+    Returns:
+        dict: Session uids of the images already compared, the one image of each size not hashed yet, the sizes being hashed,
+        content hash to kept image and the running totals
+    """
+    return {'seen': set(), 'unhashed': {}, 'hashed_shapes': set(), 'content': {}, 'removed': 0, 'bytes_saved': 0}
+
+
+def get_image_record(img: bpy.types.Image):
+
+    return img.name, img.session_uid
+
+
+def get_recorded_image(image_record: tuple):
+    """Get the image an image record was made from, None if it has been removed even if another image now has its name"""
+
+    img = bpy.data.images.get(image_record[0])
+    return img if img is not None and img.session_uid == image_record[1] else None
+
+
+# kept across imports so each capture's images are only compared with the images of the captures before it
+image_dedup_state = new_image_dedup_state()
+
+
+def dedup_images(images: list, hash_workers: int = 4, dedup_state: dict = None):
+    """Collapse images with identical content onto one datablock
+
+    Images loaded from a file are compared by the file's bytes, hashed on a thread pool, others by their pixel buffer.
+    Only images sharing a size with another image are hashed. With a dedup_state the images are also compared with
+    every batch given before, and images already compared are skipped.
+
+    Args:
+        images (list): Images to compare, usually the capture image of each object
+        hash_workers (int, optional): Threads used to hash image files. Defaults to 4.
+        dedup_state (dict, optional): State from new_image_dedup_state shared between calls. Defaults to None.
+
+    Returns:
+        tuple: (number of images removed, bytes of pixel data saved)
+    """
+    if dedup_state is None:
+        dedup_state = new_image_dedup_state()
+
+    new_images = {img.session_uid: img for img in images
+                  if img is not None and img.type == 'IMAGE' and img.session_uid not in dedup_state['seen']}
+    dedup_state['seen'].update(new_images)
+
+    # only images with the same size and channels can be identical
+    images_by_shape = {}
+    for img in new_images.values():
+        shape = (tuple(img.size), img.channels, img.is_float)
+        images_by_shape.setdefault(shape, []).append(img)
+
+    candidates = []
+    for shape, shape_images in images_by_shape.items():
+        earlier_record = dedup_state['unhashed'].pop(shape, None)
+        earlier_img = None if earlier_record is None else get_recorded_image(earlier_record)
+        if earlier_img is not None:
+            shape_images = [earlier_img] + shape_images
+
+        if len(shape_images) > 1 or shape in dedup_state['hashed_shapes']:
+            dedup_state['hashed_shapes'].add(shape)
+            candidates.extend(shape_images)
+        else:
+            # the only image of its size so far, it is hashed once another image of the same size turns up
+            dedup_state['unhashed'][shape] = get_image_record(shape_images[0])
+
+    image_filepaths = {}
+    for img in candidates:
+        filepath = bpy.path.abspath(img.filepath)
+        if img.source == 'FILE' and img.packed_file is None and os.path.isfile(filepath):
+            image_filepaths[img.name] = filepath
+
+    # reading and hashing files never touches bpy so it can run off the main thread
+    with ThreadPoolExecutor(max_workers=hash_workers) as executor:
+        file_hashes = dict(zip(image_filepaths, executor.map(hash_file, image_filepaths.values())))
+
+    duplicates = []
+    bytes_saved = 0
+
+    for img in candidates:
+        if img.name in file_hashes:
+            content_key = (tuple(img.size), img.channels, img.is_float, 'file', file_hashes[img.name])
+        else:
+            content_key = (tuple(img.size), img.channels, img.is_float, 'pixels', hash_image_pixels(img))
+
+        kept_img = get_recorded_image(dedup_state['content'].setdefault(content_key, get_image_record(img)))
+        if kept_img is None:
+            # the kept image was removed since it was hashed so this one takes its place
+            dedup_state['content'][content_key] = get_image_record(img)
+            continue
+
+        if kept_img == img:
+            continue
+
+        # points every material node using the duplicate at the kept image
+        img.user_remap(kept_img)
+        remap_indexed_image(img_name=img.name, new_img=kept_img)
+        bytes_saved += get_image_bytes(img)
+        duplicates.append(img)
+
+    removed = len(duplicates)
+    bpy.data.batch_remove(duplicates)
+
+    dedup_state['removed'] += removed
+    dedup_state['bytes_saved'] += bytes_saved
+
+    return removed, bytes_saved
+
+
+def get_socket_value(socket):
+
+    value = getattr(socket, 'default_value', None)
+
+    if isinstance(value, float):
+        return round(value, 6)
+    if value is not None and not isinstance(value, (int, str, bool)):
+        return tuple(round(v, 6) for v in value)
+
+    return value
+
+
+def get_material_signature(mat: bpy.types.Material):
+    """Describe a material's node tree so materials that render the same can be found
+
+    Returns:
+        tuple: The nodes, their unlinked input values, images and links, None if the material doesn't use nodes
+    """
+    if not mat.use_nodes or mat.node_tree is None:
+        return None
+
+    nodes = []
+    for node in sorted(mat.node_tree.nodes, key=lambda n: n.name):
+        inputs = tuple((socket.identifier, get_socket_value(socket))
+                       for socket in node.inputs if not socket.is_linked)
+
+        image_settings = None
+        if node.type == 'TEX_IMAGE':
+            image_settings = (node.image.name if node.image else None,
+                              node.interpolation, node.extension, node.projection)
+
+        nodes.append((node.name, node.bl_idname, image_settings, inputs))
+
+    links = tuple(sorted((link.from_node.name, link.from_socket.identifier, link.to_node.name,
+                          link.to_socket.identifier) for link in mat.node_tree.links))
+
+    return (mat.blend_method, mat.use_backface_culling, tuple(nodes), links)
+
+
+def consolidate_materials(materials: list):
+    """Collapse materials with identical node trees and images onto one datablock and remove them along with orphan images
+
+    Args:
+        materials (list): Materials to compare
+
+    Returns:
+        int: Number of materials removed
+    """
+    kept_materials = {}
+    duplicates = []
+
+    for mat in materials:
+        if mat.use_fake_user:
+            continue
+
+        signature = get_material_signature(mat)
+        if signature is None:
+            continue
+
+        kept_mat = kept_materials.setdefault(signature, mat)
+        if kept_mat == mat:
+            continue
+
+        # every object slot using the duplicate now uses the kept material
+        mat.user_remap(kept_mat)
+        duplicates.append(mat)
+
+    # duplicates share their kept material's images so no new orphan images are made, only ones already unused
+    orphan_images = [img for img in bpy.data.images if img.users == 0 and img.type == 'IMAGE']
+
+    for mat in duplicates:
+        remove_material_index_entry(mat.name)
+
+    bpy.data.batch_remove(duplicates + orphan_images)
+
+    return len(duplicates)
+
+
+def find_material_image(mat: bpy.types.Material):
+    """Walk a material's node tree for the image feeding the Principled BSDF base colour, or its first image node
+
+    Returns:
+        bpy.types.Image: The image, None if the material has no image node
+    """
+    if mat is None or not mat.use_nodes or mat.node_tree is None:
+        return None
+
+    nodes = mat.node_tree.nodes
+    bsdf_node = nodes.get('Principled BSDF')
+
+    if bsdf_node is not None:
+        input_socket = bsdf_node.inputs[0]
+        # get the link that inputs into the bsdf and into the socket this will be the image link
+        node_link = next((link for link in mat.node_tree.links if link.to_node ==
+                          bsdf_node and link.to_socket == input_socket), None)
+
+        if node_link is not None and node_link.from_node.type == 'TEX_IMAGE':
+            return node_link.from_node.image
+
+    image_node = next((node for node in nodes if node.type == 'TEX_IMAGE'), None)
+    return None if image_node is None else image_node.image
+
+
+def index_material(mat: bpy.types.Material):
+
+    img = find_material_image(mat)
+    entry = (None, (0, 0)) if img is None else (img.name, tuple(img.size))
+    set_material_index_entry(mat.name, entry)
+
+    return entry
+
+
+def set_material_index_entry(mat_name: str, entry: tuple):
+
+    remove_material_index_entry(mat_name)
+    material_image_index[mat_name] = entry
+    if entry[0] is not None:
+        image_material_index.setdefault(entry[0], set()).add(mat_name)
+
+
+def remove_material_index_entry(mat_name: str):
+
+    entry = material_image_index.pop(mat_name, None)
+    if entry is not None and entry[0] in image_material_index:
+        image_material_index[entry[0]].discard(mat_name)
+
+
+def clear_material_image_index():
+
+    material_image_index.clear()
+    image_material_index.clear()
+
+
+def index_object_materials(objs):
+    """Add the materials of newly imported objects to material_image_index"""
+
+    for obj in objs:
+        for slot in obj.material_slots:
+            if slot.material is not None and slot.material.name not in material_image_index:
+                index_material(slot.material)
+
+
+def get_material_image(mat: bpy.types.Material):
+
+    entry = material_image_index.get(mat.name) or index_material(mat)
+    if entry[0] is None:
+        return None
+
+    img = bpy.data.images.get(entry[0])
+    if img is None:
+        # image was removed or renamed since the material was indexed
+        entry = index_material(mat)
+        img = None if entry[0] is None else bpy.data.images.get(entry[0])
+
+    return img
+
+
+def get_material_image_size(mat: bpy.types.Material):
+
+    entry = material_image_index.get(mat.name) or index_material(mat)
+    return entry[1]
+
+
+def remap_indexed_image(img_name: str, new_img: bpy.types.Image):
+
+    new_entry = (new_img.name, tuple(new_img.size))
+    for mat_name in image_material_index.pop(img_name, set()):
+        material_image_index[mat_name] = new_entry
+        image_material_index.setdefault(new_img.name, set()).add(mat_name)
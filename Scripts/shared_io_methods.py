@@ -0,0 +1,100 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from shared_common_methods import *
+
+
+# background file operations, tasks must only touch the file system never bpy as blender data isn't thread safe
+io_state = {'executor': None, 'semaphore': None,
+            'futures': [], 'log_filepath': None, 'run_log_filepath': None, 'failures': []}
+
+# tasks write to the io log from several threads
+io_log_lock = threading.Lock()
+
+
+def start_io_worker(log_filepath: str, max_workers: int = 2, max_pending: int = 64, run_log_filepath: str = None):
+    """Start the background pool used by submit_io_task
+
+    Args:
+        log_filepath (str): Log file each completed or failed task is written to
+        run_log_filepath (str, optional): Run log failed tasks are also written to when the pool is drained. Defaults to None.
+        max_workers (int, optional): Number of threads doing file operations. Defaults to 2.
+        max_pending (int, optional): Tasks that can wait before submit_io_task blocks. Defaults to 64.
+    """
+    if io_state['executor'] is not None:
+        return
+
+    io_state['executor'] = ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix='rdc_io')
+    io_state['semaphore'] = threading.BoundedSemaphore(max_pending)
+    io_state['futures'] = []
+    io_state['log_filepath'] = log_filepath
+    io_state['run_log_filepath'] = run_log_filepath
+    io_state['failures'] = []
+
+
+def run_io_task(description: str, func, args: tuple):
+
+    task_start = time.time()
+
+    try:
+        func(*args)
+        line = f"Completed {description} in {round(time.time() - task_start, 2)} seconds"
+        return True
+
+    except Exception as err:
+        line = f"Failed {description}: {err}"
+        # print_save_log can save the .blend file so failures are logged to the run log from the main thread in drain_io_tasks
+        with io_log_lock:
+            io_state['failures'].append(line)
+        return False
+
+    finally:
+        io_state['semaphore'].release()
+        with io_log_lock:
+            write_to_file(filepath=io_state['log_filepath'], line=line)
+
+
+def submit_io_task(description: str, func, *args):
+    """Run func(*args) on the background pool, or straight away if the pool hasn't been started
+
+    Args:
+        description (str): Description written to the io log
+        func: File operation to run, must not use bpy
+
+    Returns:
+        Future: Resolves to True if the task succeeded, None if it was run straight away
+    """
+    if io_state['executor'] is None:
+        func(*args)
+        return None
+
+    # block when too many tasks are waiting so the queue stays bounded
+    io_state['semaphore'].acquire()
+    future = io_state['executor'].submit(run_io_task, description, func, args)
+    io_state['futures'].append(future)
+
+    return future
+
+
+def drain_io_tasks():
+    """Wait for all background file operations to finish and stop the pool, failed tasks are written to the run log
+
+    Returns:
+        tuple: (number of tasks completed, number of tasks failed)
+    """
+    if io_state['executor'] is None:
+        return 0, 0
+
+    results = [future.result() for future in io_state['futures']]
+    io_state['executor'].shutdown(wait=True)
+    io_state['executor'] = None
+    io_state['futures'] = []
+
+    # the pool is stopped first so a save made by print_save_log runs any new file operations straight away
+    if io_state['run_log_filepath'] is not None and io_state['failures']:
+        failures = io_state['failures']
+        io_state['failures'] = []
+        print_save_log(filepath=io_state['run_log_filepath'], lines=failures)
+
+    return results.count(True), results.count(False)
@@ -0,0 +1,117 @@
+import bpy
+import json
+import os
+import time
+from shared_common_methods import *
+
+
+# in memory copy of the run manifest, it is written to disk after each save of the .blend file so the file on disk
+# always describes the last checkpointed .blend, update it in place as other modules hold a reference to it
+run_manifest = {}
+
+# where the manifest is written to, set by load_manifest
+manifest_state = {'filepath': None}
+
+
+def new_manifest():
+
+    return {
+        'blend_filepath': '',
+        'saved_at': None,
+        'stages_completed': [],
+        'imported': [],
+        'failed': [],
+        'merged': [],
+        # captures the overlap merge left outside the main collection, they are not merged into the model
+        'unmerged': [],
+        'main_col': '',
+        'next_col_index': 1,
+        'capture_resolution': None,
+        'pack_groups': {},
+        'textured': [],
+        # texture pack image name to the file written for it, the images stay generated until the end of the run
+        'image_outputs': {},
+        'pack_result': None,
+    }
+
+
+def load_manifest(filepath: str, resume: bool = False):
+    """Load the run manifest from filepath when resuming otherwise start a new one, the manifest is then written after every save
+
+    Args:
+        filepath (str): Path to the json manifest file
+        resume (bool, optional): Set to true to load the existing manifest. Defaults to False.
+
+    Returns:
+        dict: The run manifest
+    """
+    run_manifest.clear()
+    run_manifest.update(new_manifest())
+
+    if resume and os.path.exists(filepath):
+        with open(filepath, "r") as manifest_file:
+            run_manifest.update(json.load(manifest_file))
+        print(f"Loaded run manifest {filepath}, completed stages: {run_manifest['stages_completed']}")
+
+    elif resume:
+        print(f"No run manifest found at {filepath}, starting a new run")
+
+    manifest_state['filepath'] = filepath
+
+    # write the manifest each time the blend file is saved
+    if write_manifest not in save_file_callbacks:
+        save_file_callbacks.insert(0, write_manifest)
+
+    return run_manifest
+
+
+def write_manifest():
+
+    if manifest_state['filepath'] is None:
+        return
+
+    run_manifest['blend_filepath'] = bpy.data.filepath
+    run_manifest['saved_at'] = time.strftime("%Y-%m-%d %H:%M:%S")
+
+    # write to a temp file and replace so a crash mid write can't corrupt the manifest
+    temp_filepath = f"{manifest_state['filepath']}.tmp"
+    with open(temp_filepath, "w") as manifest_file:
+        json.dump(run_manifest, manifest_file, indent=2)
+    os.replace(temp_filepath, manifest_state['filepath'])
+
+
+def reload_checkpoint_blend():
+    """Open the .blend file recorded in the manifest if it is not the currently open file
+
+    Returns:
+        bool: True if a different file was opened
+    """
+    blend_filepath = run_manifest.get('blend_filepath')
+
+    if not blend_filepath or not os.path.exists(blend_filepath):
+        return False
+
+    if os.path.normcase(os.path.abspath(bpy.data.filepath)) == os.path.normcase(os.path.abspath(blend_filepath)):
+        return False
+
+    print(f"Reloading last checkpointed file {blend_filepath}")
+    bpy.ops.wm.open_mainfile(filepath=blend_filepath)
+
+    return True
+
+
+def manifest_has_stage(stage: str):
+
+    return stage in run_manifest['stages_completed']
+
+
+def manifest_complete_stage(stage: str):
+
+    if stage not in run_manifest['stages_completed']:
+        run_manifest['stages_completed'].append(stage)
+
+
+def manifest_add(key: str, value):
+
+    if value not in run_manifest[key]:
+        run_manifest[key].append(value)
@@ -0,0 +1,113 @@
+import os
+import sys
+
+# resource only exists on unix
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# psutil is optional, when it isn't installed in blenders python the platform fallbacks below are used
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+if sys.platform == 'win32':
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD), ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage',
+                                                                   ctypes.c_size_t), ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaNonPagedPoolUsage', ctypes.c_size_t), ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+
+def get_process_memory_counters():
+    """Get this process's memory counters from GetProcessMemoryInfo, windows only"""
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(PROCESS_MEMORY_COUNTERS)
+    process_handle = ctypes.windll.kernel32.GetCurrentProcess()
+    ctypes.windll.psapi.GetProcessMemoryInfo(
+        process_handle, ctypes.byref(counters), counters.cb)
+
+    return counters
+
+
+def get_available_memory_bytes():
+    """Get the amount of memory available to new processes
+
+    Returns:
+        int: Available memory in bytes or None if it can't be found on this platform
+    """
+    if psutil is not None:
+        return psutil.virtual_memory().available
+
+    if sys.platform == 'win32':
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [('dwLength', ctypes.c_ulong), ('dwMemoryLoad', ctypes.c_ulong), ('ullTotalPhys', ctypes.c_ulonglong),
+                        ('ullAvailPhys', ctypes.c_ulonglong), ('ullTotalPageFile',
+                                                               ctypes.c_ulonglong), ('ullAvailPageFile', ctypes.c_ulonglong),
+                        ('ullTotalVirtual', ctypes.c_ulonglong), ('ullAvailVirtual', ctypes.c_ulonglong), ('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+
+        memory_status = MEMORYSTATUSEX()
+        memory_status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(memory_status))
+        return memory_status.ullAvailPhys
+
+    if os.path.exists('/proc/meminfo'):
+        with open('/proc/meminfo', 'r') as meminfo_file:
+            for meminfo_line in meminfo_file:
+                if meminfo_line.startswith('MemAvailable:'):
+                    # value is in kB
+                    return int(meminfo_line.split()[1]) * 1024
+
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def get_process_rss_bytes():
+    """Get the resident memory of this process
+
+    Returns:
+        int: Resident memory in bytes or None if it can't be found on this platform
+    """
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+
+    if sys.platform == 'win32':
+        return get_process_memory_counters().WorkingSetSize
+
+    if os.path.exists('/proc/self/statm'):
+        with open('/proc/self/statm', 'r') as statm_file:
+            # second value is resident pages
+            return int(statm_file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+    return None
+
+
+def get_process_peak_rss_bytes():
+    """Get the highest resident memory this process has reached
+
+    Returns:
+        int: Peak resident memory in bytes or None if it can't be found on this platform
+    """
+    if sys.platform == 'win32':
+        if psutil is not None:
+            return psutil.Process().memory_info().peak_wset
+
+        return get_process_memory_counters().PeakWorkingSetSize
+
+    if resource is not None:
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macos reports bytes, linux reports kB
+        return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+    return None
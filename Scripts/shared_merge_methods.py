@@ -0,0 +1,353 @@
+import bpy
+import time
+from mathutils import Vector
+from shared_common_methods import *
+from shared_profile_methods import *
+
+
+# state for the tree merge scheduler, stack holds [level, collection name] in capture order and level_stats holds
+# [seconds, object count] for every merge made at each level
+tree_merge_state = {'batch_size': 2, 'stack': [], 'level_stats': {}}
+
+
+def set_collection_hidden(col_name: str, hide: bool):
+
+    bpy.data.collections[col_name].hide_viewport = hide
+
+    layer_col = bpy.context.view_layer.layer_collection.children.get(col_name)
+    if layer_col is not None:
+        layer_col.hide_viewport = hide
+
+
+def lily_capture_merge_collections(target_col_name: str, source_col_name: str):
+    """Merge the objects of source_col_name into target_col_name with Lily Capture Merger, the source collection is left empty
+
+    Args:
+        target_col_name (str): Collection that is kept and receives the merged objects
+        source_col_name (str): Collection merged into the target, must overlap the target
+
+    Returns:
+        int: Number of objects in the target collection after the merge
+    """
+    print(f"Merging collection {source_col_name} with {target_col_name}")
+
+    # unhide both so the merger can see them
+    set_collection_hidden(target_col_name, False)
+    set_collection_hidden(source_col_name, False)
+
+    # DESELECT ALL OBJS
+    bpy.ops.object.select_all(action='DESELECT')
+
+    if bpy.data.collections.get(source_col_name).objects:
+        # select first object
+        bpy.data.collections.get(source_col_name).objects[0].select_set(True)
+
+    if bpy.data.collections.get(target_col_name).objects:
+        # set first object as active
+        bpy.context.view_layer.objects.active = bpy.data.collections.get(
+            target_col_name).objects[0]
+
+    # merge objects
+    bpy.ops.object.lily_capture_merger()
+
+    if bpy.data.collections.get(source_col_name).objects:
+        # unselect first object
+        bpy.data.collections.get(source_col_name).objects[0].select_set(False)
+
+    move_objects_from_one_collection_to_target(bpy.data.collections.get(
+        target_col_name), bpy.data.collections.get(source_col_name).objects)
+
+    print(f"Completed collection merge {source_col_name} with {target_col_name}")
+
+    return len(bpy.data.collections.get(target_col_name).objects)
+
+
+def start_tree_merge(batch_size: int = 2, stack: list = None):
+    """Reset the tree merge scheduler
+
+    Args:
+        batch_size (int, optional): Number of neighbouring collections of the same level merged together, 2 gives a balanced pairwise tree. Defaults to 2.
+        stack (list, optional): Stack to carry on from when resuming a run. Defaults to None.
+
+    Returns:
+        list: The stack of [level, collection name], it is updated in place
+    """
+    tree_merge_state['batch_size'] = max(2, batch_size)
+    tree_merge_state['stack'] = stack if stack is not None else []
+    tree_merge_state['level_stats'] = {}
+
+    return tree_merge_state['stack']
+
+
+def merge_stack_entries(entries: list, level):
+    """Merge neighbouring stack entries into the first one, captures are in order so each entry overlaps the one before it
+
+    Returns:
+        str: Name of the collection holding the merged objects
+    """
+    target_col_name = entries[0][1]
+
+    for _, source_col_name in entries[1:]:
+        merge_start = time.time()
+
+        with profile_stage('lily_capture_merge_collections', level=level):
+            object_count = lily_capture_merge_collections(
+                target_col_name=target_col_name, source_col_name=source_col_name)
+
+        tree_merge_state['level_stats'].setdefault(str(level), []).append(
+            [time.time() - merge_start, object_count])
+
+    # hide the merged collection again for performance
+    set_collection_hidden(target_col_name, True)
+
+    remove_empty_collections()
+
+    return target_col_name
+
+
+def tree_merge_push(col_name: str):
+    """Add a newly imported collection and merge any batch of neighbours that now share a level
+
+    Args:
+        col_name (str): The imported collection
+
+    Returns:
+        str: Name of the first collection on the stack, this will hold all objects once the merge finishes
+    """
+    stack = tree_merge_state['stack']
+    batch_size = tree_merge_state['batch_size']
+
+    set_collection_hidden(col_name, True)
+    stack.append([0, col_name])
+
+    # merge while the top batch_size entries are on the same level
+    while len(stack) >= batch_size and len({entry[0] for entry in stack[-batch_size:]}) == 1:
+        level = stack[-1][0]
+        entries = stack[-batch_size:]
+        del stack[-batch_size:]
+
+        target_col_name = merge_stack_entries(entries=entries, level=level + 1)
+        stack.append([level + 1, target_col_name])
+
+    return stack[0][1]
+
+
+def collapse_tree_merge_stack(level='collapse'):
+    """Merge every entry on the stack now, smaller top entries are merged into their left neighbour until one remains
+
+    Args:
+        level (optional): Level the merges are reported under. Defaults to 'collapse'.
+
+    Returns:
+        list: The stack, holding at most one entry
+    """
+    stack = tree_merge_state['stack']
+
+    while len(stack) > 1:
+        entries = stack[-2:]
+        del stack[-2:]
+        target_col_name = merge_stack_entries(entries=entries, level=level)
+        stack.append([entries[0][0], target_col_name])
+
+    return stack
+
+
+def tree_merge_finish(log_filepath: str):
+    """Merge what is left on the stack from the top down and log the time and object count for each level
+
+    Args:
+        log_filepath (str): Log file for the per level report
+
+    Returns:
+        str: Name of the collection holding all merged objects or an empty string if nothing was imported
+    """
+    stack = collapse_tree_merge_stack(level='final')
+
+    write_merge_report(log_filepath=log_filepath, title="Tree merge report")
+
+    if not stack:
+        return ""
+
+    main_col = stack[0][1]
+    set_collection_hidden(main_col, False)
+
+    return main_col
+
+
+def write_merge_report(log_filepath: str, title: str):
+
+    lines = [title]
+    for level, merges in tree_merge_state['level_stats'].items():
+        merge_seconds = [merge[0] for merge in merges]
+        lines.append(
+            f"Level {level}: {len(merges)} merges, total {round(sum(merge_seconds), 2)} seconds, longest {round(max(merge_seconds), 2)} seconds, largest merge result {max(merge[1] for merge in merges)} objects")
+    print_log(filepath=log_filepath, lines=lines)
+
+
+def get_collection_world_bounds(col_name: str):
+    """Get the world space axis aligned bounding box of all objects in a collection
+
+    Returns:
+        tuple: (min corner, max corner) as lists of x, y, z or None if the collection has no objects
+    """
+    min_corner = [float('inf')] * 3
+    max_corner = [float('-inf')] * 3
+
+    for obj in bpy.data.collections.get(col_name).all_objects:
+        for corner in obj.bound_box:
+            world_corner = obj.matrix_world @ Vector(corner)
+            for axis in range(3):
+                min_corner[axis] = min(min_corner[axis], world_corner[axis])
+                max_corner[axis] = max(max_corner[axis], world_corner[axis])
+
+    if min_corner[0] == float('inf'):
+        return None
+
+    return min_corner, max_corner
+
+
+def bounds_overlap(bounds_a: tuple, bounds_b: tuple, margin: float = 0.0):
+
+    return all(bounds_a[0][axis] - margin <= bounds_b[1][axis] and bounds_b[0][axis] - margin <= bounds_a[1][axis] for axis in range(3))
+
+
+def build_overlap_graph(col_names: list[str], margin: float = 0.0):
+    """Build a graph of which captures overlap using their world space bounding boxes
+
+    Args:
+        col_names (list[str]): Collections holding one imported capture each
+        margin (float, optional): Distance boxes may be apart and still count as overlapping. Defaults to 0.0.
+
+    Returns:
+        dict: Collection name to the set of collection names it overlaps
+    """
+    bounds = {col_name: get_collection_world_bounds(col_name)
+              for col_name in col_names}
+    graph = {col_name: set() for col_name in col_names}
+
+    # sort by min x so each box is only tested against boxes that can still reach it on x
+    sorted_names = sorted((col_name for col_name in col_names if bounds[col_name] is not None),
+                          key=lambda col_name: bounds[col_name][0][0])
+
+    for index, col_name in enumerate(sorted_names):
+        for other_name in sorted_names[index + 1:]:
+            if bounds[other_name][0][0] - margin > bounds[col_name][1][0]:
+                break
+            if bounds_overlap(bounds[col_name], bounds[other_name], margin):
+                graph[col_name].add(other_name)
+                graph[other_name].add(col_name)
+
+    return graph
+
+
+def get_overlap_components(graph: dict, col_names: list[str]):
+    """Split the overlap graph into connected groups of captures, each group in breadth first order from its first capture
+
+    Returns:
+        list[list[str]]: Groups of collection names, largest first
+    """
+    visited = set()
+    components = []
+
+    for col_name in col_names:
+        if col_name in visited:
+            continue
+
+        component = [col_name]
+        visited.add(col_name)
+
+        for current in component:
+            for neighbour in sorted(graph[current], key=col_names.index):
+                if neighbour not in visited:
+                    visited.add(neighbour)
+                    component.append(neighbour)
+
+        components.append(component)
+
+    return sorted(components, key=len, reverse=True)
+
+
+def plan_overlap_merges(graph: dict, component: list[str]):
+    """Plan merges for one connected group of captures, each round pairs every merged group with an overlapping neighbour
+    group so every merge has overlap and the merged groups grow evenly like a tree
+
+    Returns:
+        list[list[tuple]]: Rounds of (target collection, source collection) merges
+    """
+    # group holds the capture members of each merged group, keyed by the collection that holds it
+    group = {col_name: {col_name} for col_name in component}
+    owner = {col_name: col_name for col_name in component}
+    rounds = []
+
+    while len(group) > 1:
+        matched = set()
+        merges = []
+
+        for target in component:
+            if target not in group or target in matched:
+                continue
+
+            neighbours = {owner[neighbour] for member in group[target]
+                          for neighbour in graph[member]} - {target} - matched
+
+            if not neighbours:
+                continue
+
+            # pair with the smallest neighbouring group to keep the tree balanced
+            source = min(neighbours, key=lambda x: (
+                len(group[x]), component.index(x)))
+            matched.update((target, source))
+            merges.append((target, source))
+
+        for target, source in merges:
+            for member in group[source]:
+                owner[member] = target
+            group[target] |= group.pop(source)
+
+        rounds.append(merges)
+
+    return rounds
+
+
+def overlap_graph_merge(col_names: list[str], log_filepath: str, margin: float = 0.0):
+    """Merge captures along the overlap graph of their bounding boxes so the order of the rdc files doesn't matter,
+    groups that don't overlap the largest group are reported before any merge is made, merged among themselves and left
+    in their own collections
+
+    Args:
+        col_names (list[str]): Collections holding one imported capture each
+        log_filepath (str): Log file for the plan and merge report
+        margin (float, optional): Distance boxes may be apart and still count as overlapping. Defaults to 0.0.
+
+    Returns:
+        tuple: (name of the collection holding the largest merged group or an empty string if there are no captures,
+        groups of collection names left out of it)
+    """
+    if not col_names:
+        return "", []
+
+    graph = build_overlap_graph(col_names=col_names, margin=margin)
+    components = get_overlap_components(graph=graph, col_names=col_names)
+
+    lines = [f"Overlap merge plan for {len(col_names)} captures, {len(components)} connected groups"]
+    for component in components[1:]:
+        lines.append(
+            f"Not overlapping the main group, will not be merged into it: {component}")
+    print_log(filepath=log_filepath, lines=lines)
+
+    tree_merge_state['level_stats'] = {}
+
+    for component in components:
+        for round_number, merges in enumerate(plan_overlap_merges(graph=graph, component=component), start=1):
+            for target, source in merges:
+                merge_stack_entries(
+                    entries=[[0, target], [0, source]], level=round_number)
+
+    write_merge_report(log_filepath=log_filepath,
+                       title="Overlap merge report")
+
+    # the first capture of each group is never merged into another so it holds the group once its merges are done
+    main_col = components[0][0]
+    set_collection_hidden(main_col, False)
+
+    return main_col, components[1:]
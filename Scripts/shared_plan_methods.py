@@ -0,0 +1,113 @@
+import glob
+import json
+import math
+import os
+import time
+
+
+def pick_sample_files(files: list[str], sample_count: int):
+    """Pick rdc files spread evenly through the capture order so the samples cover the whole area
+
+    Args:
+        files (list[str]): Rdc filepaths in capture order
+        sample_count (int): Number of files to pick
+
+    Returns:
+        list[str]: The picked files
+    """
+    if sample_count <= 0 or not files:
+        return []
+
+    if sample_count >= len(files):
+        return list(files)
+
+    step = len(files) / sample_count
+    return [files[int(step * index + step / 2)] for index in range(sample_count)]
+
+
+def read_timeline_history(log_folder: str):
+    """Read per capture and per run stats from the timeline files of earlier runs
+
+    Args:
+        log_folder (str): Folder holding the timeline_*.jsonl files
+
+    Returns:
+        tuple: (list of import records with rdc_bytes, dict of run id to run totals)
+    """
+    import_records = []
+    runs = {}
+
+    for timeline_filepath in glob.glob(f"{log_folder}timeline_*.jsonl"):
+        with open(timeline_filepath, "r") as timeline_file:
+            for line in timeline_file:
+                try:
+                    record = json.loads(line)
+                    started = time.mktime(time.strptime(record['started'], "%Y-%m-%d %H:%M:%S"))
+                except (ValueError, KeyError):
+                    # partly written line from a run that stopped
+                    continue
+
+                run = runs.setdefault(record.get('run_id'), {
+                    'rdc_bytes': 0, 'peak_rss': 0, 'start': started, 'end': started})
+                run['start'] = min(run['start'], started)
+                run['end'] = max(run['end'], started + record.get('wall_seconds', 0))
+                run['peak_rss'] = max(run['peak_rss'], record.get('peak_rss') or 0)
+
+                if record.get('stage') == 'attempt_import_of_rdc_file' and record.get('rdc_bytes') and record.get('error') is None:
+                    import_records.append(record)
+                    run['rdc_bytes'] += record['rdc_bytes']
+
+    # runs without imports, like the coordinator of a sharded run or a resumed pack, can't be scaled by rdc size
+    runs = {run_id: run for run_id, run in runs.items() if run['rdc_bytes'] > 0}
+
+    return import_records, runs
+
+
+def estimate_area_plan(rdc_bytes: int, rdc_file_count: int, samples: list[dict], import_records: list[dict], runs: dict,
+                       pixels_per_area: float, total_target_px: int, base_rss_bytes: int):
+    """Scale sampled imports and earlier runs up to the whole area
+
+    Args:
+        rdc_bytes (int): Total size of the area's rdc files
+        rdc_file_count (int): Number of rdc files
+        samples (list[dict]): Measurements of the sampled imports
+        import_records (list[dict]): Import records from read_timeline_history
+        runs (dict): Run totals from read_timeline_history
+        pixels_per_area (float): Pixels needed per meter square, from get_texel_pixel_budget
+        total_target_px (int): Pixels in one target image, from get_texel_pixel_budget
+        base_rss_bytes (int): Memory used before anything is imported
+
+    Returns:
+        dict: The plan, geometry and texture figures are before merging so they are upper bounds
+    """
+    gb = 1024 ** 3
+    plan = {'rdc_files': rdc_file_count, 'rdc_gb': round(rdc_bytes / gb, 3),
+            'samples': len(samples), 'history_imports': len(import_records), 'history_runs': len(runs)}
+
+    sample_bytes = sum(sample['rdc_bytes'] for sample in samples)
+    if sample_bytes:
+        scale = rdc_bytes / sample_bytes
+
+        plan['vertices'] = int(sum(sample['vertices'] for sample in samples) * scale)
+        plan['polygons'] = int(sum(sample['polygons'] for sample in samples) * scale)
+        plan['area_m2'] = round(sum(sample['area_m2'] for sample in samples) * scale, 1)
+        plan['texture_gb'] = round(sum(sample['texture_bytes'] for sample in samples) * scale / gb, 3)
+        plan['required_images'] = int(math.ceil(plan['area_m2'] * pixels_per_area / total_target_px))
+        plan['import_seconds'] = round(sum(sample['seconds'] for sample in samples) * scale)
+        # imports stay in memory until they are merged so the sampled growth adds up
+        plan['peak_rss_gb'] = round((base_rss_bytes + sum(sample['rss_bytes'] for sample in samples) * scale) / gb, 2)
+        plan['peak_rss_source'] = 'samples'
+
+    if import_records:
+        seconds_per_byte = sum(record['wall_seconds'] for record in import_records) / sum(
+            record['rdc_bytes'] for record in import_records)
+        plan['import_seconds_history'] = round(rdc_bytes * seconds_per_byte)
+
+    if runs:
+        run_bytes = sum(run['rdc_bytes'] for run in runs.values())
+        # earlier runs already include merging and packing so these are preferred over the samples
+        plan['peak_rss_gb'] = round(rdc_bytes * sum(run['peak_rss'] for run in runs.values()) / run_bytes / gb, 2)
+        plan['peak_rss_source'] = 'history'
+        plan['wall_seconds'] = round(rdc_bytes * sum(run['end'] - run['start'] for run in runs.values()) / run_bytes)
+
+    return plan
@@ -0,0 +1,102 @@
+import bpy
+import functools
+import json
+import time
+from contextlib import contextmanager
+from shared_memory_methods import *
+
+
+# where stage records are written to as json lines, set by start_profile_timeline, nothing is recorded until it is set
+profile_state = {'filepath': None, 'run_id': None}
+
+
+def start_profile_timeline(filepath: str, run_id: str = None):
+    """Start recording stage timings to a json lines timeline file
+
+    Args:
+        filepath (str): Timeline file, records are appended
+        run_id (str, optional): Id written on every record. Defaults to the current time.
+    """
+    profile_state['filepath'] = filepath
+    profile_state['run_id'] = run_id or time.strftime("%Y%m%d_%H%M%S")
+
+
+def get_datablock_stats():
+
+    return {
+        'objects': len(bpy.data.objects),
+        'meshes': len(bpy.data.meshes),
+        'materials': len(bpy.data.materials),
+        'images': len(bpy.data.images),
+        'vertices': sum(len(mesh.vertices) for mesh in bpy.data.meshes),
+    }
+
+
+@contextmanager
+def profile_stage(stage: str, **extra):
+    """Record wall time, cpu time, memory and datablock counts for the code inside the with block
+
+    Args:
+        stage (str): Name of the stage written to the record
+        **extra: Extra values written to the record, like the capture being imported
+    """
+    if profile_state['filepath'] is None:
+        yield
+        return
+
+    rss_start = get_process_rss_bytes()
+    peak_rss_start = get_process_peak_rss_bytes()
+    wall_start = time.time()
+    cpu_start = time.process_time()
+    error = None
+
+    try:
+        yield
+
+    except BaseException as err:
+        error = repr(err)
+        raise
+
+    finally:
+        rss_end = get_process_rss_bytes()
+        peak_rss_lifetime = get_process_peak_rss_bytes()
+
+        # the os peak can lag behind the latest sample
+        if peak_rss_lifetime is not None and rss_end is not None:
+            peak_rss_lifetime = max(peak_rss_lifetime, rss_end)
+
+        # the os only keeps the peak of the whole process, it belongs to this stage only if it rose during the stage,
+        # otherwise the stage peak is at least the larger of its start and end
+        if peak_rss_lifetime is not None and peak_rss_start is not None and peak_rss_lifetime > peak_rss_start:
+            peak_rss = peak_rss_lifetime
+        else:
+            peak_rss = max((rss for rss in (rss_start, rss_end) if rss is not None), default=None)
+
+        record = {
+            'run_id': profile_state['run_id'],
+            'stage': stage,
+            'started': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(wall_start)),
+            'wall_seconds': round(time.time() - wall_start, 3),
+            'cpu_seconds': round(time.process_time() - cpu_start, 3),
+            'rss_start': rss_start,
+            'rss_end': rss_end,
+            'peak_rss': peak_rss,
+            'peak_rss_lifetime': peak_rss_lifetime,
+            'error': error,
+        }
+        record.update(get_datablock_stats())
+        record.update(extra)
+
+        with open(profile_state['filepath'], "a+") as timeline_file:
+            timeline_file.write(json.dumps(record) + "\n")
+
+
+def profiled_stage(func):
+    """Decorator that records every call of func with profile_stage under the function name"""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with profile_stage(func.__name__):
+            return func(*args, **kwargs)
+
+    return wrapper
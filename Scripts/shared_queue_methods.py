@@ -0,0 +1,237 @@
+import glob
+import json
+import os
+import socket
+import threading
+import time
+
+
+# a queue folder holds jobs/ with one area config per job, leases/ with the lease of each job being run and status/ with each job's record
+QUEUE_SUBFOLDERS = ('jobs', 'leases', 'status')
+
+# a lease this close to expiring isn't renewed, it covers clock differences between machines so a renewal can never land
+# on a lease another worker is already taking over
+LEASE_RENEW_MARGIN_SECONDS = 60
+
+
+def get_worker_id():
+
+    return f"{socket.gethostname()}_{os.getpid()}"
+
+
+def get_queue_folders(queue_folder: str):
+
+    queue_folders = {name: os.path.join(queue_folder, name, '') for name in QUEUE_SUBFOLDERS}
+    for folder in queue_folders.values():
+        os.makedirs(folder, exist_ok=True)
+
+    return queue_folders
+
+
+def read_json_file(filepath: str):
+
+    try:
+        with open(filepath, "r") as json_file:
+            return json.load(json_file)
+    except (OSError, ValueError):
+        # missing or still being written
+        return None
+
+
+def write_json_file(filepath: str, data: dict):
+
+    # write to a temp file and replace so other machines never read a half written record
+    temp_filepath = f"{filepath}.{get_worker_id()}.tmp"
+    with open(temp_filepath, "w") as json_file:
+        json.dump(data, json_file, indent=2)
+    os.replace(temp_filepath, filepath)
+
+
+def list_queue_jobs(queue_folder: str):
+    """Get the job files in the queue in name order
+
+    Returns:
+        list[str]: Filepaths of the .toml and .json area configs in the jobs folder
+    """
+    jobs_folder = get_queue_folders(queue_folder)['jobs']
+
+    return sorted(glob.glob(f"{jobs_folder}*.toml") + glob.glob(f"{jobs_folder}*.json"))
+
+
+def get_job_name(job_filepath: str):
+
+    return os.path.splitext(os.path.basename(job_filepath))[0]
+
+
+def get_job_status(queue_folder: str, job_name: str):
+
+    return read_json_file(os.path.join(get_queue_folders(queue_folder)['status'], f"{job_name}.json")) or {}
+
+
+def update_job_status(queue_folder: str, job_name: str, **changes):
+    """Update fields of a job's record, only the worker holding the job's lease should call this
+
+    Returns:
+        dict: The updated record
+    """
+    status = get_job_status(queue_folder, job_name)
+    status.update(changes)
+    status['updated_at'] = time.strftime("%Y-%m-%d %H:%M:%S")
+
+    write_json_file(os.path.join(get_queue_folders(queue_folder)['status'], f"{job_name}.json"), status)
+
+    return status
+
+
+def get_lease_filepath(queue_folder: str, job_name: str):
+
+    return os.path.join(get_queue_folders(queue_folder)['leases'], f"{job_name}.lease")
+
+
+def get_lease_expiry(lease_filepath: str, lease_seconds: float):
+
+    lease = read_json_file(lease_filepath)
+    if lease is not None:
+        return lease['expires_at'], lease
+
+    # a lease still being written by its worker counts as fresh until it is older than a whole lease
+    try:
+        return os.path.getmtime(lease_filepath) + lease_seconds, None
+    except OSError:
+        return 0, None
+
+
+def try_acquire_lease(queue_folder: str, job_name: str, worker_id: str, lease_seconds: float):
+    """Claim a job by creating its lease file, an expired lease left by a worker that stopped is taken over
+
+    Creating the file with O_EXCL is atomic on local disks, NFS v3+ and SMB shares so only one worker can win a job.
+
+    Args:
+        queue_folder (str): Queue folder shared by the workers
+        job_name (str): Name of the job file without its extension
+        worker_id (str): Id of this worker from get_worker_id
+        lease_seconds (float): How long the lease lasts without being renewed
+
+    Returns:
+        bool: True if this worker now holds the lease
+    """
+    lease_filepath = get_lease_filepath(queue_folder, job_name)
+    lease = {'worker': worker_id, 'expires_at': time.time() + lease_seconds,
+             'claimed_at': time.strftime("%Y-%m-%d %H:%M:%S")}
+
+    try:
+        lease_fd = os.open(lease_filepath, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+
+    except FileExistsError:
+        expires_at, expired_lease = get_lease_expiry(lease_filepath, lease_seconds)
+        if expires_at > time.time():
+            return False
+
+        # move the expired lease aside, if two workers try this only one rename finds the file
+        stale_filepath = f"{lease_filepath}.{worker_id}.stale"
+        try:
+            os.rename(lease_filepath, stale_filepath)
+        except OSError:
+            return False
+
+        if read_json_file(stale_filepath) != expired_lease:
+            # another worker took the job over between the check and the rename, give its lease back
+            try:
+                os.rename(stale_filepath, lease_filepath)
+            except OSError:
+                pass
+            return False
+
+        os.remove(stale_filepath)
+
+        try:
+            lease_fd = os.open(lease_filepath, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+
+    with os.fdopen(lease_fd, "w") as lease_file:
+        json.dump(lease, lease_file)
+
+    return True
+
+
+def holds_lease(queue_folder: str, job_name: str, worker_id: str):
+
+    lease = read_json_file(get_lease_filepath(queue_folder, job_name))
+    return lease is not None and lease['worker'] == worker_id
+
+
+def renew_lease(queue_folder: str, job_name: str, worker_id: str, lease_seconds: float):
+    """Push back the expiry of a job's lease held by this worker, a lease that has expired or is about to is treated as lost
+    because another worker may already be taking it over
+
+    Returns:
+        bool: True if renewed, False if the lease names another worker or has run out and None if it couldn't be read or written this time
+    """
+    lease_filepath = get_lease_filepath(queue_folder, job_name)
+    lease = read_json_file(lease_filepath)
+
+    if lease is None:
+        # missing or half written, a share that drops out for a moment shouldn't cost the job
+        return None
+
+    if lease['worker'] != worker_id or lease['expires_at'] - time.time() < min(LEASE_RENEW_MARGIN_SECONDS, lease_seconds / 10):
+        return False
+
+    lease['expires_at'] = time.time() + lease_seconds
+    try:
+        write_json_file(lease_filepath, lease)
+    except OSError as err:
+        print(f"Couldn't renew the lease on queue job {job_name}: {err}")
+        return None
+
+    # read it back in case a takeover replaced the file while it was being written
+    renewed_lease = read_json_file(lease_filepath)
+    if renewed_lease is not None and renewed_lease['worker'] != worker_id:
+        return False
+
+    return True
+
+
+def release_lease(queue_folder: str, job_name: str, worker_id: str):
+
+    if holds_lease(queue_folder, job_name, worker_id):
+        os.remove(get_lease_filepath(queue_folder, job_name))
+
+
+def start_lease_heartbeat(queue_folder: str, job_name: str, worker_id: str, lease_seconds: float):
+    """Renew a job's lease from a background thread, it only touches the lease file never bpy. Renewals that fail to read
+    or write the lease are retried, the heartbeat only gives up once the lease names another worker or has run out
+
+    Returns:
+        tuple: (threading.Event set it to stop the heartbeat, threading.Event set once another worker holds the lease)
+    """
+    stop_event = threading.Event()
+    lost_event = threading.Event()
+
+    def heartbeat():
+        while not stop_event.wait(lease_seconds / 3):
+            if renew_lease(queue_folder, job_name, worker_id, lease_seconds) is False:
+                print(f"Lost the lease on queue job {job_name}")
+                lost_event.set()
+                return
+
+    threading.Thread(target=heartbeat, name=f"lease_{job_name}", daemon=True).start()
+
+    return stop_event, lost_event
+
+
+def predict_job_memory_gb(rdc_folder: str, memory_factor: float, base_memory_gb: float):
+    """Estimate the memory a job needs from the size of its rdc files
+
+    Args:
+        rdc_folder (str): Folder holding the job's rdc files
+        memory_factor (float): Gigabytes of memory used for each gigabyte of rdc files
+        base_memory_gb (float): Memory used by blender before anything is imported
+
+    Returns:
+        float: Predicted peak memory in gigabytes
+    """
+    rdc_bytes = sum(os.path.getsize(filepath) for filepath in glob.glob(f"{rdc_folder}*.rdc"))
+
+    return base_memory_gb + rdc_bytes / 1024 ** 3 * memory_factor
@@ -0,0 +1,167 @@
+import bpy
+import json
+import os
+import re
+import subprocess
+import time
+from shared_common_methods import *
+from shared_memory_methods import *
+
+
+def get_worker_count(requested_workers: int, worker_memory_gb: float):
+    """Cap the requested number of workers by the number of cpus and the memory currently available
+
+    Args:
+        requested_workers (int): Number of workers asked for in config
+        worker_memory_gb (float): Memory each worker is expected to need in GB
+
+    Returns:
+        int: Number of workers to launch, at least 1
+    """
+    worker_count = min(requested_workers, os.cpu_count() or 1)
+
+    available_memory = get_available_memory_bytes()
+
+    if available_memory is not None and worker_memory_gb > 0:
+        memory_worker_count = int(
+            available_memory // (worker_memory_gb * 1024 ** 3))
+        worker_count = min(worker_count, memory_worker_count)
+
+        print(
+            f"Available memory {round(available_memory / 1024 ** 3, 2)} GB allows {memory_worker_count} workers of {worker_memory_gb} GB")
+
+    return max(1, worker_count)
+
+
+def get_capture_sort_key(filepath: str):
+    """Sort key that orders rdc files by the numbers in their name, capture_2 comes before capture_10 so the files stay in
+    the order they were captured whatever order the filesystem lists them in"""
+
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', os.path.basename(filepath))]
+
+
+def split_files_into_shards(files: list[str], shard_count: int):
+    """Split the files into contiguous shards, captures are taken in order so neighbouring files overlap and each shard
+    stays a spatially connected run of captures that can be merged on its own
+
+    Args:
+        files (list[str]): Rdc files sorted with get_capture_sort_key
+        shard_count (int): Number of shards to create
+
+    Returns:
+        list[list[str]]: Shards of files, no shard is empty
+    """
+    shard_count = max(1, min(shard_count, len(files)))
+    shard_size, remainder = divmod(len(files), shard_count)
+
+    shards = []
+    start = 0
+    for shard_index in range(shard_count):
+        # spread the remainder over the first shards
+        end = start + shard_size + (1 if shard_index < remainder else 0)
+        shards.append(files[start:end])
+        start = end
+
+    return shards
+
+
+def write_shard_jobs(shards: list[list[str]], shard_folder: str):
+
+    shard_jobs = []
+
+    for shard_index, shard_files in enumerate(shards, start=1):
+        shard_job = {
+            'shard_index': shard_index,
+            'files': shard_files,
+            'collection_name': f"shard_{shard_index}",
+            'blend_filepath': f"{shard_folder}shard_{shard_index}.blend",
+            'manifest_filepath': f"{shard_folder}shard_{shard_index}_manifest.json",
+            'result_filepath': f"{shard_folder}shard_{shard_index}_result.json",
+            'job_filepath': f"{shard_folder}shard_{shard_index}_job.json",
+        }
+
+        # a result left by an earlier run would make a failed worker look like it finished
+        if os.path.exists(shard_job['result_filepath']):
+            os.remove(shard_job['result_filepath'])
+
+        with open(shard_job['job_filepath'], "w") as job_file:
+            json.dump(shard_job, job_file, indent=2)
+
+        shard_jobs.append(shard_job)
+
+    return shard_jobs
+
+
+def run_shard_workers(shard_jobs: list[dict], script_path: str, log_folder: str, poll_seconds: float = 5, extra_args: list[str] = None):
+    """Launch a headless blender worker for each shard job and wait for all of them to finish
+
+    Args:
+        shard_jobs (list[dict]): Jobs from write_shard_jobs
+        script_path (str): Path to import_merge_pack_textures_join.py
+        log_folder (str): Folder to write each workers console output to
+        poll_seconds (float, optional): Seconds between checks on the workers. Defaults to 5.
+        extra_args (list[str], optional): Arguments added after the shard job, such as the area config. Defaults to None.
+
+    Returns:
+        tuple: (list of results written by the workers that completed, list of the jobs whose worker failed)
+    """
+    workers = []
+
+    for shard_job in shard_jobs:
+        log_file = open(
+            f"{log_folder}shard_{shard_job['shard_index']}_log.txt", "w")
+        command = [bpy.app.binary_path, '-b', '--python', script_path,
+                   '--', '--shard-worker', shard_job['job_filepath']] + (extra_args or [])
+        print(f"Launching shard worker {shard_job['shard_index']} with {len(shard_job['files'])} files")
+        process = subprocess.Popen(
+            command, stdout=log_file, stderr=subprocess.STDOUT)
+        workers.append((shard_job, process, log_file))
+
+    # wait for all workers to finish
+    while any(process.poll() is None for _, process, _ in workers):
+        time.sleep(poll_seconds)
+
+    results = []
+    failed_jobs = []
+
+    for shard_job, process, log_file in workers:
+        log_file.close()
+
+        if process.returncode != 0 or not os.path.exists(shard_job['result_filepath']):
+            print(f"Shard worker {shard_job['shard_index']} failed with return code {process.returncode}, see shard_{shard_job['shard_index']}_log.txt")
+            failed_jobs.append(shard_job)
+            continue
+
+        with open(shard_job['result_filepath'], "r") as result_file:
+            results.append(json.load(result_file))
+
+    return results, failed_jobs
+
+
+def append_shard_collections(shard_results: list[dict]):
+    """Append the merged collection of each shard .blend into the current file in shard order
+
+    Args:
+        shard_results (list[dict]): Results from run_shard_workers
+
+    Returns:
+        list[str]: Names of the appended collections
+    """
+    master_col = bpy.context.scene.collection
+    col_names = []
+
+    for shard_result in sorted(shard_results, key=lambda x: x['shard_index']):
+
+        if not shard_result['collection_name']:
+            continue
+
+        with bpy.data.libraries.load(shard_result['blend_filepath'], link=False) as (data_from, data_to):
+            data_to.collections = [
+                name for name in data_from.collections if name == shard_result['collection_name']]
+
+        for col in data_to.collections:
+            master_col.children.link(col)
+            col_names.append(col.name)
+            print(f"Appended {col.name} from {shard_result['blend_filepath']}")
+
+    return col_names
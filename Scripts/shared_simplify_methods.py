@@ -1,10 +1,17 @@
 import bpy
 import bmesh
+import json
+import os
 from datetime import datetime
 from math import *  # import radian function from math
 import time  # import time to display execution time
 from typing import Optional
+import numpy as np
 from shared_common_methods import *
+from shared_profile_methods import *
+from shared_image_methods import *
+from shared_edge_methods import *
+from shared_bake_methods import *
 
 
 def more_than_one_material(mesh_name: str):
@@ -42,6 +49,7 @@ def duplicate_object(duplicate_obj_name: str, selected_obj_name: str):
     bpy.data.objects.get(duplicate_obj_name).data.use_auto_smooth = False
 
 
+@profiled_stage
 def create_material_uv_and_bake(selected_obj_name: str, target_low_poly_obj_name: str, image_file_path: str, extrusion: float, ray_distance: float, image_texture_margin: int, mat_number: int = 1, image_qual: float = 1024, image_texture_quality: float = 1024):
     print('\nStarting create_uv_material_bake')
 
@@ -69,13 +77,17 @@ def create_material_uv_and_bake(selected_obj_name: str, target_low_poly_obj_name
         target_low_poly_obj_name), extrusion=extrusion, ray_distance=ray_distance, image_texture_margin=image_texture_margin)
 
     # save image
-    img.save()
-
-    print('\tImage saved')
+    save_image_output(img=img, filepath=img.filepath_raw)
 
     # attach material
     mesh_mat.node_tree.links.new(bsdf_node.inputs[0], img_node.outputs[0])
 
+    finish_image_outputs()
+    # the baked image is saved with the .blend file as a file image so it loads wherever the file is opened
+    relink_image_outputs({img.name: img.filepath_raw})
+
+    print('\tImage saved')
+
     print('\tImage linked to bsdf node')
 
     # Hide original
@@ -89,6 +101,7 @@ def create_material_uv_and_bake(selected_obj_name: str, target_low_poly_obj_name
     print(f'Finished create_uv_material_bake for {target_low_poly_obj_name}\n')
 
 
+@profiled_stage
 def bake_low_poly(selected_obj: bpy.types.Object, duplicate_obj: bpy.types.Object, extrusion: float, ray_distance: float, image_texture_margin: int):
     """Perform a diffuse texture bake from the selected_obj to the duplicate_obj.
     Bake Settings:
@@ -213,7 +226,14 @@ def output_mesh_stats(was_no_mesh_supplied: bool, duplicate_obj_name: str, bm: O
         bm.free()
 
 
-def split_mesh_create_uv_material_bake_rejoin(selected_obj_name: str, final_obj_name: str, image_file_path: str, extrusion: float, ray_distance: float, image_texture_margin: int, mat_number: int = 1, image_qual: float = 1024, image_texture_quality: float = 1024):
+def split_mesh_create_uv_material_bake_rejoin(selected_obj_name: str, final_obj_name: str, image_file_path: str, extrusion: float, ray_distance: float, image_texture_margin: int, mat_number: int = 1, image_qual: float = 1024, image_texture_quality: float = 1024,
+                                              bake_workers: int = 1, bake_threads_per_worker: int = 0, bake_worker_memory_gb: float = 0):
+    """Separate the low poly by material, uv map and bake each part then join the parts back together
+
+    With bake_workers above 1 the parts are baked at the same time in headless blender workers, each given
+    bake_threads_per_worker threads (0 splits the cpus evenly), and parts whose worker fails are baked here afterwards.
+    The workers are capped by the memory available against bake_worker_memory_gb, 0 estimates it from the source file size.
+    """
 
     print('\nStarting split_mesh_create_uv_material_bake_rejoin')
 
@@ -253,8 +273,19 @@ def split_mesh_create_uv_material_bake_rejoin(selected_obj_name: str, final_obj_
     for obj_name in new_obj_name:
         bpy.data.objects.get(obj_name).hide_viewport = True
 
+    bake_settings = {'image_file_path': image_file_path, 'extrusion': extrusion, 'ray_distance': ray_distance,
+                     'image_texture_margin': image_texture_margin, 'mat_number': mat_number, 'image_qual': image_qual,
+                     'image_texture_quality': image_texture_quality}
+    serial_obj_names = new_obj_name
+
+    if bake_workers > 1 and len(new_obj_name) > 1:
+        serial_obj_names = bake_parts_in_workers(selected_obj_name=selected_obj_name, part_names=new_obj_name,
+                                                 bake_settings=bake_settings, bake_workers=bake_workers,
+                                                 bake_threads_per_worker=bake_threads_per_worker,
+                                                 bake_worker_memory_gb=bake_worker_memory_gb)
+
     # loop through list and clear old material, then create material and uv, then bake image
-    for index, obj_name in enumerate(new_obj_name, start=1):
+    for index, obj_name in enumerate(serial_obj_names, start=1):
         # unhide this obj
         bpy.data.objects.get(obj_name).hide_viewport = False
 
@@ -317,6 +348,103 @@ def split_mesh_create_uv_material_bake_rejoin(selected_obj_name: str, final_obj_
     print('Finished split_mesh_create_uv_material_bake_rejoin\n')
 
 
+@profiled_stage
+def bake_parts_in_workers(selected_obj_name: str, part_names: list[str], bake_settings: dict, bake_workers: int, bake_threads_per_worker: int = 0, bake_worker_memory_gb: float = 0):
+    """Bake the low poly parts in parallel headless blender workers and bring the baked parts back into this file
+
+    Args:
+        selected_obj_name (str): Name of the high poly object baked from
+        part_names (list[str]): Names of the low poly parts
+        bake_settings (dict): Arguments for create_material_uv_and_bake shared by every part
+        bake_workers (int): Number of workers asked for, capped by cpus and memory
+        bake_threads_per_worker (int, optional): Cycles threads for each worker, 0 splits the cpus evenly. Defaults to 0.
+        bake_worker_memory_gb (float, optional): Memory each worker is expected to need in GB, 0 estimates it from the size of
+        the source file every worker loads. Defaults to 0.
+
+    Returns:
+        list[str]: Names of the parts whose worker failed so they can be baked here instead
+    """
+    bake_folder = os.path.join(bake_settings['image_file_path'], 'bake_workers', '')
+
+    bake_jobs = write_bake_jobs(selected_obj_name=selected_obj_name, part_names=part_names, bake_folder=bake_folder,
+                                job_settings={**bake_settings, 'image_output_settings': dict(image_output_settings)})
+
+    # every worker loads the whole high poly so the worker count is always capped by memory
+    if bake_worker_memory_gb <= 0:
+        bake_worker_memory_gb = estimate_bake_worker_memory_gb(bake_jobs[0]['source_filepath'])
+
+    worker_count = min(get_worker_count(requested_workers=bake_workers,
+                       worker_memory_gb=bake_worker_memory_gb), len(part_names))
+    thread_count = get_bake_thread_count(worker_count=worker_count, threads_per_worker=bake_threads_per_worker)
+
+    print(f"\tBaking {len(part_names)} parts in {worker_count} workers with {thread_count} threads each, "
+          f"{round(bake_worker_memory_gb, 1)} GB each")
+    bake_results = run_bake_workers(bake_jobs=bake_jobs, worker_count=worker_count,
+                                    thread_count=thread_count, log_folder=bake_folder)
+
+    for bake_result in bake_results:
+        append_baked_part(bake_result)
+
+    baked_names = {bake_result['part_name'] for bake_result in bake_results}
+
+    return [part_name for part_name in part_names if part_name not in baked_names]
+
+
+def run_bake_worker(bake_job_filepath: str):
+    """Entry point for a headless worker launched by run_bake_workers, uv maps and bakes one low poly part
+
+    Args:
+        bake_job_filepath (str): Path to the bake job json written by write_bake_jobs
+    """
+    with open(bake_job_filepath, "r") as job_file:
+        bake_job = json.load(job_file)
+
+    # start from an empty file and save it as the part's file so the saves while baking never overwrite another file
+    bpy.ops.wm.read_homefile(use_empty=True)
+    bpy.ops.wm.save_as_mainfile(filepath=bake_job['blend_filepath'])
+
+    set_image_output_format(**bake_job['image_output_settings'])
+
+    # the baked image is encoded off the main thread like in the main script
+    start_io_worker(log_filepath=f"{os.path.dirname(bake_job['job_filepath'])}{os.sep}io_tasks_bake_part_{bake_job['part_index']}.txt")
+
+    with bpy.data.libraries.load(bake_job['source_filepath'], link=False) as (data_from, data_to):
+        data_to.objects = [name for name in data_from.objects
+                           if name in (bake_job['part_name'], bake_job['selected_obj_name'])]
+
+    for obj in data_to.objects:
+        bpy.context.scene.collection.objects.link(obj)
+        obj.use_fake_user = False
+
+    part_obj = bpy.data.objects.get(bake_job['part_name'])
+    part_obj.hide_viewport = False
+
+    # deselect all objs and set the part as active, as the serial loop does
+    bpy.ops.object.select_all(action='DESELECT')
+    bpy.context.view_layer.objects.active = part_obj
+
+    create_material_uv_and_bake(selected_obj_name=bake_job['selected_obj_name'], target_low_poly_obj_name=bake_job['part_name'],
+                                image_file_path=bake_job['image_file_path'], extrusion=bake_job['extrusion'],
+                                ray_distance=bake_job['ray_distance'], image_texture_margin=bake_job['image_texture_margin'],
+                                mat_number=bake_job['mat_number'], image_qual=bake_job['image_qual'],
+                                image_texture_quality=bake_job['image_texture_quality'])
+
+    # the high poly is only needed for the bake, leaving it out keeps the file the coordinator appends from small
+    bpy.data.objects.remove(bpy.data.objects.get(bake_job['selected_obj_name']))
+    save_file('Saved baked part')
+
+    drain_io_tasks()
+
+    bake_result = {
+        'part_index': bake_job['part_index'],
+        'part_name': bake_job['part_name'],
+        'blend_filepath': bake_job['blend_filepath'],
+    }
+
+    with open(bake_job['result_filepath'], "w") as result_file:
+        json.dump(bake_result, result_file, indent=2)
+
+
 def create_vertex_group(group_name: str, strength: int, duplicate_obj_name: str):
     """Create a vertex group for duplicate_obj with the currently selected vertices and name the group with the group_name input and a vertex group strength of the input strength
 
@@ -392,6 +520,7 @@ def seam_mark_dissolve(bm: bmesh.types.BMesh, edge_sharpness=15):
     print("Completed seam_mark_dissolve\n")
 
 
+@profiled_stage
 def merge_double_key_seam(was_no_mesh_supplied: bool, duplicate_obj_name: str, angle=5, dist=0.0001, bm: bmesh.types.BMesh = None, target_obj_name: str = None):
     """merge double key seam 
     TODO
@@ -417,25 +546,32 @@ def merge_double_key_seam(was_no_mesh_supplied: bool, duplicate_obj_name: str, a
         target_obj_name = duplicate_obj_name
 
     if (was_no_mesh_supplied or bm is None):
+        # seams are marked on the mesh with numpy before the bmesh is made so no edge is visited in python
+        mesh = bpy.data.objects.get(target_obj_name).data
+        seam_mask = create_clear_mesh_seam(mesh, edge_sharpness=angle)
+        seam_vertex_mask = get_edge_vertex_mask(mesh, seam_mask)
+        print(f"\tgot {np.count_nonzero(seam_mask)} seam edges")
+
         # get current context mode and set to object if not and get data from duplicate
         bm, current_context_mode = create_bm_from_mesh_set_mode_to_object(
             target_obj_name)
         was_no_mesh_supplied = True
 
-    # create seam
-    create_clear_seam(bm, edge_sharpness=angle, clear=False)
-
-    # loop through edges and get verts marked seam
-    seam_edges = [e for e in bm.edges[:] if e.seam]
-    print("\tgot seam edges")
-
-    # get all seam verts from edges - will double up
-    seam_verts = list({v for e in seam_edges for v in e.verts})
+        # bmesh verts keep the mesh vertex order so the masks index them directly, find_doubles only takes lists of BMVerts
+        bm.verts.ensure_lookup_table()
+        seam_verts = [bm.verts[i] for i in np.flatnonzero(seam_vertex_mask)]
+        non_in_seam_verts = [bm.verts[i] for i in np.flatnonzero(~seam_vertex_mask)]
+        print("\tgot seam verts and verts not in seam")
 
-    print("\tgot seam verts and double ups removed")
+    else:
+        # a supplied bmesh may not match its mesh so the masks are found from a copy of the bmesh itself
+        seam_mask, seam_vertex_mask = create_clear_seam(bm, edge_sharpness=angle, clear=False)
+        print(f"\tgot {np.count_nonzero(seam_mask)} seam edges")
 
-    non_in_seam_verts = list(set(bm.verts[:]) - set(seam_verts))
-    print("\tgot verts not in seam")
+        bm.verts.ensure_lookup_table()
+        seam_verts = [bm.verts[i] for i in np.flatnonzero(seam_vertex_mask)]
+        non_in_seam_verts = [bm.verts[i] for i in np.flatnonzero(~seam_vertex_mask)]
+        print("\tgot seam verts and verts not in seam")
 
     # Find Doubles.
     # Takes input verts and find vertices they should weld to. Outputs a mapping slot suitable for use with the weld verts bmop.
@@ -452,13 +588,16 @@ def merge_double_key_seam(was_no_mesh_supplied: bool, duplicate_obj_name: str, a
     print(
         f"\tNumber of verts: {len(bm.verts[:])}, Number of Edges: {len(bm.edges[:])}, Number of Faces: {len(bm.faces[:])} after weld")
 
-    # clear seam
-    create_clear_seam(bm, clear=True)
-
     if (was_no_mesh_supplied):
         # transfer bmesh data to duplicate obj remove bmesh data
         bm_to_mesh_free(bm, target_obj_name)
 
+        # clear seam
+        create_clear_mesh_seam(bpy.data.objects.get(target_obj_name).data, clear=True)
+    else:
+        # clear seam
+        create_clear_seam(bm, clear=True)
+
     # switch to back to previous mode if not in object
     if (current_context_mode != 'OBJECT'):
         # back to whatever mode we were in
@@ -492,6 +631,7 @@ def delete_wire(bm: bmesh.types.BMesh):
     bmesh.ops.delete(bm, geom=delete_geom, context="EDGES")
 
 
+@profiled_stage
 def create_new_material(obj_name: str, image_file_path: str, mat_number: str = 1, image_qual: float = 1024, image_texture_quality: float = 1024):
     """Create a new material for duplicate_obj called LowPolyMat by:
     1. Create new material called "LowPolyMat"
@@ -543,8 +683,8 @@ def create_new_material(obj_name: str, image_file_path: str, mat_number: str = 1
     img = bpy.data.images.new(
         img_name, image_texture_quality, image_texture_quality, alpha=False)
     img.generated_color = (0, 0, 0, 0)
-    img.filepath_raw = f"{image_file_path}{img_name}.bmp"
-    img.file_format = 'BMP'
+    img.filepath_raw = f"{image_file_path}{img_name}{get_image_extension()}"
+    img.file_format = image_output_settings['file_format']
 
     tex_image_node = nodes.new(type="ShaderNodeTexImage")
     tex_image_node.location = (-450, 0)
@@ -571,8 +711,10 @@ def create_new_material(obj_name: str, image_file_path: str, mat_number: str = 1
     return img, bsdf_node, tex_image_node, new_material
 
 
-def uv_map_create(image_texture_margin: int, image_texture_quality: float, obj_name: str):
-    """Create a UV Map for duplicate_obj using the smart_project method with a island margin of 0.0001
+@profiled_stage
+def uv_map_create(image_texture_margin: int, image_texture_quality: float, obj_name: str, max_overlap_iterations: int = 5):
+    """Create a UV Map for duplicate_obj using the smart_project method with a island margin of 0.0001, overlapping islands are then
+    unwrapped again on their own up to max_overlap_iterations times
     """
     # start uv timer
     uv_time_start = time.time()
@@ -597,22 +739,8 @@ def uv_map_create(image_texture_margin: int, image_texture_quality: float, obj_n
     bpy.ops.uv.smart_project(angle_limit=radians(90), margin_method='ADD',
                              island_margin=(image_texture_margin/image_texture_quality), area_weight=0.0, correct_aspect=True, scale_to_bounds=False)
 
-    while check_uv_map := bpy.ops.uv.select_overlap():
-
-        # remove selected faces that are already marked as seams
-        number_of_face_without_seams = get_selected_faces_and_remove_faces_with_seams(
-            obj_name=obj_name)
-
-        if number_of_face_without_seams == 0:
-            break
-        # don't want all to be marked as seams filter someout TODO
-
-        print("UV Map has Overlaps")
-        bpy.ops.uv.mark_seam()
-        bpy.ops.mesh.select_all(action='SELECT')
-        bpy.ops.uv.smart_project(angle_limit=radians(90), margin_method='ADD',
-                                 island_margin=(image_texture_margin/image_texture_quality), area_weight=0.0, correct_aspect=True, scale_to_bounds=False)
-        bpy.ops.mesh.select_all(action='DESELECT')
+    repair_uv_overlaps(obj_name=obj_name, island_margin=(image_texture_margin/image_texture_quality),
+                       max_iterations=max_overlap_iterations)
 
     print(
         f"\tObject has been UV unwrapped with smart project with settings set to: angle 90 deg, island margin {image_texture_margin / image_texture_quality}, area weight 0.0, correct aspect True and scale to bounds True"
@@ -651,26 +779,165 @@ def return_first_linked_uv_from_selected_faces(obj_name: str):
     return linked_island_border
 
 
-def get_selected_faces_and_remove_faces_with_seams(obj_name: str):
+def repair_uv_overlaps(obj_name: str, island_margin: float, max_iterations: int = 5):
+    """Unwrap only the UV islands that overlap, then pack those islands around the rest, repeating until nothing overlaps
+    or max_iterations is reached
 
-    bm, current_context_mode = create_bm_from_mesh_set_mode_to_object(obj_name)
-    remaining_faces = 0
-    for face in bm.faces:
-        count = 0
-        if face.select == False:
-            continue
+    Each pass uses a smaller smart project angle so the overlapping islands are cut into smaller pieces. From Blender 3.6
+    the islands that weren't projected again are pinned and locked in place while packing so their layout is kept, older
+    versions can't pack around fixed islands so every island is packed. Must be called in edit mode.
 
-        for edge in face.edges:
-            if edge.seam:
-                count += 1
-        if count == len(face.edges):
-            face.select = False
+    Args:
+        obj_name (str): Object being unwrapped
+        island_margin (float): Island margin used for smart project and packing
+        max_iterations (int, optional): Most repair passes to run. Defaults to 5.
+
+    Returns:
+        int: Number of faces still overlapping
+    """
+    obj = bpy.data.objects.get(obj_name)
+    tool_settings = bpy.context.scene.tool_settings
+    use_uv_select_sync = tool_settings.use_uv_select_sync
+    # with sync selection the overlap selection is the mesh face selection
+    tool_settings.use_uv_select_sync = True
+
+    pack_margin_args = {'margin_method': 'ADD'} if bpy.app.version >= (3, 5, 0) else {}
+    previous_overlap = None
+    overlapping = np.zeros(0, dtype=np.int64)
+
+    for iteration in range(max_iterations):
+        bpy.ops.mesh.select_all(action='DESELECT')
+        bpy.ops.uv.select_overlap()
+
+        # read the selection from the mesh in one copy rather than walking every bmesh face
+        obj.update_from_editmode()
+        face_selection = np.zeros(len(obj.data.polygons), dtype=bool)
+        obj.data.polygons.foreach_get('select', face_selection)
+        overlapping = np.flatnonzero(face_selection)
+
+        if len(overlapping) == 0:
+            break
+
+        overlap_key = overlapping.tobytes()
+        if overlap_key == previous_overlap:
+            print("\tUV overlaps unchanged by the last repair, stopping")
+            break
+        previous_overlap = overlap_key
+
+        bm = bmesh.from_edit_mesh(obj.data)
+        bm.faces.ensure_lookup_table()
+        overlap_faces = [bm.faces[index] for index in overlapping]
+        islands = get_uv_islands_of_faces(bm=bm, faces=overlap_faces)
+        island_faces = [face for island in islands for face in island]
+
+        print(f"\tUV Map has {len(overlapping)} overlapping faces in {len(islands)} islands, repair pass {iteration + 1}")
+
+        # only the overlapping islands are projected again
+        for face in island_faces:
+            face.select_set(True)
+        bm.select_flush_mode()
+        bmesh.update_edit_mesh(obj.data)
+
+        bpy.ops.uv.smart_project(angle_limit=radians(max(90 * 0.7 ** (iteration + 1), 10)), margin_method='ADD',
+                                 island_margin=island_margin, area_weight=0.0, correct_aspect=True, scale_to_bounds=False)
+
+        # packing moves the islands apart without projecting the faces again
+        if bpy.app.version >= (3, 6, 0):
+            pack_islands_around_locked(obj=obj, island_margin=island_margin)
         else:
-            remaining_faces += 1
+            bpy.ops.mesh.select_all(action='SELECT')
+            bpy.ops.uv.pack_islands(rotate=True, margin=island_margin, **pack_margin_args)
 
-    bm_to_mesh_back_to_mode(bm, current_context_mode, obj_name)
+    bpy.ops.mesh.select_all(action='DESELECT')
+    tool_settings.use_uv_select_sync = use_uv_select_sync
+
+    return len(overlapping)
+
+
+def pack_islands_around_locked(obj: bpy.types.Object, island_margin: float):
+    """Pack the selected UV islands into the space left by the unselected ones, which are pinned and locked in place while
+    packing and then given back their own pins. Needs Blender 3.6 or later and edit mode with UV sync selection
+
+    Args:
+        obj (bpy.types.Object): Object being unwrapped
+        island_margin (float): Island margin used for packing
+    """
+    bm = bmesh.from_edit_mesh(obj.data)
+    bm.faces.index_update()
+    uv_layer = bm.loops.layers.uv.active
+
+    # pins are only added to loops of unselected faces, kept as face index and corner so they can be found again after packing
+    added_pins = [(face.index, corner) for face in bm.faces if not face.select
+                  for corner, loop in enumerate(face.loops) if not loop[uv_layer].pin_uv]
+    bm.faces.ensure_lookup_table()
+    for face_index, corner in added_pins:
+        bm.faces[face_index].loops[corner][uv_layer].pin_uv = True
+    bmesh.update_edit_mesh(obj.data)
+
+    bpy.ops.mesh.select_all(action='SELECT')
+    bpy.ops.uv.pack_islands(rotate=True, margin=island_margin, margin_method='ADD', pin=True, pin_method='LOCKED')
+
+    bm = bmesh.from_edit_mesh(obj.data)
+    bm.faces.ensure_lookup_table()
+    uv_layer = bm.loops.layers.uv.active
+    for face_index, corner in added_pins:
+        bm.faces[face_index].loops[corner][uv_layer].pin_uv = False
+    bmesh.update_edit_mesh(obj.data)
+
+
+def get_uv_islands_of_faces(bm: bmesh.types.BMesh, faces: list):
+    """Get the UV islands containing faces, walking out from those faces only
+
+    Args:
+        bm (bmesh.types.BMesh): Mesh with an active UV layer
+        faces (list): Faces to find the islands of
+
+    Returns:
+        list[list]: Faces of each island
+    """
+    uv_layer = bm.loops.layers.uv.active
+    visited = set()
+    islands = []
+
+    for start_face in faces:
+        if start_face.index in visited:
+            continue
+
+        visited.add(start_face.index)
+        island = []
+        stack = [start_face]
 
-    return remaining_faces
+        while stack:
+            face = stack.pop()
+            island.append(face)
+
+            for loop in face.loops:
+                if loop.edge.seam:
+                    continue
+
+                for other_loop in loop.edge.link_loops:
+                    other_face = other_loop.face
+                    if other_face.index in visited or not uv_edge_connected(loop, other_loop, uv_layer):
+                        continue
+
+                    visited.add(other_face.index)
+                    stack.append(other_face)
+
+        islands.append(island)
+
+    return islands
+
+
+def uv_edge_connected(loop: bmesh.types.BMLoop, other_loop: bmesh.types.BMLoop, uv_layer, tolerance: float = 1e-6):
+
+    # faces usually wind opposite ways so match the uvs by vertex
+    if other_loop.vert == loop.vert:
+        other_start, other_end = other_loop, other_loop.link_loop_next
+    else:
+        other_start, other_end = other_loop.link_loop_next, other_loop
+
+    return ((loop[uv_layer].uv - other_start[uv_layer].uv).length < tolerance
+            and (loop.link_loop_next[uv_layer].uv - other_end[uv_layer].uv).length < tolerance)
 
 
 def error_has_occured(arg0):
@@ -685,23 +952,27 @@ def create_clear_seam(bm: bmesh.types.BMesh, edge_sharpness=15, clear=False):
     Args:
         edge_sharpness (int, optional): The angle of desired sharpness in degrees, only use int values. Defaults to 15.
         clear (bool, optional): Bool value whether to clear all seams or create them at the specified edge_sharpness. Defaults to False.
+
+    Returns:
+        tuple: (seam edge mask, seam vert mask) from get_bmesh_seam_masks when seams are created, None when cleared
     """
 
     print(f"\nStarting create_clear_seam")
 
-    edge_rad = radians(edge_sharpness)
-
     if (clear):
         for e in bm.edges:
             e.seam = False
         print("\tSeams Cleared")
     else:
-        # loop through edges
-        for e in bm.edges:
-            # set edge if it meets criteria and set seam
-            if e.smooth == False and e.calc_face_angle() >= edge_rad:
-                e.select_set(True)
-                e.seam = True
+        # the edge angles are found for every edge at once, python only visits the edges that become seams
+        seam_masks = get_bmesh_seam_masks(bm, edge_sharpness=edge_sharpness)
+        bm.edges.ensure_lookup_table()
+        for index in np.flatnonzero(seam_masks[0]):
+            e = bm.edges[index]
+            e.select_set(True)
+            e.seam = True
         print(f"\tSeams created for edge sharpness of: {edge_sharpness}")
 
     print("Completed create_clear_seam\n")
+
+    return None if clear else seam_masks
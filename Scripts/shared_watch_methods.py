@@ -0,0 +1,65 @@
+import glob
+import os
+import time
+
+
+def watch_rdc_folder(folder: str, seen: set, sentinel_filepath: str, poll_seconds: float = 10, stable_seconds: float = 30, idle_timeout_minutes: float = 60):
+    """Poll a folder and yield each new rdc file once its size has stopped changing for stable_seconds, stops once the
+    sentinel file exists and every file has been yielded or when nothing has changed for idle_timeout_minutes
+
+    Args:
+        folder (str): Folder the captures are written to
+        seen (set): Files that should not be yielded, files are added to it as they are yielded
+        sentinel_filepath (str): File created when capturing has finished
+        poll_seconds (float, optional): Seconds between checks of the folder. Defaults to 10.
+        stable_seconds (float, optional): Seconds a file size must stay the same before it is treated as complete. Defaults to 30.
+        idle_timeout_minutes (float, optional): Minutes without a new or growing file before watching stops. Defaults to 60.
+
+    Yields:
+        str: Path of a complete rdc file
+    """
+    # file path to (size, time the size last changed)
+    pending = {}
+    last_activity = time.time()
+
+    print(f"Watching {folder} for new RDC files, create {sentinel_filepath} when capturing has finished")
+
+    while True:
+        now = time.time()
+
+        for filepath in sorted(glob.glob(f"{folder}*.rdc")):
+            if filepath in seen:
+                continue
+
+            try:
+                size = os.path.getsize(filepath)
+            except OSError:
+                # file moved or deleted while checking
+                continue
+
+            previous = pending.get(filepath)
+
+            if previous is None or previous[0] != size:
+                pending[filepath] = (size, now)
+                last_activity = now
+                continue
+
+            if now - previous[1] >= stable_seconds:
+                del pending[filepath]
+                seen.add(filepath)
+                last_activity = time.time()
+                yield filepath
+
+        # drop pending files that have gone
+        for filepath in [f for f in pending if not os.path.exists(f)]:
+            del pending[filepath]
+
+        if not pending and os.path.exists(sentinel_filepath):
+            print("Sentinel file found, finished watching for RDC files")
+            return
+
+        if time.time() - last_activity >= idle_timeout_minutes * 60:
+            print(f"No new RDC files for {idle_timeout_minutes} minutes, finished watching for RDC files")
+            return
+
+        time.sleep(poll_seconds)
@@ -0,0 +1,12 @@
+import os
+import sys
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Scripts'))
+
+for module_name in ('bpy', 'bmesh', 'mathutils'):
+    try:
+        __import__(module_name)
+    except ImportError:
+        # the tested functions only work on numpy arrays and names, outside blender its modules are only used for type hints
+        sys.modules[module_name] = mock.MagicMock()
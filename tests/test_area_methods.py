@@ -0,0 +1,54 @@
+import numpy as np
+
+from shared_area_methods import get_pack_boundaries, partition_area_weighted
+
+
+def make_objects(seed: int, object_count: int, mean_pixels: float):
+
+    rng = np.random.default_rng(seed)
+    points = rng.random((object_count, 2)) * 100
+    object_pixels = rng.exponential(mean_pixels, object_count)
+
+    # sorted by x like rename_objs_and_store_location
+    order = np.argsort(points[:, 0], kind='stable')
+
+    return points[order], object_pixels[order]
+
+
+def test_pack_count_at_most_greedy():
+
+    for seed in range(50):
+        for mean_pixels in (0.02, 0.1, 0.3, 0.6):
+            points, object_pixels = make_objects(seed, 300, mean_pixels)
+
+            packs = partition_area_weighted(points=points, object_pixels=object_pixels, pixel_budget=1.0)
+            greedy_boundaries = get_pack_boundaries(object_pixels=object_pixels, pixel_budget=1.0)
+
+            assert len(packs) <= len(greedy_boundaries)
+
+
+def test_coarse_objects_pack_count_at_most_greedy():
+
+    # few large objects adding up to about 38 images, where halving over budget packs used to give many small packs
+    points, object_pixels = make_objects(seed=7, object_count=120, mean_pixels=0.32)
+
+    packs = partition_area_weighted(points=points, object_pixels=object_pixels, pixel_budget=1.0)
+
+    assert len(packs) <= len(get_pack_boundaries(object_pixels=object_pixels, pixel_budget=1.0))
+
+
+def test_packs_cover_every_object_once_and_fit_budget():
+
+    points, object_pixels = make_objects(seed=3, object_count=500, mean_pixels=0.1)
+    object_pixels[10] = 2.5  # bigger than one image so it gets a pack of its own
+
+    packs = partition_area_weighted(points=points, object_pixels=object_pixels, pixel_budget=1.0)
+
+    assert sorted(np.concatenate(packs).tolist()) == list(range(len(object_pixels)))
+    for pack in packs:
+        assert object_pixels[pack].sum() <= 1.0 or len(pack) == 1
+
+
+def test_no_objects_gives_no_packs():
+
+    assert partition_area_weighted(points=np.zeros((0, 2)), object_pixels=np.zeros(0), pixel_budget=1.0) == []
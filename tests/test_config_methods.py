@@ -0,0 +1,35 @@
+import pytest
+
+from shared_config_methods import get_area_settings
+
+
+DEFAULT_SETTINGS = {'checkpoint_interval_minutes': 10, 'watch_poll_seconds': 10, 'memory_budget_gb': 0,
+                    'queue_memory_factor': 4.0, 'resume_run': False, 'pack_strategy': 'kd'}
+
+
+def test_numbers_accepted_for_numeric_defaults():
+
+    config = {'settings': {'checkpoint_interval_minutes': 7.5, 'watch_poll_seconds': 2.5,
+                           'memory_budget_gb': 12.5, 'queue_memory_factor': 3}}
+
+    settings = get_area_settings(config=config, config_filepath='area.toml', default_settings=DEFAULT_SETTINGS)
+
+    assert settings['checkpoint_interval_minutes'] == 7.5
+    assert settings['watch_poll_seconds'] == 2.5
+    assert settings['memory_budget_gb'] == 12.5
+    assert settings['queue_memory_factor'] == 3
+    assert settings['pack_strategy'] == 'kd'
+
+
+@pytest.mark.parametrize('name, value', [('memory_budget_gb', True), ('resume_run', 1), ('pack_strategy', 2),
+                                         ('checkpoint_interval_minutes', '10')])
+def test_other_type_changes_rejected(name, value):
+
+    with pytest.raises(ValueError):
+        get_area_settings(config={'settings': {name: value}}, config_filepath='area.toml', default_settings=DEFAULT_SETTINGS)
+
+
+def test_unknown_setting_rejected():
+
+    with pytest.raises(ValueError):
+        get_area_settings(config={'settings': {'not_a_setting': 1}}, config_filepath='area.toml', default_settings=DEFAULT_SETTINGS)
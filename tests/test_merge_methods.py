@@ -0,0 +1,67 @@
+from shared_merge_methods import get_overlap_components, plan_overlap_merges
+
+
+def make_graph(col_names: list[str], edges: list[tuple]):
+
+    graph = {col_name: set() for col_name in col_names}
+    for col_a, col_b in edges:
+        graph[col_a].add(col_b)
+        graph[col_b].add(col_a)
+
+    return graph
+
+
+def check_plan(graph: dict, component: list[str]):
+    """Run the plan and check every merge joins overlapping groups and ends with one group held by the first capture"""
+
+    groups = {col_name: {col_name} for col_name in component}
+    rounds = plan_overlap_merges(graph=graph, component=component)
+
+    for merges in rounds:
+        assert merges
+        merged_this_round = [col_name for merge in merges for col_name in merge]
+        # a group is only merged once in each round
+        assert len(merged_this_round) == len(set(merged_this_round))
+
+        for target, source in merges:
+            assert any(graph[member] & groups[source] for member in groups[target])
+            groups[target] |= groups.pop(source)
+
+    assert list(groups) == [component[0]]
+    assert groups[component[0]] == set(component)
+
+    return rounds
+
+
+def test_chain_merges_like_a_tree():
+
+    col_names = [f"col_{i}" for i in range(1, 9)]
+    graph = make_graph(col_names, list(zip(col_names, col_names[1:])))
+
+    rounds = check_plan(graph, get_overlap_components(graph, col_names)[0])
+
+    # pairs merge in parallel so a chain of 8 needs far fewer rounds than merging one at a time
+    assert len(rounds) < len(col_names) - 1
+
+
+def test_star_and_unordered_captures():
+
+    col_names = ['col_3', 'col_1', 'col_5', 'col_2', 'col_4']
+    graph = make_graph(col_names, [('col_1', 'col_2'), ('col_1', 'col_3'), ('col_1', 'col_4'), ('col_1', 'col_5'),
+                                   ('col_4', 'col_5')])
+
+    check_plan(graph, get_overlap_components(graph, col_names)[0])
+
+
+def test_separate_groups_are_planned_on_their_own():
+
+    col_names = ['col_1', 'col_2', 'col_3', 'col_4', 'col_5', 'col_6']
+    graph = make_graph(col_names, [('col_1', 'col_2'), ('col_2', 'col_3'), ('col_4', 'col_5')])
+
+    components = get_overlap_components(graph, col_names)
+
+    assert components == [['col_1', 'col_2', 'col_3'], ['col_4', 'col_5'], ['col_6']]
+    for component in components:
+        check_plan(graph, component)
+
+    assert plan_overlap_merges(graph=graph, component=['col_6']) == []